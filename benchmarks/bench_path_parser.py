@@ -0,0 +1,126 @@
+#############################################################   .=<|||>=.   ####
+#|                                                              |(0)|||||      #
+#|   benchmarks/bench_path_parser.py                            !!!!!!|||
+#|                                                         /||||||||||||/.:::::,
+#|   By: ctrichet <clement.trichet.pro@gmail.com>         |||||||!!!!!!/.:::::::
+#|                                                        ||||||/.::::::::::::::
+#|   Created: 2026/10/18 13:48:05 ctrichet                 \|||/.::::::::::::::'
+#|   Updated: 2026/10/18 10:03:17 ctrichet                      :::......
+#|                                                              :::::(0):      #
+#############################################################   ':::::::'   ####
+
+"""Compare l'ancien parsing des chaînes 'd' (svg.path + dispatch par nom de classe)
+au parseur natif core.path_data, sur un SVG de 50 000 chemins.
+
+    python benchmarks/bench_path_parser.py [fichier.svg] [--paths N]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtGui import QPainterPath
+from svg.path import parse_path
+
+from core.svg_parser import parse_svg_or_group
+from core.pieces import SvgPiece
+from core.model_items import painter_path_from_d
+from core.flatten import flatten_path_d
+import utils.debug
+
+
+def legacy_parse_svg_path_d(d_string):
+    """Copie de l'ancien PathItem.parse_svg_path_d (les arcs deviennent des segments)."""
+    path = QPainterPath()
+    if not d_string:
+        return path
+    try:
+        svg_path = parse_path(d_string)
+        for e in svg_path:
+            start = e.start
+            if path.isEmpty():
+                path.moveTo(start.real, start.imag)
+            if e.__class__.__name__ == "Line":
+                path.lineTo(e.end.real, e.end.imag)
+            elif e.__class__.__name__ == "CubicBezier":
+                path.cubicTo(
+                    e.control1.real, e.control1.imag,
+                    e.control2.real, e.control2.imag,
+                    e.end.real, e.end.imag
+                )
+            elif e.__class__.__name__ == "QuadraticBezier":
+                path.quadTo(
+                    e.control.real, e.control.imag,
+                    e.end.real, e.end.imag
+                )
+            elif e.__class__.__name__ == "Arc":
+                path.lineTo(e.end.real, e.end.imag)
+            else:
+                path.lineTo(e.end.real, e.end.imag)
+    except Exception as e:
+        print(f"[ERREUR] Parsing du path SVG échoué : {e}")
+    return path
+
+
+def write_sample_svg(path, count, seed=42):
+    """Génère un SVG de `count` pièces mêlant lignes, cubiques, quadratiques et arcs."""
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('<svg xmlns="http://www.w3.org/2000/svg" width="5000" height="5000">\n')
+        for g in range(0, count, 100):
+            f.write(f'<g id="g{g}">\n')
+            for i in range(g, min(g + 100, count)):
+                x, y = rng.uniform(0, 4900), rng.uniform(0, 4900)
+                w, h = rng.uniform(5, 40), rng.uniform(5, 40)
+                f.write(
+                    f'<path id="p{i}" d="M{x:.3f},{y:.3f} l{w:.3f},0 '
+                    f'c{w / 3:.3f},{h / 4:.3f} {w / 2:.3f},{h / 2:.3f} 0,{h:.3f} '
+                    f'q{-w / 2:.3f},{h / 3:.3f} {-w:.3f},0 '
+                    f'a{w / 4:.3f},{h / 4:.3f} 0 0,1 {-w / 2:.3f},{-h / 2:.3f} '
+                    f'S{x - w:.3f},{y:.3f} {x:.3f},{y:.3f} z"/>\n'
+                )
+            f.write("</g>\n")
+        f.write("</svg>\n")
+
+
+def bench(label, func, d_strings):
+    start = time.perf_counter()
+    for d in d_strings:
+        func(d)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<38} {elapsed:8.3f} s   {1e6 * elapsed / len(d_strings):7.1f} µs/chemin")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("svg_file", nargs="?", help="SVG à mesurer (sinon fichier généré)")
+    parser.add_argument("--paths", type=int, default=50_000, help="taille du SVG généré")
+    args = parser.parse_args()
+    utils.debug.DEBUG = False
+
+    svg_file = args.svg_file
+    if svg_file is None:
+        svg_file = os.path.join(tempfile.mkdtemp(), "bench.svg")
+        write_sample_svg(svg_file, args.paths)
+
+    d_strings = []
+    for node in parse_svg_or_group(svg_file):
+        if isinstance(node, SvgPiece):
+            d_strings.append(node.closed_d)
+            d_strings.extend(node.open_d_strings)
+    print(f"{len(d_strings)} chemins lus dans {svg_file}\n")
+
+    legacy = bench("svg.path + dispatch (ancien)", legacy_parse_svg_path_d, d_strings)
+    native = bench("core.path_data → QPainterPath", painter_path_from_d, d_strings)
+    bench("core.path_data → FlatPath", flatten_path_d, d_strings)
+    print(f"\nAccélération QPainterPath : x{legacy / native:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,14 +5,21 @@
 #|   By: ctrichet <clement.trichet.pro@gmail.com>         |||||||!!!!!!/.:::::::
 #|                                                        ||||||/.::::::::::::::
 #|   Created: 2025/08/12 11:43:00 ctrichet                 \|||/.::::::::::::::'
-#|   Updated: 2025/08/12 11:43:00 ctrichet                      :::......
+#|   Updated: 2026/10/18 23:55:40 ctrichet                      :::......
 #|                                                              :::::(0):      #
 #############################################################   ':::::::'   ####
 
 from .nesting import Individual, NestingEngine, approximate_polygon
 from .model_items import PathItem, CompositeGroupItem, GroupItem, DuplicataGroupItem
-from .svg_parser import parse_svg_or_group
+from .pieces import SvgGroup, SvgPiece
+from .geometry_store import GeometryStore
+from .subtree_index import SubtreeIndex
+from .element_index import ElementIndex, NOT_DUPLICATED
+from .svg_parser import parse_svg_or_group, iter_svg_or_group
+from .svg_loader import SvgStreamLoader
+from .svg_watcher import SvgFileWatcher
 from .duplication_manager import perform_unique_duplication
+from .image_adjust import ImageAdjustments, NEUTRAL_ADJUSTMENTS
 __all__ = [
     "Individual",
     "NestingEngine",
@@ -21,5 +28,16 @@ __all__ = [
     "CompositeGroupItem",
     "GroupItem",
     "DuplicataGroupItem",
+    "SvgStreamLoader",
+    "SvgFileWatcher",
+    "SvgGroup",
+    "SvgPiece",
+    "GeometryStore",
+    "SubtreeIndex",
+    "ElementIndex",
+    "NOT_DUPLICATED",
+    "parse_svg_or_group",
     "perform_unique_duplication",
+    "ImageAdjustments",
+    "NEUTRAL_ADJUSTMENTS",
 ]
@@ -5,7 +5,7 @@
 #|   By: ctrichet <clement.trichet.pro@gmail.com>         |||||||!!!!!!/.:::::::
 #|                                                        ||||||/.::::::::::::::
 #|   Created: 2025/08/12 11:43:00 ctrichet                 \|||/.::::::::::::::'
-#|   Updated: 2025/08/12 11:43:00 ctrichet                      :::......
+#|   Updated: 2026/10/18 21:39:15 ctrichet                      :::......
 #|                                                              :::::(0):      #
 #############################################################   ':::::::'   ####
 
@@ -20,6 +20,9 @@ def perform_unique_duplication(selected_items, target_view, window):
                 element_id = item.element_id
                 bg_filename = os.path.basename(target_view.scene().name)
 
+                if window.element_index is not None:
+                    window.element_index.set_layer(element_id, target_view.scene().name)
+
                 tree_item = window.tree_items_by_id.get(element_id)
                 if tree_item:
                     window.apply_tree_item_color(tree_item, bg_filename)
\ No newline at end of file
@@ -0,0 +1,78 @@
+#############################################################   .=<|||>=.   ####
+#|                                                              |(0)|||||      #
+#|   core/element_index.py                                      !!!!!!|||
+#|                                                         /||||||||||||/.:::::,
+#|   By: ctrichet <clement.trichet.pro@gmail.com>         |||||||!!!!!!/.:::::::
+#|                                                        ||||||/.::::::::::::::
+#|   Created: 2026/10/18 21:24:51 ctrichet                 \|||/.::::::::::::::'
+#|   Updated: 2026/10/18 21:24:51 ctrichet                      :::......
+#|                                                              :::::(0):      #
+#############################################################   ':::::::'   ####
+
+from bisect import bisect_left
+
+NOT_DUPLICATED = object()   # filtre de calque : pièces encore sans duplicata
+
+
+class ElementIndex:
+    """Index de recherche sur les ids des pièces, construit une fois par chargement.
+
+    Les ids (en minuscules, la recherche ignore la casse) sont triés : un préfixe est
+    une plage trouvée par bisection. Une sous-chaîne se cherche dans le résultat de la
+    frappe précédente quand la requête ne fait que s'allonger. Le calque de duplication
+    de chaque pièce est tenu à jour par `set_layer` pour les filtres.
+    """
+
+    def __init__(self, element_ids, layers=None):
+        self.ids_by_key = {}        # id en minuscules -> ids d'origine
+        self.count = 0
+        for element_id in element_ids:
+            self.ids_by_key.setdefault(element_id.lower(), []).append(element_id)
+            self.count += 1
+        self.keys = sorted(self.ids_by_key)
+        self._last = ("", self.keys)    # dernière sous-chaîne cherchée et ses clés
+        self.layers = {}            # element_id -> calque du duplicata
+        self.by_layer = {}          # calque -> ids dupliqués dessus
+        for element_id, layer in (layers or {}).items():
+            if element_id.lower() in self.ids_by_key:
+                self.set_layer(element_id, layer)
+
+    def __len__(self):
+        return self.count
+
+    def set_layer(self, element_id, layer):
+        """Enregistre le calque du duplicata d'une pièce (None : plus de duplicata)."""
+        previous = self.layers.pop(element_id, None)
+        if previous is not None:
+            self.by_layer[previous].discard(element_id)
+        if layer is not None:
+            self.layers[element_id] = layer
+            self.by_layer.setdefault(layer, set()).add(element_id)
+
+    def search(self, text="", prefix=False, layer=None):
+        """Ids des pièces dont l'id contient (ou commence par) `text`, filtrés par calque :
+        None pour tous, NOT_DUPLICATED, ou le chemin d'un calque image."""
+        text = text.lower()
+        if not text:
+            if layer is None:
+                return []
+            if layer is not NOT_DUPLICATED:
+                return list(self.by_layer.get(layer, ()))
+            keys = self.keys
+        elif prefix:
+            start = bisect_left(self.keys, text)
+            keys = self.keys[start:bisect_left(self.keys, text + "\uffff", start)]
+        else:
+            last_text, last_keys = self._last
+            candidates = last_keys if last_text in text else self.keys
+            keys = [key for key in candidates if text in key]
+            self._last = (text, keys)
+
+        ids_by_key = self.ids_by_key
+        matches = [element_id for key in keys for element_id in ids_by_key[key]]
+        if layer is NOT_DUPLICATED:
+            return [element_id for element_id in matches if element_id not in self.layers]
+        if layer is not None:
+            on_layer = self.by_layer.get(layer, ())
+            return [element_id for element_id in matches if element_id in on_layer]
+        return matches
@@ -0,0 +1,187 @@
+#############################################################   .=<|||>=.   ####
+#|                                                              |(0)|||||      #
+#|   core/flatten.py                                            !!!!!!|||
+#|                                                         /||||||||||||/.:::::,
+#|   By: ctrichet <clement.trichet.pro@gmail.com>         |||||||!!!!!!/.:::::::
+#|                                                        ||||||/.::::::::::::::
+#|   Created: 2026/10/18 11:26:40 ctrichet                 \|||/.::::::::::::::'
+#|   Updated: 2026/10/19 09:41:05 ctrichet                      :::......
+#|                                                              :::::(0):      #
+#############################################################   ':::::::'   ####
+
+from collections import namedtuple
+from math import ceil, sqrt
+
+import numpy as np
+
+from core.path_data import parse_path_data
+
+DEFAULT_TOLERANCE = 0.05   # écart corde / courbe toléré, en unités du document
+
+# Géométrie aplatie d'une chaîne 'd', sans Qt :
+#   coords       float32 (n, 2)  tous les points, sous-chemins bout à bout
+#   ring_offsets int     (r + 1) indice du premier point de chaque sous-chemin
+#   ring_closed  bool    (r)     sous-chemin fermé par un Z
+FlatPath = namedtuple("FlatPath", ["coords", "ring_offsets", "ring_closed"])
+
+
+class PolylineBuilder:
+    """Cible de parse_path_data, avec la même interface que QPainterPath,
+    qui échantillonne les courbes au lieu de les stocker."""
+
+    def __init__(self, tolerance=DEFAULT_TOLERANCE):
+        self.tolerance = tolerance
+        self.coords = []        # x0, y0, x1, y1, ...
+        self.offsets = []       # indice (en points) du début de chaque sous-chemin
+        self.closed = []
+        self.x = self.y = 0.0
+
+    def moveTo(self, x, y):
+        self.offsets.append(len(self.coords) // 2)
+        self.closed.append(False)
+        self.coords += (x, y)
+        self.x, self.y = x, y
+
+    def lineTo(self, x, y):
+        self.coords += (x, y)
+        self.x, self.y = x, y
+
+    def quadTo(self, cx, cy, x, y):
+        x0, y0 = self.x, self.y
+        # Formule de Wang : nombre de cordes garantissant l'écart `tolerance`
+        ax, ay = x0 - 2 * cx + x, y0 - 2 * cy + y
+        steps = max(1, min(256, ceil(sqrt(sqrt(ax * ax + ay * ay) / (4 * self.tolerance)))))
+        # Différences finies : deux additions par coordonnée et par point
+        h = 1 / steps
+        d2x, d2y = 2 * ax * h * h, 2 * ay * h * h
+        d1x, d1y = 2 * (cx - x0) * h + d2x / 2, 2 * (cy - y0) * h + d2y / 2
+        px, py = x0, y0
+        coords = self.coords
+        for _ in range(steps - 1):
+            px += d1x
+            py += d1y
+            d1x += d2x
+            d1y += d2y
+            coords += (px, py)
+        self.lineTo(x, y)
+
+    def cubicTo(self, c1x, c1y, c2x, c2y, x, y):
+        x0, y0 = self.x, self.y
+        dd = max(
+            sqrt((x0 - 2 * c1x + c2x) ** 2 + (y0 - 2 * c1y + c2y) ** 2),
+            sqrt((c1x - 2 * c2x + x) ** 2 + (c1y - 2 * c2y + y) ** 2),
+        )
+        steps = max(1, min(256, ceil(sqrt(3 * dd / (4 * self.tolerance)))))
+        # P(t) = a t³ + b t² + c t + p0, parcouru par différences finies
+        h = 1 / steps
+        h2, h3 = h * h, h * h * h
+        ax, ay = -x0 + 3 * (c1x - c2x) + x, -y0 + 3 * (c1y - c2y) + y
+        bx, by = 3 * (x0 - 2 * c1x + c2x), 3 * (y0 - 2 * c1y + c2y)
+        cx, cy = 3 * (c1x - x0), 3 * (c1y - y0)
+        d1x, d1y = ax * h3 + bx * h2 + cx * h, ay * h3 + by * h2 + cy * h
+        d3x, d3y = 6 * ax * h3, 6 * ay * h3
+        d2x, d2y = d3x + 2 * bx * h2, d3y + 2 * by * h2
+        px, py = x0, y0
+        coords = self.coords
+        for _ in range(steps - 1):
+            px += d1x
+            py += d1y
+            d1x += d2x
+            d1y += d2y
+            d2x += d3x
+            d2y += d3y
+            coords += (px, py)
+        self.lineTo(x, y)
+
+    def closeSubpath(self):
+        if self.closed:
+            self.closed[-1] = True
+
+    def result(self):
+        """FlatPath des sous-chemins d'au moins deux points."""
+        coords = np.array(self.coords, dtype=np.float32).reshape(-1, 2)
+        bounds = self.offsets + [len(coords)]
+        keep = [r for r in range(len(self.offsets)) if bounds[r + 1] - bounds[r] > 1]
+        if len(keep) != len(self.offsets):
+            coords = np.concatenate([coords[bounds[r]:bounds[r + 1]] for r in keep]) if keep \
+                else np.zeros((0, 2), dtype=np.float32)
+        offsets = [0]
+        for r in keep:
+            offsets.append(offsets[-1] + bounds[r + 1] - bounds[r])
+        return FlatPath(
+            coords,
+            np.array(offsets, dtype=np.int64),
+            np.array([self.closed[r] for r in keep], dtype=bool),
+        )
+
+
+def flatten_path_d(d_string, tolerance=DEFAULT_TOLERANCE):
+    """Aplatit une chaîne 'd' SVG en FlatPath (courbes et arcs échantillonnés)."""
+    builder = PolylineBuilder(tolerance)
+    if d_string:
+        try:
+            parse_path_data(d_string, builder)
+        except ValueError as e:
+            print(f"[ERREUR] Aplatissement du path SVG échoué : {e}")
+    return builder.result()
+
+
+def flatten_piece(piece, tolerance=DEFAULT_TOLERANCE, cache=None):
+    """Aplatit le contour fermé d'une SvgPiece (seule géométrie gardée par le
+    GeometryStore ; les traits ouverts sont tracés depuis leurs chaînes 'd').
+    `cache` (dict d_string -> FlatPath) évite de ré-aplatir les motifs répétés."""
+    if cache is None:
+        cache = {}
+    flat = cache.get(piece.closed_d)
+    if flat is None:
+        flat = cache[piece.closed_d] = flatten_path_d(piece.closed_d, tolerance)
+    piece.flat_paths = [flat]
+    return piece
+
+
+def pack_flat_paths(flat_lists):
+    """Concatène les FlatPath de plusieurs pièces (une liste par pièce) en cinq tableaux :
+        coords        float32 (n, 2)  tous les points bout à bout
+        ring_offsets  int64           premier point de chaque sous-chemin
+        ring_closed   uint8           sous-chemin fermé
+        path_rings    int64           premier sous-chemin de chaque chaîne 'd'
+        piece_paths   int64           première chaîne 'd' de chaque pièce
+    Disposition du cache géométrique, aussi utilisée pour renvoyer les résultats des
+    processus de parsing (quelques gros tableaux au lieu de milliers de petits)."""
+    coords, ring_offsets, ring_closed, path_rings, piece_paths = [], [0], [], [0], [0]
+    point_count = 0
+    for flat_paths in flat_lists:
+        for flat in flat_paths:
+            coords.append(flat.coords)
+            ring_offsets.extend(flat.ring_offsets[1:] + point_count)
+            ring_closed.extend(flat.ring_closed)
+            point_count += len(flat.coords)
+            path_rings.append(len(ring_closed))
+        piece_paths.append(len(path_rings) - 1)
+    return {
+        "coords": np.concatenate(coords) if coords else np.zeros((0, 2), dtype=np.float32),
+        "ring_offsets": np.array(ring_offsets, dtype=np.int64),
+        "ring_closed": np.array(ring_closed, dtype=np.uint8),
+        "path_rings": np.array(path_rings, dtype=np.int64),
+        "piece_paths": np.array(piece_paths, dtype=np.int64),
+    }
+
+
+def unpack_flat_paths(arrays):
+    """Inverse de pack_flat_paths : une liste de FlatPath par pièce. Les coordonnées
+    restent des vues sur `coords` (aucune copie, y compris pour un np.memmap)."""
+    coords = arrays["coords"]
+    ring_offsets = arrays["ring_offsets"]
+    ring_closed = arrays["ring_closed"]
+    path_rings = arrays["path_rings"]
+    piece_paths = arrays["piece_paths"]
+
+    def flat_path(p):
+        r0, r1 = path_rings[p], path_rings[p + 1]
+        a, b = ring_offsets[r0], ring_offsets[r1]
+        return FlatPath(coords[a:b], ring_offsets[r0:r1 + 1] - a, ring_closed[r0:r1].astype(bool))
+
+    return [
+        [flat_path(p) for p in range(piece_paths[i], piece_paths[i + 1])]
+        for i in range(len(piece_paths) - 1)
+    ]
@@ -0,0 +1,214 @@
+#############################################################   .=<|||>=.   ####
+#|                                                              |(0)|||||      #
+#|   core/geometry_cache.py                                     !!!!!!|||
+#|                                                         /||||||||||||/.:::::,
+#|   By: ctrichet <clement.trichet.pro@gmail.com>         |||||||!!!!!!/.:::::::
+#|                                                        ||||||/.::::::::::::::
+#|   Created: 2026/10/18 11:26:40 ctrichet                 \|||/.::::::::::::::'
+#|   Updated: 2026/10/19 15:02:30 ctrichet                      :::......
+#|                                                              :::::(0):      #
+#############################################################   ':::::::'   ####
+
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+
+from core.pieces import SvgGroup, SvgPiece
+from utils.debug import debug_log
+
+CACHE_VERSION = 5
+MAX_ENTRIES = 16
+
+# Disposition sur disque d'une entrée (un dossier par empreinte du fichier SVG) :
+#   nodes.json  hiérarchie, ids et chaînes 'd' (pour l'export)
+#   <nom>.npy   contours aplatis des pièces, un par pièce (voir GeometryStore.pack)
+# Les .npy sont relus en np.memmap et passés tels quels à GeometryStore.extend.
+# .keys/<clé> retient l'empreinte d'un fichier par chemin, date et taille : une
+# réouverture du même fichier ne le relit pas pour le hacher.
+_ARRAYS = ("coords", "ring_offsets", "ring_closed", "path_rings", "piece_paths")
+
+# Hachage et écriture hors du thread graphique ; un seul thread : les tâches passent
+# dans l'ordre, une écriture trouve toujours l'empreinte qu'elle attend déjà calculée
+_io_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="geometry-cache")
+
+
+def cache_root():
+    root = os.environ.get("WOODINLAY_CACHE_DIR")
+    if root:
+        return root
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "woodinlay", "svg")
+
+
+def file_digest(path):
+    """Empreinte du contenu : un SVG modifié obtient automatiquement une autre entrée."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return f"v{CACHE_VERSION}-{h.hexdigest()}"
+
+
+def stat_key(path):
+    """Clé d'un fichier par chemin, date de modification et taille (sans le lire)."""
+    st = os.stat(path)
+    key = f"{os.path.abspath(path)}\0{st.st_mtime_ns}\0{st.st_size}".encode()
+    return hashlib.blake2b(key, digest_size=16).hexdigest()
+
+
+def cached_digest(path):
+    """Empreinte déjà calculée pour ce fichier inchangé, ou None."""
+    try:
+        with open(os.path.join(cache_root(), ".keys", stat_key(path)), encoding="ascii") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def _digest_and_remember(path):
+    key = stat_key(path)
+    digest = file_digest(path)
+    try:
+        keys = os.path.join(cache_root(), ".keys")
+        os.makedirs(keys, exist_ok=True)
+        with open(os.path.join(keys, key), "w", encoding="ascii") as f:
+            f.write(digest)
+    except OSError as e:
+        debug_log(f"[WARN] Clé de cache non écrite : {e}")
+    return digest
+
+
+def digest_in_background(path):
+    """Future de l'empreinte du fichier, calculée dans le thread du cache puis retenue
+    pour les réouvertures (voir cached_digest)."""
+    return _io_pool.submit(_digest_and_remember, path)
+
+
+def load_cached_nodes(digest):
+    """Relit une entrée du cache : (SvgGroup / SvgPiece dans l'ordre du document,
+    tableaux des contours pour GeometryStore.extend), ou None si absente ou illisible."""
+    entry = os.path.join(cache_root(), digest)
+    if not os.path.isdir(entry):
+        return None
+    try:
+        with open(os.path.join(entry, "nodes.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        arrays = {
+            name: np.load(os.path.join(entry, f"{name}.npy"), mmap_mode="r")
+            for name in _ARRAYS
+        }
+    except (OSError, ValueError) as e:
+        debug_log(f"[WARN] Entrée de cache illisible {digest} : {e}")
+        return None
+
+    nodes = []
+    group_paths = []
+    d_strings = {}
+    for node in meta["nodes"]:
+        if node[0] == "g":
+            _, group_id, parent = node
+            group = SvgGroup(group_id, group_paths[parent] if parent is not None else ())
+            group_paths.append(group.group_path + (group_id,))
+            nodes.append(group)
+        else:
+            _, element_id, closed_d, open_d_strings, parent = node
+            closed_d = d_strings.setdefault(closed_d, closed_d)
+            open_d_strings = [d_strings.setdefault(d, d) for d in open_d_strings]
+            nodes.append(SvgPiece(element_id, closed_d, open_d_strings, group_paths[parent]))
+    os.utime(entry)
+    return nodes, arrays
+
+
+def store_nodes(digest, nodes, store):
+    """Écrit une entrée du cache, entièrement dans le thread du cache : hiérarchie tirée
+    de `nodes` (qui ne doit plus changer), contours copiés du GeometryStore (qui en tient
+    la seule copie), dossier temporaire puis renommé. Si le store a changé entre-temps
+    (rechargement suivant), l'entrée n'est pas écrite : elle ne correspondrait plus à
+    `digest`. `digest` peut être le Future renvoyé par digest_in_background.
+    Renvoie le Future de l'écriture."""
+    return _io_pool.submit(_store_entry, digest, nodes, store, store.version)
+
+
+def _store_entry(digest, nodes, store, version):
+    if isinstance(digest, Future):
+        try:
+            digest = digest.result()
+        except OSError as e:
+            debug_log(f"[WARN] Empreinte du SVG incalculable, cache non écrit : {e}")
+            return
+    if digest is None or os.path.isdir(os.path.join(cache_root(), digest)):
+        return
+
+    meta = []
+    group_index = {}
+    element_ids = []
+    for node in nodes:
+        if isinstance(node, SvgGroup):
+            group_index[node.group_path + (node.group_id,)] = len(group_index)
+            meta.append(["g", node.group_id, group_index.get(node.group_path)])
+            continue
+        meta.append(["p", node.element_id, node.closed_d, node.open_d_strings, group_index[node.group_path]])
+        element_ids.append(node.element_id)
+    arrays = store.pack(element_ids, version)
+    if arrays is None:
+        debug_log("Géométrie modifiée pendant l'écriture du cache : entrée abandonnée")
+        return
+    _write_entry(digest, meta, arrays)
+
+
+def _write_entry(digest, meta, arrays):
+    root = cache_root()
+    entry = os.path.join(root, digest)
+
+    try:
+        os.makedirs(root, exist_ok=True)
+        tmp = tempfile.mkdtemp(prefix=".tmp-", dir=root)
+    except OSError as e:
+        debug_log(f"[WARN] Dossier de cache inaccessible : {e}")
+        return
+
+    try:
+        with open(os.path.join(tmp, "nodes.json"), "w", encoding="utf-8") as f:
+            json.dump({"version": CACHE_VERSION, "nodes": meta}, f)
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp, f"{name}.npy"), array)
+        os.replace(tmp, entry)
+    except OSError as e:
+        debug_log(f"[WARN] Écriture du cache impossible : {e}")
+        shutil.rmtree(tmp, ignore_errors=True)
+        return
+    debug_log(f"Cache géométrique écrit : {entry}")
+    prune_cache()
+
+
+def prune_cache(max_entries=MAX_ENTRIES):
+    """Ne garde que les `max_entries` entrées les plus récemment utilisées."""
+    root = cache_root()
+    try:
+        entries = [
+            os.path.join(root, name) for name in os.listdir(root)
+            if not name.startswith(".")
+        ]
+    except OSError:
+        return
+    entries.sort(key=os.path.getmtime, reverse=True)
+    for entry in entries[max_entries:]:
+        shutil.rmtree(entry, ignore_errors=True)
+
+    # Clés de réouverture : une par version enregistrée d'un fichier, on garde les récentes
+    keys = os.path.join(root, ".keys")
+    try:
+        names = [os.path.join(keys, name) for name in os.listdir(keys)]
+    except OSError:
+        return
+    names.sort(key=os.path.getmtime, reverse=True)
+    for name in names[4 * max_entries:]:
+        try:
+            os.remove(name)
+        except OSError:
+            pass
@@ -0,0 +1,383 @@
+#############################################################   .=<|||>=.   ####
+#|                                                              |(0)|||||      #
+#|   core/geometry_store.py                                     !!!!!!|||
+#|                                                         /||||||||||||/.:::::,
+#|   By: ctrichet <clement.trichet.pro@gmail.com>         |||||||!!!!!!/.:::::::
+#|                                                        ||||||/.::::::::::::::
+#|   Created: 2026/10/18 17:21:05 ctrichet                 \|||/.::::::::::::::'
+#|   Updated: 2026/10/19 14:48:15 ctrichet                      :::......
+#|                                                              :::::(0):      #
+#############################################################   ':::::::'   ####
+
+import functools
+import threading
+
+import numpy as np
+
+# Bits de GeometryStore.flags
+FLAG_HAS_OPEN = 1       # la pièce porte des traits ouverts
+FLAG_REMOVED = 2        # pièce retirée (rechargement du SVG) : l'indice n'est pas réutilisé
+
+
+def _mutation(method):
+    """Méthode qui modifie le store : exécutée sous verrou (pack peut lire depuis le
+    thread du cache géométrique) et comptée dans GeometryStore.version."""
+    @functools.wraps(method)
+    def locked(self, *args, **kwargs):
+        with self.lock:
+            self.version += 1
+            return method(self, *args, **kwargs)
+    return locked
+
+
+class GeometryStore:
+    """Géométrie de toutes les pièces en colonnes NumPy, indexées par un entier.
+
+    Une pièce = une ligne : id (table `ids`), groupe, boîte englobante, aire, drapeaux,
+    et la plage de ses sous-chemins dans `coords` (contour fermé, aplati). Les colonnes
+    grandissent par doublement ; les vues (`bboxes`, `areas`, ...) couvrent les lignes
+    utilisées. Aucun objet Qt : la scène, l'arbre et le nesting interrogent l'indice
+    (GroupItem.store_index) au lieu de garder chacun leur copie de la géométrie ; la
+    version aplatie d'une pièce (SvgPiece.flat_paths) est libérée dès son inscription.
+
+    Les points d'une pièce mise à jour ou retirée sont recyclés : réécrits sur place si
+    la nouvelle géométrie y tient, sinon comptés comme perdus jusqu'au compactage.
+    """
+
+    def __init__(self, capacity=1024):
+        self.lock = threading.RLock()
+        self.version = 0            # incrémenté à chaque modification
+        self.ids = []               # indice -> element_id
+        self.group_ids = []         # indice de groupe -> group_id
+        self._index = {}
+        self._group_index = {}
+        self._count = 0
+        self._point_count = 0
+        self._ring_count = 0
+        self._lost_points = 0       # points / sous-chemins de versions remplacées, non référencés
+        self._lost_rings = 0
+        self._coords = np.zeros((capacity * 16, 2), dtype=np.float32)
+        self._ring_bounds = np.zeros((capacity, 2), dtype=np.int64)     # [début, fin) dans coords
+        self._ring_closed = np.zeros(capacity, dtype=bool)
+        self._piece_points = np.zeros((capacity, 2), dtype=np.int64)    # [début, fin) dans coords
+        self._piece_rings = np.zeros((capacity, 2), dtype=np.int64)     # [début, fin) dans ring_bounds
+        self._bboxes = np.zeros((capacity, 4), dtype=np.float32)        # x0, y0, x1, y1
+        self._areas = np.zeros(capacity, dtype=np.float32)
+        self._flags = np.zeros(capacity, dtype=np.uint8)
+        self._groups = np.full(capacity, -1, dtype=np.int32)
+
+    def __len__(self):
+        return self._count
+
+    # --- Vues sur les lignes utilisées ---
+
+    @property
+    def bboxes(self):
+        return self._bboxes[:self._count]
+
+    @property
+    def areas(self):
+        return self._areas[:self._count]
+
+    @property
+    def flags(self):
+        return self._flags[:self._count]
+
+    @property
+    def groups(self):
+        return self._groups[:self._count]
+
+    @property
+    def coords(self):
+        return self._coords[:self._point_count]
+
+    def nbytes(self):
+        arrays = (self._coords, self._ring_bounds, self._ring_closed, self._piece_points,
+                  self._piece_rings, self._bboxes, self._areas, self._flags, self._groups)
+        return sum(a.nbytes for a in arrays)
+
+    # --- Remplissage ---
+
+    @_mutation
+    def append(self, piece):
+        """Ajoute une SvgPiece aplatie (flat_paths renseigné) et renvoie son indice.
+        Seul le contour est gardé ; `piece.flat_paths` est libéré."""
+        index = self._count
+        if index == len(self._areas):
+            self._grow_rows(2 * index)
+        self._count += 1
+        self.ids.append(piece.element_id)
+        self._index[piece.element_id] = index
+        self._write(index, piece)
+        return index
+
+    @_mutation
+    def extend(self, arrays, pieces):
+        """Inscrit d'un bloc les pièces relues du cache géométrique : `arrays` dans la
+        disposition de GeometryStore.pack (un contour par pièce, tableaux projetés en
+        mémoire), `pieces` les SvgPiece correspondantes. Points, boîtes et aires sont
+        copiés ou calculés en vectoriel, sans objet intermédiaire par pièce."""
+        count = len(pieces)
+        if not count:
+            return
+        coords = arrays["coords"]
+        ring_offsets = np.asarray(arrays["ring_offsets"], dtype=np.int64)
+        ring_closed = arrays["ring_closed"]
+        path_rings = np.asarray(arrays["path_rings"], dtype=np.int64)
+        point_total, ring_total = len(coords), len(ring_offsets) - 1
+
+        i0, p0, r0 = self._count, self._point_count, self._ring_count
+        if i0 + count > len(self._areas):
+            self._grow_rows(max(2 * len(self._areas), i0 + count))
+        if p0 + point_total > len(self._coords):
+            self._coords = self._resized(self._coords, max(2 * len(self._coords), p0 + point_total))
+        if r0 + ring_total > len(self._ring_bounds):
+            capacity = max(2 * len(self._ring_bounds), r0 + ring_total)
+            self._ring_bounds = self._resized(self._ring_bounds, capacity)
+            self._ring_closed = self._resized(self._ring_closed, capacity)
+
+        self._coords[p0:p0 + point_total] = coords
+        self._ring_bounds[r0:r0 + ring_total, 0] = ring_offsets[:-1] + p0
+        self._ring_bounds[r0:r0 + ring_total, 1] = ring_offsets[1:] + p0
+        self._ring_closed[r0:r0 + ring_total] = ring_closed
+        rows = slice(i0, i0 + count)
+        self._piece_rings[rows, 0] = path_rings[:-1] + r0
+        self._piece_rings[rows, 1] = path_rings[1:] + r0
+        piece_points = ring_offsets[path_rings]
+        self._piece_points[rows, 0] = piece_points[:-1] + p0
+        self._piece_points[rows, 1] = piece_points[1:] + p0
+
+        # Boîtes et aires par pièce : réductions sur les plages non vides
+        starts, ends = piece_points[:-1], piece_points[1:]
+        filled = np.flatnonzero(ends > starts)
+        local = self._coords[p0:p0 + point_total]
+        boxes = np.zeros((count, 4), dtype=np.float32)
+        areas = np.zeros(count, dtype=np.float32)
+        if len(filled):
+            boxes[filled, :2] = np.minimum.reduceat(local, starts[filled], axis=0)
+            boxes[filled, 2:] = np.maximum.reduceat(local, starts[filled], axis=0)
+            x = local[:, 0].astype(np.float64)
+            y = local[:, 1].astype(np.float64)
+            nxt = np.arange(1, point_total + 1)
+            ring_starts, ring_ends = ring_offsets[:-1], ring_offsets[1:]
+            closing = ring_ends > ring_starts
+            nxt[ring_ends[closing] - 1] = ring_starts[closing]
+            cross = x * y[nxt] - x[nxt] * y
+            areas[filled] = np.abs(0.5 * np.add.reduceat(cross, starts[filled]))
+        self._bboxes[rows] = boxes
+        self._areas[rows] = areas
+
+        self._point_count += point_total
+        self._ring_count += ring_total
+        self._count += count
+        for offset, piece in enumerate(pieces):
+            self.ids.append(piece.element_id)
+            self._index[piece.element_id] = i0 + offset
+            self._flags[i0 + offset] = FLAG_HAS_OPEN if piece.open_d_strings else 0
+            self._groups[i0 + offset] = self._group(piece.group_id)
+
+    @_mutation
+    def update(self, piece):
+        """Remplace la géométrie d'une pièce existante (même id), ou l'ajoute."""
+        index = self._index.get(piece.element_id)
+        if index is None:
+            return self.append(piece)
+        self._write(index, piece)
+        return index
+
+    @_mutation
+    def remove(self, element_id):
+        index = self._index.pop(element_id, None)
+        if index is not None:
+            self._flags[index] |= FLAG_REMOVED
+            self._release(index)
+            self._compact_if_sparse()
+        return index
+
+    def _write(self, index, piece):
+        outline = piece.flat_paths[0]
+        coords = outline.coords
+        ring_offsets = outline.ring_offsets
+        point_total = len(coords)
+        ring_total = len(ring_offsets) - 1
+
+        p0, p1 = self._piece_points[index]
+        r0, r1 = self._piece_rings[index]
+        if point_total <= p1 - p0 and ring_total <= r1 - r0:
+            # La nouvelle version tient à la place de l'ancienne : réécrite sur place
+            self._lost_points += (p1 - p0) - point_total
+            self._lost_rings += (r1 - r0) - ring_total
+        else:
+            self._release(index)
+            p0, r0 = self._point_count, self._ring_count
+            if p0 + point_total > len(self._coords):
+                self._coords = self._resized(self._coords, max(2 * len(self._coords), p0 + point_total))
+            if r0 + ring_total > len(self._ring_bounds):
+                capacity = max(2 * len(self._ring_bounds), r0 + ring_total)
+                self._ring_bounds = self._resized(self._ring_bounds, capacity)
+                self._ring_closed = self._resized(self._ring_closed, capacity)
+            self._point_count += point_total
+            self._ring_count += ring_total
+        self._coords[p0:p0 + point_total] = coords
+        self._ring_bounds[r0:r0 + ring_total, 0] = ring_offsets[:-1] + p0
+        self._ring_bounds[r0:r0 + ring_total, 1] = ring_offsets[1:] + p0
+        self._ring_closed[r0:r0 + ring_total] = outline.ring_closed
+        self._piece_points[index] = (p0, p0 + point_total)
+        self._piece_rings[index] = (r0, r0 + ring_total)
+
+        if len(coords):
+            self._bboxes[index, :2] = coords.min(axis=0)
+            self._bboxes[index, 2:] = coords.max(axis=0)
+            self._areas[index] = abs(self._signed_area(coords, ring_offsets))
+        else:
+            self._bboxes[index] = 0
+            self._areas[index] = 0
+        self._flags[index] = FLAG_HAS_OPEN if piece.open_d_strings else 0
+        self._groups[index] = self._group(piece.group_id)
+        piece.flat_paths = None
+        self._compact_if_sparse()
+
+    def _release(self, index):
+        """Détache les points et sous-chemins de la pièce, comptés comme perdus."""
+        p0, p1 = self._piece_points[index]
+        r0, r1 = self._piece_rings[index]
+        self._lost_points += p1 - p0
+        self._lost_rings += r1 - r0
+        self._piece_points[index] = 0
+        self._piece_rings[index] = 0
+
+    def _compact_if_sparse(self, min_points=1 << 16):
+        if self._lost_points > max(min_points, self._point_count // 2):
+            self.compact()
+
+    @_mutation
+    def compact(self):
+        """Recopie bout à bout les points des pièces présentes : la place des versions
+        remplacées ou retirées est rendue. Les indices des pièces ne changent pas."""
+        point_total = self._point_count - self._lost_points
+        ring_total = self._ring_count - self._lost_rings
+        coords = np.zeros_like(self._coords)
+        ring_bounds = np.zeros_like(self._ring_bounds)
+        ring_closed = np.zeros_like(self._ring_closed)
+        p = r = 0
+        for index in range(self._count):
+            p0, p1 = self._piece_points[index]
+            r0, r1 = self._piece_rings[index]
+            coords[p:p + p1 - p0] = self._coords[p0:p1]
+            ring_bounds[r:r + r1 - r0] = self._ring_bounds[r0:r1] - p0 + p
+            ring_closed[r:r + r1 - r0] = self._ring_closed[r0:r1]
+            self._piece_points[index] = (p, p + p1 - p0)
+            self._piece_rings[index] = (r, r + r1 - r0)
+            p += p1 - p0
+            r += r1 - r0
+        self._coords, self._ring_bounds, self._ring_closed = coords, ring_bounds, ring_closed
+        self._point_count, self._ring_count = point_total, ring_total
+        self._lost_points = self._lost_rings = 0
+
+    @staticmethod
+    def _signed_area(coords, ring_offsets):
+        """Somme des aires signées des sous-chemins (formule du lacet) : les trous
+        tracés en sens inverse du contour extérieur se retranchent."""
+        x = coords[:, 0].astype(np.float64)
+        y = coords[:, 1].astype(np.float64)
+        # Point suivant dans le même sous-chemin, le dernier rebouclant sur le premier
+        nxt = np.arange(1, len(coords) + 1)
+        nxt[ring_offsets[1:] - 1] = ring_offsets[:-1]
+        return 0.5 * float(np.sum(x * y[nxt] - x[nxt] * y))
+
+    def _group(self, group_id):
+        if group_id is None:
+            return -1
+        index = self._group_index.get(group_id)
+        if index is None:
+            index = self._group_index[group_id] = len(self.group_ids)
+            self.group_ids.append(group_id)
+        return index
+
+    def _grow_rows(self, capacity):
+        self._piece_points = self._resized(self._piece_points, capacity)
+        self._piece_rings = self._resized(self._piece_rings, capacity)
+        self._bboxes = self._resized(self._bboxes, capacity)
+        self._areas = self._resized(self._areas, capacity)
+        self._flags = self._resized(self._flags, capacity)
+        self._groups = self._resized(self._groups, capacity, fill=-1)
+
+    @staticmethod
+    def _resized(array, length, fill=0):
+        grown = np.full((length,) + array.shape[1:], fill, dtype=array.dtype)
+        grown[:len(array)] = array
+        return grown
+
+    # --- Requêtes ---
+
+    def index(self, element_id):
+        """Indice d'une pièce présente, ou None."""
+        return self._index.get(element_id)
+
+    def element_id(self, index):
+        return self.ids[index]
+
+    def bbox(self, index):
+        return tuple(float(v) for v in self._bboxes[index])
+
+    def area(self, index):
+        return float(self._areas[index])
+
+    def rings(self, index):
+        """Sous-chemins du contour de la pièce, chacun en vue float32 (n, 2) sur `coords`."""
+        r0, r1 = self._piece_rings[index]
+        return [self._coords[a:b] for a, b in self._ring_bounds[r0:r1]]
+
+    def outline(self, index):
+        """Sous-chemin le plus étendu du contour (contour extérieur de la pièce)."""
+        rings = self.rings(index)
+        if not rings:
+            return np.zeros((0, 2), dtype=np.float32)
+        return max(rings, key=lambda ring: np.ptp(ring, axis=0).prod() if len(ring) else 0)
+
+    def pack(self, element_ids, version=None):
+        """Contours des pièces `element_ids` dans la disposition de pack_flat_paths
+        (un chemin par pièce), pour le cache géométrique. Peut tourner hors du thread
+        graphique : lu sous verrou, et None si le store a changé depuis `version`."""
+        with self.lock:
+            if version is not None and version != self.version:
+                return None
+            rows = np.fromiter((self._index[element_id] for element_id in element_ids), dtype=np.int64)
+            piece_points = self._piece_points[rows]
+            piece_rings = self._piece_rings[rows]
+            point_counts = piece_points[:, 1] - piece_points[:, 0]
+            ring_counts = piece_rings[:, 1] - piece_rings[:, 0]
+            point_gather, point_starts = self._gather(piece_points[:, 0], point_counts)
+            ring_gather, _ = self._gather(piece_rings[:, 0], ring_counts)
+            # Fin de chaque sous-chemin, ramenée de la place dans le store à la place dans le paquet
+            ring_ends = (
+                self._ring_bounds[ring_gather, 1]
+                - np.repeat(piece_points[:, 0], ring_counts) + np.repeat(point_starts, ring_counts)
+            )
+            coords = self._coords[point_gather]
+            ring_closed = self._ring_closed[ring_gather].astype(np.uint8)
+        path_rings = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(ring_counts, out=path_rings[1:])
+        return {
+            "coords": coords,
+            "ring_offsets": np.concatenate([np.zeros(1, dtype=np.int64), ring_ends]),
+            "ring_closed": ring_closed,
+            "path_rings": path_rings,
+            "piece_paths": np.arange(len(path_rings), dtype=np.int64),
+        }
+
+    @staticmethod
+    def _gather(starts, counts):
+        """Indices des plages [start, start + count) mises bout à bout, et début de chaque
+        plage dans le résultat."""
+        out_starts = np.cumsum(counts) - counts
+        gather = np.arange(int(counts.sum()), dtype=np.int64)
+        gather += np.repeat(starts - out_starts, counts)
+        return gather, out_starts
+
+    def query_rect(self, x0, y0, x1, y1):
+        """Indices (ndarray) des pièces présentes dont la boîte coupe le rectangle."""
+        b = self.bboxes
+        hit = (b[:, 0] <= x1) & (b[:, 2] >= x0) & (b[:, 1] <= y1) & (b[:, 3] >= y0)
+        hit &= (self.flags & FLAG_REMOVED) == 0
+        return np.flatnonzero(hit)
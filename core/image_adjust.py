@@ -0,0 +1,102 @@
+#############################################################   .=<|||>=.   ####
+#|                                                              |(0)|||||      #
+#|   core/image_adjust.py                                       !!!!!!|||
+#|                                                         /||||||||||||/.:::::,
+#|   By: ctrichet <clement.trichet.pro@gmail.com>         |||||||!!!!!!/.:::::::
+#|                                                        ||||||/.::::::::::::::
+#|   Created: 2026/10/18 23:52:10 ctrichet                 \|||/.::::::::::::::'
+#|   Updated: 2026/10/18 23:52:10 ctrichet                      :::......
+#|                                                              :::::(0):      #
+#############################################################   ':::::::'   ####
+
+from collections import namedtuple
+
+import numpy as np
+
+ROW_CHUNK = 128     # lignes par bloc : temporaires bornés, blocs traitables en parallèle
+
+# Réglages d'un calque image, appliqués dans cet ordre :
+#   black, white, gamma  niveaux (entrée ramenée sur [0, 1], puis courbe gamma)
+#   gains                balance des blancs, gain de chaque canal (R, G, B)
+#   contrast             contraste autour du gris moyen
+#   sharpen, radius      netteté (masque flou de rayon `radius` pixels), 0 = désactivée
+ImageAdjustments = namedtuple(
+    "ImageAdjustments",
+    ["black", "white", "gamma", "gains", "contrast", "sharpen", "radius"],
+    defaults=(0, 255, 1.0, (1.0, 1.0, 1.0), 1.0, 0.0, 2),
+)
+NEUTRAL_ADJUSTMENTS = ImageAdjustments()
+
+# Les fonctions ci-dessous travaillent sur des pixels (hauteur, largeur, octets par
+# pixel) uint8, sans Qt. `layout` liste (octet, canal) des composantes couleur, canal
+# 0/1/2 = R/G/B ; les autres octets (alpha, remplissage) sont recopiés tels quels.
+
+
+def point_key(adjustments):
+    """Réglages des étapes ponctuelles (niveaux, balance des blancs, contraste)."""
+    return adjustments[:5]
+
+
+def row_chunks(height, rows=ROW_CHUNK):
+    return [(y0, min(height, y0 + rows)) for y0 in range(0, height, rows)]
+
+
+def point_lut(adjustments):
+    """Table (3, 256) uint8 des étapes ponctuelles, une ligne par canal R, G, B.
+
+    Les trois étapes agissent pixel par pixel : composées en une table, elles ne
+    parcourent l'image qu'une fois."""
+    black, white, gamma, gains, contrast = point_key(adjustments)
+    x = np.arange(256, dtype=np.float32)
+    x = np.clip((x - black) / max(1, white - black), 0, 1) ** np.float32(1 / gamma)
+    lut = x[None, :] * np.asarray(gains, dtype=np.float32)[:, None]
+    lut = (lut - 0.5) * np.float32(contrast) + 0.5
+    return (np.clip(lut, 0, 1) * 255 + 0.5).astype(np.uint8)
+
+
+def apply_lut(src, dst, layout, lut, y0=0, y1=None):
+    """Lignes [y0, y1) de dst = lut(src)."""
+    block, out = src[y0:y1], dst[y0:y1]
+    out[...] = block
+    for offset, channel in layout:
+        np.take(lut[channel], block[..., offset], out=out[..., offset])
+
+
+def unsharp_mask(src, dst, layout, amount, radius, y0=0, y1=None):
+    """Lignes [y0, y1) de dst = src + amount * (src - flou(src)), flou en boîte de
+    rayon `radius` (bords répliqués).
+
+    Le bloc est lu avec `radius` lignes de plus de part et d'autre : le résultat ne
+    dépend pas du découpage en blocs."""
+    height = src.shape[0]
+    y1 = height if y1 is None else y1
+    offsets = [offset for offset, _ in layout]
+    a0, a1 = max(0, y0 - radius), min(height, y1 + radius)
+    color = src[a0:a1][..., offsets].astype(np.float32)
+    padded = np.pad(color, ((radius - (y0 - a0), radius - (a1 - y1)), (radius, radius), (0, 0)), mode="edge")
+
+    # Somme glissante de 2 * radius + 1 termes : différence de deux sommes cumulées
+    k = 2 * radius + 1
+    c = np.cumsum(padded, axis=0, dtype=np.float32)
+    rows = np.concatenate((c[k - 1:k], c[k:] - c[:-k]))
+    c = np.cumsum(rows, axis=1, dtype=np.float32)
+    blurred = np.concatenate((c[:, k - 1:k], c[:, k:] - c[:, :-k]), axis=1) / (k * k)
+
+    sharp = color[y0 - a0:y1 - a0]
+    sharp += np.float32(amount) * (sharp - blurred)
+    out = dst[y0:y1]
+    out[...] = src[y0:y1]
+    out[..., offsets] = np.clip(sharp + 0.5, 0, 255).astype(np.uint8)
+
+
+def gray_world_gains(pixels, layout, adjustments=NEUTRAL_ADJUSTMENTS):
+    """Gains de balance des blancs « monde gris » : la moyenne de chaque canal, mesurée
+    après les niveaux, est ramenée sur celle du vert."""
+    lut = point_lut(adjustments._replace(gains=(1.0, 1.0, 1.0), contrast=1.0))
+    means = {}
+    for offset, channel in layout:
+        histogram = np.bincount(pixels[..., offset].ravel(), minlength=256)
+        means[channel] = float((histogram * lut[channel]).sum() / max(1, histogram.sum()))
+    if len(means) < 3 or min(means.values()) <= 0:
+        return (1.0, 1.0, 1.0)
+    return tuple(round(means[1] / means[channel], 3) for channel in range(3))
@@ -5,58 +5,73 @@
 #|   By: ctrichet <clement.trichet.pro@gmail.com>         |||||||!!!!!!/.:::::::
 #|                                                        ||||||/.::::::::::::::
 #|   Created: 2025/08/12 11:43:00 ctrichet                 \|||/.::::::::::::::'
-#|   Updated: 2025/08/12 11:43:00 ctrichet                      :::......
+#|   Updated: 2026/10/19 10:52:10 ctrichet                      :::......
 #|                                                              :::::(0):      #
 #############################################################   ':::::::'   ####
 from PyQt5.QtWidgets import (
     QGraphicsPathItem, QGraphicsItemGroup, QGraphicsPixmapItem,
     QGraphicsSceneMouseEvent,
 )
-from PyQt5.QtCore import Qt, QPointF
+from PyQt5.QtCore import Qt, QPoint, QPointF
 from PyQt5.QtGui import (
     QPainterPath, QImage, QPixmap, QPainter, QTransform
 )
 from math import radians, cos, sin, atan2, degrees
-from svg.path import parse_path
+import weakref
 
+from core.path_data import parse_path_data
 from utils.debug import debug_log
 
+def painter_path_from_d(d_string):
+    """Construit le QPainterPath d'une chaîne 'd' SVG (arcs compris) en une passe."""
+    path = QPainterPath()
+    if not d_string:
+        return path
+    try:
+        parse_path_data(d_string, path)
+    except ValueError as e:
+        print(f"[ERREUR] Parsing du path SVG échoué : {e}")
+    return path
+
+
+class SharedGeometry:
+    """Poids-mouche : une seule géométrie Qt par chaîne 'd' distincte.
+
+    Le QPainterPath (partagé implicitement par Qt) et le polygone de remplissage sont
+    calculés une fois puis réutilisés par toutes les pièces identiques, le GroupItem
+    source et ses duplicatas. Une entrée disparaît quand plus aucun PathItem ne l'utilise.
+    """
+    __slots__ = ("d_string", "painter_path", "_fill_polygon", "__weakref__")
+    _by_d_string = weakref.WeakValueDictionary()
+
+    def __init__(self, d_string, painter_path):
+        self.d_string = d_string
+        self.painter_path = painter_path
+        self._fill_polygon = None
+
+    @classmethod
+    def get(cls, d_string):
+        geometry = cls._by_d_string.get(d_string)
+        if geometry is None:
+            geometry = cls(d_string, painter_path_from_d(d_string))
+            cls._by_d_string[d_string] = geometry
+        return geometry
+
+    @classmethod
+    def count(cls):
+        return len(cls._by_d_string)
+
+    def fill_polygon(self):
+        if self._fill_polygon is None:
+            self._fill_polygon = self.painter_path.toFillPolygon()
+        return self._fill_polygon
+
+
 class PathItem(QGraphicsPathItem):
     def __init__(self, d_string, parent=None):
-        def parse_svg_path_d(d_string):
-            path = QPainterPath()
-            if not d_string:
-                return path
-            try:
-                svg_path = parse_path(d_string)
-                for e in svg_path:
-                    start = e.start
-                    if path.isEmpty():
-                        path.moveTo(start.real, start.imag)
-                    if e.__class__.__name__ == "Line":
-                        path.lineTo(e.end.real, e.end.imag)
-                    elif e.__class__.__name__ == "CubicBezier":
-                        path.cubicTo(
-                            e.control1.real, e.control1.imag,
-                            e.control2.real, e.control2.imag,
-                            e.end.real, e.end.imag
-                        )
-                    elif e.__class__.__name__ == "QuadraticBezier":
-                        path.quadTo(
-                            e.control.real, e.control.imag,
-                            e.end.real, e.end.imag
-                        )
-                    elif e.__class__.__name__ == "Arc":
-                        path.lineTo(e.end.real, e.end.imag)
-                    else:
-                        path.lineTo(e.end.real, e.end.imag)
-            except Exception as e:
-                print(f"[ERREUR] Parsing du path SVG échoué : {e}")
-            return path
-
-        painter_path = parse_svg_path_d(d_string)
-        super().__init__(painter_path, parent)
-        self.d_string = d_string
+        self.geometry = SharedGeometry.get(d_string)
+        super().__init__(self.geometry.painter_path, parent)
+        self.d_string = self.geometry.d_string
 
 
 class CompositeGroupItem(QGraphicsItemGroup):
@@ -77,20 +92,68 @@ class CompositeGroupItem(QGraphicsItemGroup):
     def shape(self):
         return self.closed_item.path()
 
+    def set_path_items(self, closed_item, open_items):
+        """Remplace les tracés du groupe en gardant l'item lui-même (position, rotation,
+        sélection et liens restent valables). Les nouveaux tracés sont posés en
+        coordonnées locales, comme à la construction ; removeFromGroup / addToGroup
+        tiennent à jour le rectangle englobant du groupe."""
+        for child in self.childItems():
+            self.removeFromGroup(child)
+            if child.scene() is not None:
+                child.scene().removeItem(child)
+        # addToGroup garde la position à l'écran : on place d'abord les tracés là où le
+        # groupe met son origine, ils arrivent ainsi sans décalage en coordonnées locales
+        self.closed_item = closed_item
+        for item in [closed_item] + list(open_items):
+            item.setTransform(self.sceneTransform())
+            self.addToGroup(item)
+
 
 class GroupItem(CompositeGroupItem):
     def __init__(self, element_id, closed_item, open_items=None, parent=None):
         super().__init__(element_id, closed_item, open_items, parent)
         self.duplicata = None
+        self.piece = None
+        self.store_index = None     # ligne de la pièce dans MainWindow.geometry_store
         self.setFlags(self.ItemIsSelectable)
 
+    @staticmethod
+    def path_items_from_piece(piece):
+        """PathItems (contour fermé, traits ouverts) d'une SvgPiece, tracés sur les courbes
+        et arcs exacts des chaînes 'd' ; la version aplatie ne sert qu'au GeometryStore."""
+        items = [PathItem(d) for d in [piece.closed_d] + piece.open_d_strings]
+        return items[0], items[1:]
+
+    @classmethod
+    def from_piece(cls, piece):
+        """Construit la vue Qt d'une SvgPiece (modèle de données sans Qt)."""
+        closed_item, open_items = cls.path_items_from_piece(piece)
+        group_item = cls(piece.element_id, closed_item, open_items)
+        group_item.piece = piece
+        return group_item
+
+    def update_from_piece(self, piece):
+        """Applique une nouvelle version de la pièce (rechargement du SVG) sans recréer
+        l'item : son duplicata éventuel reste sur son calque et suit la nouvelle forme."""
+        self.set_path_items(*self.path_items_from_piece(piece))
+        self.piece = piece
+        if self.duplicata:
+            closed_dup, open_dups = self.path_items_from_piece(piece)
+            self.duplicata.set_path_items(closed_dup, open_dups)
+            self.duplicata.mask()
+
+    def discard_duplicata(self):
+        if self.duplicata:
+            self.duplicata.discard()
+            self.duplicata = None
+
     def duplicate(self, target_view):
         scene = target_view.scene()
         background_id = scene.name
         if self.duplicata:
             if self.duplicata.background_id == background_id:
                 return False
-            self.duplicata.scene().removeItem(self.duplicata)
+            self.discard_duplicata()
         self.duplicata = DuplicataGroupItem(self, background_id)
         self.add_duplicata_to_background(scene)
         return True
@@ -111,6 +174,7 @@ class DuplicataGroupItem(CompositeGroupItem):
 
     def __init__(self, groupItem, background_id, parent=None):
         element_id = f"{groupItem.element_id}_dup"
+        # Géométries partagées avec la source (SharedGeometry) : aucun re-parsing
         closed_dup = PathItem(d_string=groupItem.closed_item.d_string)
         open_items = []
         for item in groupItem.childItems():
@@ -121,6 +185,7 @@ class DuplicataGroupItem(CompositeGroupItem):
 
         super().__init__(element_id, closed_dup, open_items, parent)
         self.background_id = background_id
+        self.store_index = groupItem.store_index
         self.mask_item_pos = groupItem.pos()
         debug_log(f"groupItem.closed_item.boundingRect().topLeft() = {groupItem.closed_item.boundingRect().topLeft()}")
         debug_log(f"groupItem.closed_item.sceneBoundingRect().topLeft() = {groupItem.closed_item.sceneBoundingRect().topLeft()}")
@@ -177,6 +242,14 @@ class DuplicataGroupItem(CompositeGroupItem):
         debug_log(f"[DuplicataGroupItem] 🖱️ Mouse released — actualisation du masque pour {self.element_id}")
         self.mask()
 
+    def discard(self):
+        """Retire le duplicata et son masque des scènes."""
+        if self.mask_item and self.mask_item.scene():
+            self.mask_item.scene().removeItem(self.mask_item)
+        self.mask_item = None
+        if self.scene():
+            self.scene().removeItem(self)
+
     def mask(self):
         def rotate_vector(vec: QPointF, angle_degrees: float) -> QPointF:
             angle_rad = radians(angle_degrees)
@@ -190,7 +263,10 @@ class DuplicataGroupItem(CompositeGroupItem):
             main_window.svg_layer.scene.removeItem(self.mask_item)
 
         image_layer_widget = main_window.image_layer_widgets.get(self.background_id)
-        pixmap = image_layer_widget.background_pixmap
+        background = main_window.layer_memory.acquire(image_layer_widget)   # rechargée si évincée
+        if background is None:
+            self.mask_item = None
+            return  # image encore en décodage : masque posé par ImageLayerWidget.set_image
 
         original_path = self.closed_item.path()
         transformed_path = self.sceneTransform().map(original_path)
@@ -203,7 +279,8 @@ class DuplicataGroupItem(CompositeGroupItem):
         painter.setRenderHint(QPainter.Antialiasing)
         clip_offset = -bounding_rect.topLeft()
         painter.setClipPath(transformed_path.translated(clip_offset))
-        painter.drawPixmap(clip_offset, pixmap)
+        # Ne lit que la zone du duplicata dans le bloc partagé du calque (ImageBuffer)
+        painter.drawImage(QPoint(0, 0), background, bounding_rect)
         painter.end()
 
         masked_pixmap = QPixmap.fromImage(output_image)
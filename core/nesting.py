@@ -5,7 +5,7 @@
 #|   By: ctrichet <clement.trichet.pro@gmail.com>         |||||||!!!!!!/.:::::::
 #|                                                        ||||||/.::::::::::::::
 #|   Created: 2025/08/12 11:43:00 ctrichet                 \|||/.::::::::::::::'
-#|   Updated: 2025/08/12 11:43:00 ctrichet                      :::......
+#|   Updated: 2026/10/19 09:41:05 ctrichet                      :::......
 #|                                                              :::::(0):      #
 #############################################################   ':::::::'   ####
 
@@ -18,13 +18,18 @@ from PyQt5.QtCore import (
 from .model_items import DuplicataGroupItem
 
 
-def approximate_polygon(item: DuplicataGroupItem, simplify_tolerance=0.5) -> Polygon:
-    path = item.closed_item.path()
-    qt_polygon = path.toFillPolygon()
-    if qt_polygon.isEmpty() or qt_polygon.size() < 3:
+def approximate_polygon(item: DuplicataGroupItem, store=None, simplify_tolerance=0.5) -> Polygon:
+    """Polygone shapely du contour. Avec le GeometryStore de la scène (`store`), le
+    contour est lu déjà aplati ; sinon il est recalculé depuis le tracé Qt."""
+    if store is not None and item.store_index is not None:
+        # Contour extérieur déjà aplati dans le GeometryStore : aucun objet Qt parcouru
+        points = store.outline(item.store_index)
+    else:
+        qt_polygon = item.closed_item.geometry.fill_polygon()
+        points = [(pt.x(), pt.y()) for pt in qt_polygon]
+    if len(points) < 3:
         print(f"[WARN] approximation vide pour {item.element_id}")
         return None
-    points = [(pt.x(), pt.y()) for pt in qt_polygon]
     poly = Polygon(points)
     if not poly.is_valid or poly.area == 0:
         return None
@@ -45,11 +50,11 @@ class Individual:
         clone.fitness = self.fitness
         return clone
 
-    def randomize(self, surface_rect, spacing_mm, allowed_rotations):
+    def randomize(self, surface_rect, spacing_mm, allowed_rotations, store=None):
         self.placements = []
         self.polygons = []
         for dup in self.duplicatas:
-            poly = approximate_polygon(dup)
+            poly = approximate_polygon(dup, store)
             if not poly:
                 self.placements.append(None)
                 self.polygons.append(None)
@@ -69,10 +74,11 @@ class NestingEngine:
 
     _instance  = None
 
-    def __init__(self, scene, duplicatas, config, surface_rect, on_update):
+    def __init__(self, scene, duplicatas, config, surface_rect, on_update, store=None):
         if self._instance:
             return self._intance
         self.scene = scene
+        self.store = store      # GeometryStore des pièces : contours lus sans objet Qt
         self.duplicatas = duplicatas
         self.config = config
         self.surface_rect = surface_rect
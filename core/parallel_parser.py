@@ -0,0 +1,111 @@
+#############################################################   .=<|||>=.   ####
+#|                                                              |(0)|||||      #
+#|   core/parallel_parser.py                                    !!!!!!|||
+#|                                                         /||||||||||||/.:::::,
+#|   By: ctrichet <clement.trichet.pro@gmail.com>         |||||||!!!!!!/.:::::::
+#|                                                        ||||||/.::::::::::::::
+#|   Created: 2026/10/18 15:20:31 ctrichet                 \|||/.::::::::::::::'
+#|   Updated: 2026/10/19 10:31:20 ctrichet                      :::......
+#|                                                              :::::(0):      #
+#############################################################   ':::::::'   ####
+
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from core.pieces import SvgPiece
+from core.svg_parser import iter_svg_or_group
+from core.flatten import DEFAULT_TOLERANCE, flatten_path_d, pack_flat_paths, unpack_flat_paths
+from utils.debug import debug_log
+
+PARALLEL_MIN_FILE_SIZE = 1 << 20    # en dessous, le démarrage du pool coûte plus qu'il ne rapporte
+
+# Produit par iter_svg_parallel quand la plage suivante n'est pas encore aplatie :
+# l'appelant rend la main et redemande plus tard
+PENDING = object()
+
+
+def parse_workers(file_size=None):
+    """Nombre de processus pour le parsing. WOODINLAY_SERIAL=1 force le mode série (débogage)."""
+    if os.environ.get("WOODINLAY_SERIAL", "") not in ("", "0"):
+        return 1
+    if file_size is not None and file_size < PARALLEL_MIN_FILE_SIZE:
+        return 1
+    return os.cpu_count() or 1
+
+
+def _flatten_batch(d_lists, tolerance):
+    """Exécuté dans un processus du pool : aplatit les chaînes 'd' de plusieurs pièces.
+    Le résultat est compacté (pack_flat_paths) pour limiter le coût de sérialisation."""
+    cache = {}
+    result = []
+    for d_strings in d_lists:
+        flat_paths = []
+        for d in d_strings:
+            flat = cache.get(d)
+            if flat is None:
+                flat = cache[d] = flatten_path_d(d, tolerance)
+            flat_paths.append(flat)
+        result.append(flat_paths)
+    return pack_flat_paths(result)
+
+
+def iter_svg_parallel(stream, workers, batch_size=256, tolerance=DEFAULT_TOLERANCE):
+    """Même suite de SvgGroup / SvgPiece que iter_svg_or_group, mais pièces déjà aplaties.
+
+    Le XML est lu en flux dans ce processus ; les pièces sont découpées en plages de
+    `batch_size` et aplaties dans un pool de `workers` processus. Les plages sont
+    restituées dans l'ordre du document, groupes compris : l'arborescence construite
+    ensuite est identique à celle du mode série.
+
+    Le générateur n'attend jamais le pool : il produit PENDING après chaque plage lue
+    dont rien n'est encore revenu, et tant que la plage suivante n'est pas aplatie
+    (file pleine, ou fin du document).
+    """
+    # spawn : un fork hériterait de l'état de Qt et des threads du processus graphique
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    max_in_flight = 4 * workers
+    pending = deque()       # (future, noeuds de la plage dans l'ordre du document)
+    current = []
+    current_pieces = []
+
+    def submit():
+        nonlocal current, current_pieces
+        d_lists = [[piece.closed_d] for piece in current_pieces]     # contours (voir flatten_piece)
+        pending.append((pool.submit(_flatten_batch, d_lists, tolerance), current))
+        current, current_pieces = [], []
+
+    def drain():
+        while pending and pending[0][0].done():
+            future, nodes = pending.popleft()
+            flat_results = iter(unpack_flat_paths(future.result()))
+            for node in nodes:
+                if isinstance(node, SvgPiece):
+                    node.flat_paths = next(flat_results)
+            yield from nodes
+
+    debug_log(f"Parsing parallèle sur {workers} processus")
+    try:
+        for node in iter_svg_or_group(stream):
+            current.append(node)
+            if isinstance(node, SvgPiece):
+                current_pieces.append(node)
+                if len(current_pieces) >= batch_size:
+                    submit()
+                    drained = False
+                    for ready in drain():
+                        drained = True
+                        yield ready
+                    if not drained:
+                        yield PENDING   # rend la main entre deux plages lues
+                    while len(pending) > max_in_flight:
+                        yield PENDING
+                        yield from drain()
+        if current:
+            submit()
+        while pending:
+            yield PENDING
+            yield from drain()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,252 @@
+#############################################################   .=<|||>=.   ####
+#|                                                              |(0)|||||      #
+#|   core/path_data.py                                          !!!!!!|||
+#|                                                         /||||||||||||/.:::::,
+#|   By: ctrichet <clement.trichet.pro@gmail.com>         |||||||!!!!!!/.:::::::
+#|                                                        ||||||/.::::::::::::::
+#|   Created: 2026/10/18 13:48:05 ctrichet                 \|||/.::::::::::::::'
+#|   Updated: 2026/10/18 10:03:17 ctrichet                      :::......
+#|                                                              :::::(0):      #
+#############################################################   ':::::::'   ####
+
+import re
+from math import radians, cos, sin, tan, atan2, sqrt, ceil, pi, tau
+
+_NUMBER = r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?"
+_SEGMENT_RE = re.compile(r"([MmZzLlHhVvCcSsQqTtAa])([^MmZzLlHhVvCcSsQqTtAa]*)")
+_NUMBER_RE = re.compile(_NUMBER)
+# Les drapeaux d'arc sont un seul chiffre et peuvent être collés au nombre suivant ("0 011,1")
+_ARC_RE = re.compile(
+    rf"({_NUMBER})[\s,]*({_NUMBER})[\s,]*({_NUMBER})[\s,]*([01])[\s,]*([01])[\s,]*({_NUMBER})[\s,]*({_NUMBER})"
+)
+_STRIDES = {"M": 2, "L": 2, "H": 1, "V": 1, "C": 6, "S": 4, "Q": 4, "T": 2, "A": 7, "Z": 0}
+
+
+def _numbers(args):
+    """Liste des nombres d'un argument de commande. Chemin rapide par split ; l'expression
+    régulière ne sert que pour les cas rares (exposants, "1.5.5", signes +)."""
+    try:
+        return list(map(float, args.replace(",", " ").replace("-", " -").split()))
+    except ValueError:
+        return list(map(float, _NUMBER_RE.findall(args)))
+
+
+def arc_to_cubics(x1, y1, rx, ry, angle, large_arc, sweep, x2, y2):
+    """Convertit un arc elliptique SVG (paramétrage par extrémités) en courbes de Bézier cubiques.
+    Retourne une liste de tuples (c1x, c1y, c2x, c2y, x, y), un par quart d'ellipse au plus."""
+    if x1 == x2 and y1 == y2:
+        return []
+    rx, ry = abs(rx), abs(ry)
+    if rx == 0 or ry == 0:
+        return [(x1, y1, x2, y2, x2, y2)]
+
+    phi = radians(angle % 360)
+    cos_phi, sin_phi = cos(phi), sin(phi)
+    dx2, dy2 = (x1 - x2) / 2, (y1 - y2) / 2
+    x1p = cos_phi * dx2 + sin_phi * dy2
+    y1p = -sin_phi * dx2 + cos_phi * dy2
+
+    # Rayons trop petits : agrandis juste assez pour joindre les extrémités
+    lam = (x1p * x1p) / (rx * rx) + (y1p * y1p) / (ry * ry)
+    if lam > 1:
+        scale = sqrt(lam)
+        rx, ry = rx * scale, ry * scale
+
+    num = rx * rx * ry * ry - rx * rx * y1p * y1p - ry * ry * x1p * x1p
+    den = rx * rx * y1p * y1p + ry * ry * x1p * x1p
+    coef = sqrt(max(0.0, num / den))
+    if large_arc == sweep:
+        coef = -coef
+    cxp = coef * rx * y1p / ry
+    cyp = -coef * ry * x1p / rx
+    cx = cos_phi * cxp - sin_phi * cyp + (x1 + x2) / 2
+    cy = sin_phi * cxp + cos_phi * cyp + (y1 + y2) / 2
+
+    theta1 = atan2((y1p - cyp) / ry, (x1p - cxp) / rx)
+    theta2 = atan2((-y1p - cyp) / ry, (-x1p - cxp) / rx)
+    delta_theta = (theta2 - theta1) % tau
+    if not sweep and delta_theta > 0:
+        delta_theta -= tau
+
+    segments = max(1, ceil(abs(delta_theta) / (pi / 2) - 1e-9))
+    delta = delta_theta / segments
+    t = 4 / 3 * tan(delta / 4)
+
+    # Passage du cercle unité au repère du chemin : rotation phi puis échelle (rx, ry)
+    axx, axy = rx * cos_phi, -ry * sin_phi
+    ayx, ayy = rx * sin_phi, ry * cos_phi
+
+    cubics = []
+    a0 = theta1
+    cos0, sin0 = cos(a0), sin(a0)
+    for i in range(segments):
+        a1 = a0 + delta
+        cos1, sin1 = cos(a1), sin(a1)
+        u1, v1 = cos0 - t * sin0, sin0 + t * cos0
+        u2, v2 = cos1 + t * sin1, sin1 - t * cos1
+        if i == segments - 1:
+            ex, ey = x2, y2
+        else:
+            ex, ey = cx + axx * cos1 + axy * sin1, cy + ayx * cos1 + ayy * sin1
+        cubics.append((
+            cx + axx * u1 + axy * v1, cy + ayx * u1 + ayy * v1,
+            cx + axx * u2 + axy * v2, cy + ayx * u2 + ayy * v2,
+            ex, ey,
+        ))
+        a0, cos0, sin0 = a1, cos1, sin1
+    return cubics
+
+
+def parse_path_data(d_string, path):
+    """Parse une chaîne 'd' SVG en une seule passe et émet directement les commandes
+    dans `path` : un QPainterPath, ou tout objet exposant moveTo / lineTo / quadTo /
+    cubicTo / closeSubpath (voir core.flatten.PolylineBuilder).
+
+    Coordonnées absolues uniquement en sortie ; H/V deviennent des lignes, S/T sont
+    résolus par symétrie et les arcs A sont convertis en cubiques. Lève ValueError
+    si la chaîne est mal formée (ce qui a déjà été émis reste dans `path`).
+    """
+    x = y = start_x = start_y = 0.0
+    cubic_ctrl = quad_ctrl = None     # derniers points de contrôle, pour S et T
+    subpath_open = False
+
+    move_to, line_to = path.moveTo, path.lineTo
+    quad_to, cubic_to = path.quadTo, path.cubicTo
+
+    if _SEGMENT_RE.match(d_string.lstrip()) is None:
+        raise ValueError("la chaîne ne commence pas par une commande")
+
+    for cmd, args in _SEGMENT_RE.findall(d_string):
+        upper = cmd.upper()
+        relative = cmd != upper
+        stride = _STRIDES[upper]
+
+        if stride == 0:
+            if subpath_open:
+                path.closeSubpath()
+            x, y = start_x, start_y
+            subpath_open = False
+            cubic_ctrl = quad_ctrl = None
+            continue
+
+        if upper == "A":
+            values = []
+            for groups in _ARC_RE.findall(args):
+                values.extend(map(float, groups))
+        else:
+            values = _numbers(args)
+        if not values or len(values) % stride:
+            raise ValueError(f"nombre de coordonnées invalide pour {cmd} : {args.strip()!r}")
+
+        if upper == "M":
+            nx, ny = values[0], values[1]
+            if relative:
+                nx += x
+                ny += y
+            move_to(nx, ny)
+            x, y = start_x, start_y = nx, ny
+            subpath_open = True
+            cubic_ctrl = quad_ctrl = None
+            upper = "L"                 # paires suivantes : lineto implicite
+            del values[:2]
+            if not values:
+                continue
+
+        if not subpath_open:
+            # Commande de tracé après un Z : nouveau sous-chemin au point courant
+            move_to(x, y)
+            start_x, start_y = x, y
+            subpath_open = True
+
+        if upper == "L":
+            for k in range(0, len(values), 2):
+                nx, ny = values[k], values[k + 1]
+                if relative:
+                    nx += x
+                    ny += y
+                line_to(nx, ny)
+                x, y = nx, ny
+            cubic_ctrl = quad_ctrl = None
+
+        elif upper == "H":
+            for nx in values:
+                x = nx + x if relative else nx
+                line_to(x, y)
+            cubic_ctrl = quad_ctrl = None
+
+        elif upper == "V":
+            for ny in values:
+                y = ny + y if relative else ny
+                line_to(x, y)
+            cubic_ctrl = quad_ctrl = None
+
+        elif upper == "C":
+            for k in range(0, len(values), 6):
+                x1, y1, x2, y2, nx, ny = values[k:k + 6]
+                if relative:
+                    x1 += x
+                    y1 += y
+                    x2 += x
+                    y2 += y
+                    nx += x
+                    ny += y
+                cubic_to(x1, y1, x2, y2, nx, ny)
+                cubic_ctrl = (x2, y2)
+                x, y = nx, ny
+            quad_ctrl = None
+
+        elif upper == "S":
+            for k in range(0, len(values), 4):
+                if cubic_ctrl is not None:
+                    x1, y1 = 2 * x - cubic_ctrl[0], 2 * y - cubic_ctrl[1]
+                else:
+                    x1, y1 = x, y
+                x2, y2, nx, ny = values[k:k + 4]
+                if relative:
+                    x2 += x
+                    y2 += y
+                    nx += x
+                    ny += y
+                cubic_to(x1, y1, x2, y2, nx, ny)
+                cubic_ctrl = (x2, y2)
+                x, y = nx, ny
+            quad_ctrl = None
+
+        elif upper == "Q":
+            for k in range(0, len(values), 4):
+                x1, y1, nx, ny = values[k:k + 4]
+                if relative:
+                    x1 += x
+                    y1 += y
+                    nx += x
+                    ny += y
+                quad_to(x1, y1, nx, ny)
+                quad_ctrl = (x1, y1)
+                x, y = nx, ny
+            cubic_ctrl = None
+
+        elif upper == "T":
+            for k in range(0, len(values), 2):
+                if quad_ctrl is not None:
+                    x1, y1 = 2 * x - quad_ctrl[0], 2 * y - quad_ctrl[1]
+                else:
+                    x1, y1 = x, y
+                nx, ny = values[k], values[k + 1]
+                if relative:
+                    nx += x
+                    ny += y
+                quad_to(x1, y1, nx, ny)
+                quad_ctrl = (x1, y1)
+                x, y = nx, ny
+            cubic_ctrl = None
+
+        else:   # A
+            for k in range(0, len(values), 7):
+                rx, ry, angle, large_arc, sweep, nx, ny = values[k:k + 7]
+                if relative:
+                    nx += x
+                    ny += y
+                for c1x, c1y, c2x, c2y, ex, ey in arc_to_cubics(x, y, rx, ry, angle, large_arc, sweep, nx, ny):
+                    cubic_to(c1x, c1y, c2x, c2y, ex, ey)
+                x, y = nx, ny
+            cubic_ctrl = quad_ctrl = None
@@ -0,0 +1,51 @@
+#############################################################   .=<|||>=.   ####
+#|                                                              |(0)|||||      #
+#|   core/pieces.py                                             !!!!!!|||
+#|                                                         /||||||||||||/.:::::,
+#|   By: ctrichet <clement.trichet.pro@gmail.com>         |||||||!!!!!!/.:::::::
+#|                                                        ||||||/.::::::::::::::
+#|   Created: 2026/10/18 10:03:17 ctrichet                 \|||/.::::::::::::::'
+#|   Updated: 2026/10/19 11:04:45 ctrichet                      :::......
+#|                                                              :::::(0):      #
+#############################################################   ':::::::'   ####
+
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+
+@dataclass
+class SvgGroup:
+    """Groupe SVG (<svg> racine ou <g>), sans aucune dépendance Qt."""
+    group_id: str
+    group_path: Tuple[str, ...] = ()   # ids des groupes ancêtres, de la racine au parent
+
+    @property
+    def parent_id(self) -> Optional[str]:
+        return self.group_path[-1] if self.group_path else None
+
+
+@dataclass
+class SvgPiece:
+    """Pièce de marqueterie : un contour fermé et ses traits ouverts éventuels.
+
+    Données pures (chaînes et tuples) : picklable à faible coût pour un pool de processus,
+    les items Qt sont construits à partir de ces objets (voir GroupItem.from_piece).
+    """
+    element_id: str
+    closed_d: str
+    open_d_strings: List[str] = field(default_factory=list)
+    group_path: Tuple[str, ...] = ()   # ids des groupes, de la racine au groupe parent
+    flat_paths: Optional[list] = None  # [FlatPath du contour] jusqu'à l'inscription au GeometryStore
+
+    @property
+    def group_id(self) -> Optional[str]:
+        return self.group_path[-1] if self.group_path else None
+
+    def content_key(self):
+        """Tout ce qui définit la pièce hors de son id : deux pièces de même id et de même
+        clé sont identiques (sert au rechargement différentiel, voir core.svg_diff)."""
+        return (self.closed_d, tuple(self.open_d_strings), self.group_path)
+
+    def shape_key(self):
+        """Tracés seuls, sans le groupe (rapprochement des pièces sans id, voir core.svg_diff)."""
+        return (self.closed_d, tuple(self.open_d_strings))
@@ -0,0 +1,70 @@
+#############################################################   .=<|||>=.   ####
+#|                                                              |(0)|||||      #
+#|   core/subtree_index.py                                      !!!!!!|||
+#|                                                         /||||||||||||/.:::::,
+#|   By: ctrichet <clement.trichet.pro@gmail.com>         |||||||!!!!!!/.:::::::
+#|                                                        ||||||/.::::::::::::::
+#|   Created: 2026/10/18 20:41:37 ctrichet                 \|||/.::::::::::::::'
+#|   Updated: 2026/10/18 20:41:37 ctrichet                      :::......
+#|                                                              :::::(0):      #
+#############################################################   ':::::::'   ####
+
+import numpy as np
+
+from core.pieces import SvgGroup
+
+
+class SubtreeIndex:
+    """Feuilles de chaque groupe sous forme de plage contiguë [début, fin).
+
+    Les pièces sont numérotées dans l'ordre d'émission du parseur : une pièce sort à la
+    fermeture de son groupe, donc toutes les pièces d'un sous-arbre sont consécutives
+    (ordre en profondeur). Sélectionner un calque devient une tranche de `leaf_ids`,
+    et « tout est-il déjà sélectionné ? » un test vectoriel sur `selected`.
+    """
+
+    def __init__(self, nodes):
+        self.leaf_ids = []
+        self.position = {}          # element_id -> rang dans leaf_ids
+        self.ranges = {}            # group_id -> (début, fin)
+        starts = {}
+        for node in nodes:
+            if isinstance(node, SvgGroup):
+                starts[node.group_id] = len(self.leaf_ids)
+                self.ranges[node.group_id] = (len(self.leaf_ids), len(self.leaf_ids))
+                continue
+            rank = len(self.leaf_ids)
+            self.position[node.element_id] = rank
+            self.leaf_ids.append(node.element_id)
+            for group_id in node.group_path:
+                self.ranges[group_id] = (starts.get(group_id, rank), rank + 1)
+        self.selected = np.zeros(len(self.leaf_ids), dtype=bool)
+
+    def __len__(self):
+        return len(self.leaf_ids)
+
+    def span(self, element_id):
+        """Plage des feuilles d'un groupe ou d'une pièce, None si l'id est inconnu."""
+        span = self.ranges.get(element_id)
+        if span is None:
+            rank = self.position.get(element_id)
+            if rank is not None:
+                span = (rank, rank + 1)
+        return span
+
+    def leaves(self, start, stop):
+        return self.leaf_ids[start:stop]
+
+    def all_selected(self, start, stop):
+        return bool(self.selected[start:stop].all())
+
+    def set_selected(self, element_ids, selected=True):
+        ranks = [self.position[element_id] for element_id in element_ids if element_id in self.position]
+        self.selected[ranks] = selected
+
+    def set_range_selected(self, start, stop, selected=True):
+        self.selected[start:stop] = selected
+
+    def reset_selection(self, element_ids):
+        self.selected[:] = False
+        self.set_selected(element_ids)
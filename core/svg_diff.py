@@ -0,0 +1,101 @@
+#############################################################   .=<|||>=.   ####
+#|                                                              |(0)|||||      #
+#|   core/svg_diff.py                                           !!!!!!|||
+#|                                                         /||||||||||||/.:::::,
+#|   By: ctrichet <clement.trichet.pro@gmail.com>         |||||||!!!!!!/.:::::::
+#|                                                        ||||||/.::::::::::::::
+#|   Created: 2026/10/18 16:41:09 ctrichet                 \|||/.::::::::::::::'
+#|   Updated: 2026/10/19 11:04:45 ctrichet                      :::......
+#|                                                              :::::(0):      #
+#############################################################   ':::::::'   ####
+
+from collections import deque, namedtuple
+
+from core.pieces import SvgGroup, SvgPiece
+from core.svg_parser import AUTO_ID_PREFIX
+
+# Différence entre deux chargements du même SVG, rapprochés par id :
+#   added_groups    SvgGroup nouveaux (ordre du document, parents avant enfants)
+#   removed_groups  ids des groupes disparus
+#   added           SvgPiece nouvelles
+#   removed         ids des pièces disparues
+#   modified        SvgPiece dont le contenu ou le groupe a changé (nouvelle version)
+#   nodes           nouvelle liste complète ; les pièces inchangées y sont les anciens
+#                   objets, avec leur géométrie déjà aplatie
+SvgDiff = namedtuple("SvgDiff", ["added_groups", "removed_groups", "added", "removed", "modified", "nodes"])
+
+
+def diff_svg_nodes(old_nodes, new_nodes):
+    """Rapproche deux chargements par id. Les pièces sans id dans le fichier (ids auto_,
+    dérivés de la position) sont d'abord rapprochées par leurs tracés : un élément inséré
+    décale les positions de ses frères, qui gardent pourtant leur item et leur duplicata.
+    Une pièce ainsi retrouvée reprend son ancien id."""
+    old_pieces = {}
+    old_groups = {}
+    old_auto = {}       # tracés -> anciennes pièces sans id, dans l'ordre du document
+    for node in old_nodes:
+        if isinstance(node, SvgPiece):
+            old_pieces[node.element_id] = node
+            if node.element_id.startswith(AUTO_ID_PREFIX):
+                old_auto.setdefault(node.shape_key(), deque()).append(node)
+        else:
+            old_groups[node.group_id] = node.group_path
+
+    # Premier passage : pièces sans id retrouvées par leurs tracés
+    matched = {}
+    kept = set()
+    for position, node in enumerate(new_nodes):
+        if isinstance(node, SvgPiece) and node.element_id.startswith(AUTO_ID_PREFIX):
+            candidates = old_auto.get(node.shape_key())
+            if candidates:
+                old = candidates.popleft()
+                matched[position] = old
+                kept.add(old.element_id)
+
+    added_groups, added, modified, nodes = [], [], [], []
+    seen_groups = set()
+    used_ids = set(old_pieces)
+    used_ids.update(node.element_id for node in new_nodes if isinstance(node, SvgPiece))
+    for position, node in enumerate(new_nodes):
+        if isinstance(node, SvgGroup):
+            seen_groups.add(node.group_id)
+            if old_groups.get(node.group_id, None) != node.group_path:
+                added_groups.append(node)
+            nodes.append(node)
+            continue
+
+        old = matched.get(position)
+        if old is not None:
+            node.element_id = old.element_id
+        elif node.element_id in kept:
+            # Id de position repris par une pièce retrouvée ailleurs : nouvel id
+            node.element_id = _unused_id(node.element_id, used_ids)
+        else:
+            old = old_pieces.get(node.element_id)
+            if old is not None:
+                kept.add(old.element_id)
+
+        if old is None:
+            added.append(node)
+        elif old.content_key() != node.content_key():
+            modified.append(node)
+        else:
+            node = old
+        nodes.append(node)
+
+    removed = [element_id for element_id in old_pieces if element_id not in kept]
+    moved_groups = {group.group_id for group in added_groups if group.group_id in old_groups}
+    removed_groups = [
+        group_id for group_id in old_groups
+        if group_id not in seen_groups or group_id in moved_groups
+    ]
+    return SvgDiff(added_groups, removed_groups, added, removed, modified, nodes)
+
+
+def _unused_id(element_id, used_ids):
+    suffix = 1
+    while f"{element_id}-{suffix}" in used_ids:
+        suffix += 1
+    element_id = f"{element_id}-{suffix}"
+    used_ids.add(element_id)
+    return element_id
@@ -0,0 +1,176 @@
+#############################################################   .=<|||>=.   ####
+#|                                                              |(0)|||||      #
+#|   core/svg_loader.py                                         !!!!!!|||
+#|                                                         /||||||||||||/.:::::,
+#|   By: ctrichet <clement.trichet.pro@gmail.com>         |||||||!!!!!!/.:::::::
+#|                                                        ||||||/.::::::::::::::
+#|   Created: 2026/10/18 09:12:44 ctrichet                 \|||/.::::::::::::::'
+#|   Updated: 2026/10/19 11:47:15 ctrichet                      :::......
+#|                                                              :::::(0):      #
+#############################################################   ':::::::'   ####
+
+import os
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import BrokenExecutor
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+from core.svg_parser import open_svg_stream, iter_svg_or_group
+from core.parallel_parser import PENDING, parse_workers, iter_svg_parallel
+from core.pieces import SvgGroup, SvgPiece
+from core.flatten import flatten_piece
+from core.geometry_cache import cached_digest, digest_in_background, load_cached_nodes, store_nodes
+from utils.debug import debug_log
+
+
+class SvgStreamLoader(QObject):
+    """Charge un SVG par lots depuis la boucle d'événements Qt.
+
+    Chaque tick du timer consomme au plus `batch_size` pièces (ou `time_budget_ms`),
+    ajoutées en une insertion groupée (MainWindow.bulk_insert), puis rend la main à Qt
+    avec l'index de la scène, la vue et l'arbre rétablis : la fenêtre reste interactive
+    dès le premier lot. La vue est recadrée au premier lot de pièces et à la fin.
+    Si le fichier (même chemin, date et taille) est déjà dans le cache géométrique, le
+    XML n'est pas relu et les contours passent d'un bloc au GeometryStore ; sinon les
+    pièces sont aplaties au passage, le fichier est haché dans un thread de fond et le
+    cache écrit en fin de chargement.
+    Sur les gros fichiers, l'aplatissement est réparti sur `workers` processus
+    (par défaut : un par cœur, voir parse_workers ; 1 = mode série).
+    """
+    progress = pyqtSignal(int)      # pourcentage du fichier lu
+    finished = pyqtSignal(bool)     # True si terminé, False si annulé ou en erreur
+
+    def __init__(self, svg_file, window, batch_size=500, time_budget_ms=30, workers=None):
+        super().__init__()
+        self.svg_file = svg_file
+        self.window = window
+        self.workers = workers
+        self.batch_size = batch_size
+        self.time_budget_ms = time_budget_ms
+        self.piece_count = 0
+        self.from_cache = False
+        self.digest = None              # empreinte du contenu, si connue à la fin du chargement
+        self._digest_future = None
+        self.nodes = []                 # SvgGroup/SvgPiece chargés, dans l'ordre du document
+        self._flat_cache = {}
+        self._node_count = 0
+        self._node_index = 0
+        self._stream = None
+        self._raw = None
+        self._nodes = None
+        self._file_size = 0
+        self.timer = QTimer()
+        self.timer.timeout.connect(self.next_batch)
+
+    def start(self):
+        try:
+            self.digest = cached_digest(self.svg_file)
+            cached = load_cached_nodes(self.digest) if self.digest else None
+            if cached is not None:
+                debug_log(f"Chargement depuis le cache géométrique ({self.digest})")
+                nodes, arrays = cached
+                self.window.geometry_store.extend(arrays, [node for node in nodes if isinstance(node, SvgPiece)])
+                self.from_cache = True
+                self._node_count = max(len(nodes), 1)
+                self._nodes = iter(nodes)
+            else:
+                debug_log(f"Chargement en flux de {self.svg_file}")
+                self._digest_future = digest_in_background(self.svg_file)
+                self._stream, self._raw = open_svg_stream(self.svg_file)
+                self._file_size = max(os.path.getsize(self.svg_file), 1)
+                workers = self.workers or parse_workers(self._file_size)
+                if workers > 1:
+                    self._nodes = iter_svg_parallel(self._stream, workers)
+                else:
+                    self._nodes = iter_svg_or_group(self._stream)
+        except OSError as e:
+            debug_log(f"[ERROR] Impossible d'ouvrir {self.svg_file} : {e}")
+            self.finished.emit(False)
+            return
+        self.timer.start(0)
+
+    def cancel(self):
+        if self._nodes is None:
+            return
+        debug_log(f"Chargement annulé après {self.piece_count} pièces")
+        if self.from_cache:
+            # Contours inscrits d'avance au GeometryStore : on retire ceux non chargés
+            for node in self._nodes:
+                if isinstance(node, SvgPiece):
+                    self.window.geometry_store.remove(node.element_id)
+        self._close()
+        self.nodes = []
+        self._flat_cache = {}
+        self.finished.emit(False)
+
+    def next_batch(self):
+        window = self.window
+        deadline = time.perf_counter() + self.time_budget_ms / 1000
+        first_pieces = self.piece_count == 0
+        done = False
+        pieces = []         # (SvgPiece, nœud parent) du lot, ajoutées d'un bloc
+        nodes = 0
+
+        try:
+            with window.bulk_insert(fit=False):
+                while len(pieces) < self.batch_size and time.perf_counter() < deadline:
+                    node = next(self._nodes, None)
+                    if node is None:
+                        done = True
+                        break
+                    if node is PENDING:
+                        break       # plage en cours d'aplatissement dans le pool : le timer repassera
+
+                    nodes += 1
+                    self.nodes.append(node)
+                    if isinstance(node, SvgGroup):
+                        # Les pièces lues avant le groupe le précèdent aussi dans l'arbre
+                        window.add_svg_pieces(pieces)
+                        self.piece_count += len(pieces)
+                        pieces = []
+                        window.add_group_to_tree(node.group_id, window.tree_items_by_id.get(node.parent_id))
+                        continue
+
+                    if node.flat_paths is None and not self.from_cache:
+                        flatten_piece(node, cache=self._flat_cache)
+                    pieces.append((node, window.tree_items_by_id.get(node.group_id)))
+                window.add_svg_pieces(pieces)
+                self.piece_count += len(pieces)
+        except (ET.ParseError, OSError, BrokenExecutor) as e:
+            debug_log(f"[ERROR] Impossible de parser {self.svg_file} : {e}")
+            self._close()
+            self.finished.emit(False)
+            return
+
+        if done:
+            debug_log(f"Chargement terminé : {self.piece_count} pièces")
+            self._close()
+            window.svg_layer.fit_view()
+            if not self.from_cache:
+                store_nodes(self._digest_future, self.nodes, window.geometry_store)
+                if self._digest_future.done() and self._digest_future.exception() is None:
+                    self.digest = self._digest_future.result()
+            self._flat_cache = {}
+            self.progress.emit(100)
+            self.finished.emit(True)
+            return
+
+        if first_pieces and self.piece_count:
+            window.svg_layer.fit_view()
+        if self.from_cache:
+            self._node_index += nodes
+            self.progress.emit(int(100 * self._node_index / self._node_count))
+        else:
+            self.progress.emit(int(100 * self._raw.tell() / self._file_size))
+
+    def _close(self):
+        self.timer.stop()
+        if self._nodes is not None:
+            if hasattr(self._nodes, "close"):
+                self._nodes.close()     # générateur iterparse
+            self._nodes = None
+        if self._stream is not None:
+            self._stream.close()
+            self._raw.close()
+            self._stream = self._raw = None
@@ -5,139 +5,205 @@
 #|   By: ctrichet <clement.trichet.pro@gmail.com>         |||||||!!!!!!/.:::::::
 #|                                                        ||||||/.::::::::::::::
 #|   Created: 2025/08/13 13:52:01 ctrichet                 \|||/.::::::::::::::'
-#|   Updated: 2025/08/13 14:12:07 ctrichet                      :::......
+#|   Updated: 2026/10/19 15:02:30 ctrichet                      :::......
 #|                                                              :::::(0):      #
 #############################################################   ':::::::'   ####
 
 import xml.etree.ElementTree as ET
-import uuid
+import gzip
 import re
 
-from core.model_items import GroupItem, PathItem
+from core.pieces import SvgGroup, SvgPiece
 from utils.debug import debug_log
 
-def parse_svg_or_group(svg_file, window):
-    """Parse le fichier SVG et envoie les données à la fenêtre."""
-    debug_log("parse_svg_or_group: START")
-
-    try:
-        tree = ET.parse(svg_file)
-    except Exception as e:
-        debug_log(f"[ERROR] Impossible de parser {svg_file} : {e}")
-        return
-
-    root = tree.getroot()
-
-    # imports locaux pour éviter les cycles
-
-    def ensure_id(elem):
-        if "id" not in elem.attrib:
-            elem.set("id", f"auto_{uuid.uuid4().hex[:8]}")
-        return elem.attrib["id"]
-
-    def is_closed(d):
-        if not d:
-            return False
-        d_cleaned = re.sub(r'[\s,]+', ' ', d.strip()).upper()
-        return bool(re.search(r'M[^MZ]*Z', d_cleaned))
-
-    def process_group_or_svg(group_elem, parent_tree_item=None):
-        group_id = ensure_id(group_elem)
-        tree_item = window.add_group_to_tree(group_id, parent_tree_item)
-
-        closed = []
-        open_ = []
-
-        for child in group_elem:
-            tag = child.tag.lower().split("}")[-1]
-
-            if tag == "g":
-                process_group_or_svg(child, tree_item)
+_GZIP_MAGIC = b"\x1f\x8b"
+
+_IGNORED_TAGS = {
+    "text", "image", "use", "style", "title", "desc", "defs",
+    "clippath", "marker"
+}
+
+
+def open_svg_stream(svg_file):
+    """Ouvre un .svg ou un .svgz (gzip) en lecture binaire, sans décompression sur disque.
+    Retourne (flux_xml, fichier_brut) : le fichier brut sert au suivi de progression."""
+    raw = open(svg_file, "rb")
+    magic = raw.read(2)
+    raw.seek(0)
+    if magic == _GZIP_MAGIC:
+        return gzip.GzipFile(fileobj=raw, mode="rb"), raw
+    return raw, raw
+
+
+AUTO_ID_PREFIX = "auto_"
+
+
+def ensure_id(elem, position=()):
+    """Id de l'élément ; à défaut, sa position dans le document (indices des enfants
+    depuis la racine, ex. auto_0.116.203) : unique, et identique d'un chargement à
+    l'autre tant que rien n'est inséré avant lui (voir core.svg_diff pour le
+    rechargement)."""
+    if "id" not in elem.attrib:
+        elem.set("id", f"{AUTO_ID_PREFIX}{'.'.join(map(str, position))}")
+    return elem.attrib["id"]
+
+
+def is_closed(d):
+    if not d:
+        return False
+    d_cleaned = re.sub(r'[\s,]+', ' ', d.strip()).upper()
+    return bool(re.search(r'M[^MZ]*Z', d_cleaned))
+
+
+def element_to_path_d(tag, attrib):
+    """Convertit une forme SVG simple en chaîne 'd'. Retourne None si la balise n'est pas supportée."""
+    if tag == "path":
+        return attrib.get("d", "")
+
+    if tag == "rect":
+        x = float(attrib.get("x", "0"))
+        y = float(attrib.get("y", "0"))
+        w = float(attrib.get("width", "0"))
+        h = float(attrib.get("height", "0"))
+        return f"M{x},{y} h{w} v{h} h{-w} Z"
+
+    if tag == "circle":
+        cx = float(attrib.get("cx", "0"))
+        cy = float(attrib.get("cy", "0"))
+        r = float(attrib.get("r", "0"))
+        return (
+            f"M{cx - r},{cy} "
+            f"a{r},{r} 0 1,0 {2*r},0 "
+            f"a{r},{r} 0 1,0 {-2*r},0 Z"
+        )
+
+    if tag == "ellipse":
+        cx = float(attrib.get("cx", "0"))
+        cy = float(attrib.get("cy", "0"))
+        rx = float(attrib.get("rx", "0"))
+        ry = float(attrib.get("ry", "0"))
+        return (
+            f"M{cx - rx},{cy} "
+            f"a{rx},{ry} 0 1,0 {2*rx},0 "
+            f"a{rx},{ry} 0 1,0 {-2*rx},0 Z"
+        )
+
+    if tag == "polygon":
+        points = attrib.get("points", "").strip()
+        return f"M{points} Z"
+
+    if tag == "polyline":
+        points = attrib.get("points", "").strip()
+        return f"M{points}"
+
+    if tag == "line":
+        x1 = float(attrib.get("x1", "0"))
+        y1 = float(attrib.get("y1", "0"))
+        x2 = float(attrib.get("x2", "0"))
+        y2 = float(attrib.get("y2", "0"))
+        return f"M{x1},{y1} L{x2},{y2}"
+
+    return None
+
+
+def iter_svg_or_group(stream):
+    """Parcourt le SVG en flux (iterparse) et produit, dans l'ordre du document,
+    des SvgGroup (à l'ouverture du groupe) et des SvgPiece (à sa fermeture, comme
+    dans l'ancien parcours récursif). Aucun objet Qt n'est créé ici.
+    """
+    # Pile des éléments ouverts : dict pour un groupe traité, ("leaf", position) pour un
+    # enfant direct d'un groupe, None pour tout ce qui est sous un élément non parcouru.
+    stack = []
+    # Une seule chaîne en mémoire par tracé répété (motifs dupliqués dans le dessin)
+    d_strings = {}
+
+    for event, elem in ET.iterparse(stream, events=("start", "end")):
+        tag = elem.tag.lower().split("}")[-1]
+
+        if event == "start":
+            if not stack:
+                if tag != "svg":
+                    debug_log("[WARN] Le fichier racine n'est pas un <svg>.")
+                    return
+                group = SvgGroup(ensure_id(elem))
+                stack.append({"path": (group.group_id,), "pos": (), "children": 0, "closed": [], "open": []})
+                yield group
                 continue
 
-            if tag in {
-                "text", "image", "use", "style", "title", "desc", "defs",
-                "clippath", "marker"
-            }:
-                debug_log(f"[IGNORE] Élement ignoré : {tag}")
+            parent = stack[-1]
+            if not isinstance(parent, dict):
+                stack.append(None)
                 continue
 
-            element_id = ensure_id(child)
-            path_d = ""
-
-            if tag == "path":
-                path_d = child.attrib.get("d", "")
-
-            elif tag == "rect":
-                x = float(child.attrib.get("x", "0"))
-                y = float(child.attrib.get("y", "0"))
-                w = float(child.attrib.get("width", "0"))
-                h = float(child.attrib.get("height", "0"))
-                path_d = f"M{x},{y} h{w} v{h} h{-w} Z"
-
-            elif tag == "circle":
-                cx = float(child.attrib.get("cx", "0"))
-                cy = float(child.attrib.get("cy", "0"))
-                r = float(child.attrib.get("r", "0"))
-                path_d = (
-                    f"M{cx - r},{cy} "
-                    f"a{r},{r} 0 1,0 {2*r},0 "
-                    f"a{r},{r} 0 1,0 {-2*r},0 Z"
-                )
-
-            elif tag == "ellipse":
-                cx = float(child.attrib.get("cx", "0"))
-                cy = float(child.attrib.get("cy", "0"))
-                rx = float(child.attrib.get("rx", "0"))
-                ry = float(child.attrib.get("ry", "0"))
-                path_d = (
-                    f"M{cx - rx},{cy} "
-                    f"a{rx},{ry} 0 1,0 {2*rx},0 "
-                    f"a{rx},{ry} 0 1,0 {-2*rx},0 Z"
-                )
-
-            elif tag == "polygon":
-                points = child.attrib.get("points", "").strip()
-                path_d = f"M{points} Z"
-
-            elif tag == "polyline":
-                points = child.attrib.get("points", "").strip()
-                path_d = f"M{points}"
-
-            elif tag == "line":
-                x1 = float(child.attrib.get("x1", "0"))
-                y1 = float(child.attrib.get("y1", "0"))
-                x2 = float(child.attrib.get("x2", "0"))
-                y2 = float(child.attrib.get("y2", "0"))
-                path_d = f"M{x1},{y1} L{x2},{y2}"
-
-            else:
-                debug_log(f"[SKIP] ⛔ Balise non supportée : {tag}")
-                continue
-
-            if not path_d:
-                continue
-
-            item = PathItem(path_d)
-            if is_closed(path_d):
-                closed.append((element_id, item))
+            position = parent["pos"] + (parent["children"],)
+            parent["children"] += 1
+            if tag == "g":
+                group = SvgGroup(ensure_id(elem, position), parent["path"])
+                stack.append({
+                    "path": parent["path"] + (group.group_id,), "pos": position,
+                    "children": 0, "closed": [], "open": [],
+                })
+                yield group
             else:
-                open_.append(item)
-
-        if len(closed) == 0:
-            return
-
-        elif len(closed) > 1:
-            for element_id, closed_item in closed:
-                group_item = GroupItem(element_id, closed_item)
-                window.add_svg_item(group_item, tree_item)
+                stack.append(("leaf", position))
+            continue
+
+        frame = stack.pop()
+
+        if isinstance(frame, dict):
+            closed = frame["closed"]
+            if len(closed) > 1:
+                for element_id, closed_d in closed:
+                    yield SvgPiece(element_id, closed_d, [], frame["path"])
+            elif len(closed) == 1:
+                element_id, closed_d = closed[0]
+                yield SvgPiece(element_id, closed_d, frame["open"], frame["path"])
+            elem.clear()
+            continue
+
+        if frame is None:
+            continue
+
+        group = stack[-1]
+        if tag in _IGNORED_TAGS:
+            debug_log(f"[IGNORE] Élement ignoré : {tag}")
+            elem.clear()
+            continue
+
+        element_id = ensure_id(elem, frame[1])
+        path_d = element_to_path_d(tag, elem.attrib)
+        elem.clear()
+
+        if path_d is None:
+            debug_log(f"[SKIP] ⛔ Balise non supportée : {tag}")
+            continue
+        if not path_d:
+            continue
+        path_d = d_strings.setdefault(path_d, path_d)
+
+        if is_closed(path_d):
+            group["closed"].append((element_id, path_d))
+        else:
+            group["open"].append(path_d)
+
+
+def parse_svg_or_group(svg_file):
+    """Parse le fichier SVG et retourne la liste ordonnée des SvgGroup / SvgPiece.
+    Utilisable sans interface (serveurs de build, pool de processus)."""
+    debug_log("parse_svg_or_group: START")
 
-        elif len(closed) == 1:
-            element_id, closed_item = closed[0]
-            group_item = GroupItem(element_id, closed_item, open_)
-            window.add_svg_item(group_item, tree_item)
+    try:
+        stream, raw = open_svg_stream(svg_file)
+    except OSError as e:
+        debug_log(f"[ERROR] Impossible d'ouvrir {svg_file} : {e}")
+        return []
 
-    if root.tag.lower().endswith("svg"):
-        process_group_or_svg(root, parent_tree_item=None)
-    else:
-        debug_log("[WARN] Le fichier racine n'est pas un <svg>.")
+    nodes = []
+    try:
+        nodes.extend(iter_svg_or_group(stream))
+    except (ET.ParseError, OSError) as e:
+        debug_log(f"[ERROR] Impossible de parser {svg_file} : {e}")
+    finally:
+        stream.close()
+        raw.close()
+    return nodes
@@ -0,0 +1,136 @@
+#############################################################   .=<|||>=.   ####
+#|                                                              |(0)|||||      #
+#|   core/svg_watcher.py                                        !!!!!!|||
+#|                                                         /||||||||||||/.:::::,
+#|   By: ctrichet <clement.trichet.pro@gmail.com>         |||||||!!!!!!/.:::::::
+#|                                                        ||||||/.::::::::::::::
+#|   Created: 2026/10/18 16:58:22 ctrichet                 \|||/.::::::::::::::'
+#|   Updated: 2026/10/19 11:18:30 ctrichet                      :::......
+#|                                                              :::::(0):      #
+#############################################################   ':::::::'   ####
+
+import os
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5.QtCore import QObject, QTimer, QFileSystemWatcher, pyqtSignal
+
+from core.svg_parser import open_svg_stream, iter_svg_or_group
+from core.svg_diff import diff_svg_nodes
+from core.flatten import flatten_piece
+from core.geometry_cache import file_digest, load_cached_nodes
+from utils.debug import debug_log
+
+
+class SvgFileWatcher(QObject):
+    """Surveille le SVG source et ne re-parse que ce qui a changé.
+
+    Après chaque enregistrement (regroupés par `debounce_ms`), le fichier est relu,
+    comparé aux nœuds actuels (diff_svg_nodes) et seules les pièces nouvelles ou
+    modifiées sont aplaties, le tout dans un thread de fond. `reloaded` transporte le
+    SvgDiff à appliquer à la scène ; le cache géométrique de la nouvelle version est
+    écrit une fois le GeometryStore à jour.
+    """
+    reloaded = pyqtSignal(object)   # SvgDiff
+    _read_done = pyqtSignal(object) # (empreinte, SvgDiff) ou None, depuis le thread de lecture
+
+    def __init__(self, svg_file, nodes, digest, debounce_ms=400):
+        super().__init__()
+        self.svg_file = os.path.abspath(svg_file)
+        self.nodes = nodes
+        self.digest = digest
+        self.enabled = False
+        self.watcher = QFileSystemWatcher()
+        self.watcher.fileChanged.connect(self.on_file_changed)
+        self.timer = QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(debounce_ms)
+        self.timer.timeout.connect(self.reload)
+        # Un seul thread : une relecture à la fois, comparée aux nœuds déjà appliqués
+        self._reader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="svg-watcher")
+        self._reading = False
+        self._read_again = False
+        self._read_done.connect(self.on_read_done)
+
+    def set_enabled(self, enabled):
+        self.enabled = enabled
+        if enabled:
+            self._watch()
+        else:
+            self.timer.stop()
+            if self.watcher.files():
+                self.watcher.removePaths(self.watcher.files())
+
+    def _watch(self):
+        # Inkscape enregistre par renommage : le chemin sort alors du watcher
+        if self.svg_file not in self.watcher.files() and os.path.exists(self.svg_file):
+            self.watcher.addPath(self.svg_file)
+
+    def on_file_changed(self, _path):
+        if self.enabled:
+            self._watch()
+            self.timer.start()
+
+    def reload(self):
+        self._watch()
+        if self._reading:
+            self._read_again = True     # enregistrement pendant la relecture : on relira après
+            return
+        self._reading = True
+        future = self._reader.submit(self._read, self.svg_file, self.nodes, self.digest)
+        future.add_done_callback(self._on_read_future)
+
+    # Rappel exécuté dans le thread de lecture : on ne fait que relayer
+    def _on_read_future(self, future):
+        if future.exception() is not None:
+            debug_log(f"[ERROR] Relecture de {self.svg_file} impossible : {future.exception()}")
+            self._read_done.emit(None)
+        else:
+            self._read_done.emit(future.result())
+
+    @staticmethod
+    def _read(svg_file, old_nodes, old_digest):
+        """Thread de lecture : (empreinte, SvgDiff) de la nouvelle version, ou None si le
+        fichier est inchangé ou illisible pour l'instant."""
+        try:
+            digest = file_digest(svg_file)
+            if digest == old_digest:
+                return None
+            cached = load_cached_nodes(digest)
+            nodes = cached[0] if cached is not None else None
+            if nodes is None:
+                stream, raw = open_svg_stream(svg_file)
+                try:
+                    nodes = list(iter_svg_or_group(stream))
+                finally:
+                    stream.close()
+                    raw.close()
+        except ET.ParseError as e:
+            # Fichier en cours d'écriture : le prochain fileChanged relancera la lecture
+            debug_log(f"[WARN] SVG illisible pour l'instant ({e}), rechargement ignoré")
+            return None
+        except OSError as e:
+            debug_log(f"[ERROR] Impossible de relire {svg_file} : {e}")
+            return None
+
+        diff = diff_svg_nodes(old_nodes, nodes)
+        flat_cache = {}
+        for piece in diff.added + diff.modified:
+            if piece.flat_paths is None:
+                flatten_piece(piece, cache=flat_cache)
+        return digest, diff
+
+    def on_read_done(self, result):
+        self._reading = False
+        if result is not None and self.enabled:
+            digest, diff = result
+            self.nodes = diff.nodes
+            self.digest = digest
+            debug_log(
+                f"🔄 SVG rechargé : +{len(diff.added)} -{len(diff.removed)} ~{len(diff.modified)} pièces"
+            )
+            self.reloaded.emit(diff)
+        if self._read_again:
+            self._read_again = False
+            if self.enabled:
+                self.reload()
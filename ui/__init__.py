@@ -5,30 +5,55 @@
 #|   By: ctrichet <clement.trichet.pro@gmail.com>         |||||||!!!!!!/.:::::::
 #|                                                        ||||||/.::::::::::::::
 #|   Created: 2025/08/12 11:43:00 ctrichet                 \|||/.::::::::::::::'
-#|   Updated: 2025/08/12 11:43:00 ctrichet                      :::......
+#|   Updated: 2026/10/18 23:58:30 ctrichet                      :::......
 #|                                                              :::::(0):      #
 #############################################################   ':::::::'   ####
 
 from .main_window import MainWindow
 from .svg_layer import SvgLayerWidget
+from .svg_backdrop import SvgBackdropItem
 from .image_layer import ImageLayerWidget
+from .image_buffer import ImageBuffer
+from .image_pyramid import ImagePyramid, TiledImageItem
+from .image_decoder import ImageDecoder
+from .layer_memory import LayerMemory
+from .image_adjust import ImageAdjuster
+from .pdf_detail import PdfDetailItem
+from .background_scene import BackgroundScene
 from .views import ZoomableView
+from .virtual_scene import PieceVirtualizer
 from .toolbar import CollapsibleToolbar
 from .dialogs import (
-    BackgroundSelectionDialog, NestingConfigDialog, DarkFileDialog
+    BackgroundSelectionDialog, NestingConfigDialog, DarkFileDialog, PdfPagesDialog,
+    ImageAdjustDialog,
 )
 from .tab_bar import CustomTabBar
+from .element_tree import ElementTreeModel, ElementNode
 from .delegates import ColorBackgroundDelegate, TreeItemHighlightDelegate
 
 __all__ = [
     "MainWindow",
     "SvgLayerWidget",
+    "SvgBackdropItem",
     "ImageLayerWidget",
+    "ImageBuffer",
+    "ImagePyramid",
+    "TiledImageItem",
+    "ImageDecoder",
+    "LayerMemory",
+    "ImageAdjuster",
+    "PdfDetailItem",
+    "BackgroundScene",
     "ZoomableView",
+    "PieceVirtualizer",
     "CollapsibleToolbar",
     "BackgroundSelectionDialog",
     "NestingConfigDialog",
+    "PdfPagesDialog",
+    "ImageAdjustDialog",
     "CustomTabBar",
+    "ElementTreeModel",
+    "ElementNode",
     "ColorBackgroundDelegate",
     "TreeItemHighlightDelegate",
     "DarkFileDialog",
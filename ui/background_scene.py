@@ -0,0 +1,75 @@
+#############################################################   .=<|||>=.   ####
+#|                                                              |(0)|||||      #
+#|   ui/background_scene.py                                     !!!!!!|||
+#|                                                         /||||||||||||/.:::::,
+#|   By: ctrichet <clement.trichet.pro@gmail.com>         |||||||!!!!!!/.:::::::
+#|                                                        ||||||/.::::::::::::::
+#|   Created: 2026/10/18 23:57:20 ctrichet                 \|||/.::::::::::::::'
+#|   Updated: 2026/10/19 15:38:05 ctrichet                      :::......
+#|                                                              :::::(0):      #
+#############################################################   ':::::::'   ####
+
+import os
+
+from PyQt5.QtCore import QRectF
+from PyQt5.QtWidgets import QGraphicsScene, QStyleOptionGraphicsItem
+
+
+def use_drawn_background():
+    """Fond en items de scène par défaut ; WOODINLAY_DRAWN_BACKGROUND=1 le fait peindre
+    par drawBackground (BackgroundScene)."""
+    return os.environ.get("WOODINLAY_DRAWN_BACKGROUND", "0") not in ("", "0")
+
+
+class BackgroundItem:
+    """Mixin des items de fond (tuiles, rendus PDF) : posés dans une BackgroundScene,
+    ils n'entrent pas dans la scène et leurs `update()` invalident la couche de fond."""
+
+    background_scene = None
+
+    def update(self, rect=QRectF()):
+        if self.background_scene is None:
+            super().update(rect)
+            return
+        area = self.boundingRect() if rect.isNull() else rect
+        self.background_scene.invalidate(self.mapRectToScene(area), QGraphicsScene.BackgroundLayer)
+
+
+class BackgroundScene(QGraphicsScene):
+    """Scène d'un calque image dont le fond statique est peint dans drawBackground.
+
+    L'index BSP, le tri et le hit-test ne portent que sur les items interactifs
+    (duplicatas) : déplacer une pièce ne repeint que les zones salies, le fond n'y est
+    redessiné que sur le rectangle exposé.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.backgrounds = []       # BackgroundItem peints, du plus bas au plus haut (zValue)
+
+    def add_background(self, item):
+        item.background_scene = self
+        self.backgrounds.append(item)
+        self.backgrounds.sort(key=lambda background: background.zValue())
+        item.update()
+
+    def remove_background(self, item):
+        if item in self.backgrounds:
+            item.update()
+            self.backgrounds.remove(item)
+            item.background_scene = None
+
+    def drawBackground(self, painter, rect):
+        super().drawBackground(painter, rect)
+        option = QStyleOptionGraphicsItem()
+        for item in self.backgrounds:
+            if not item.isVisible():
+                continue
+            exposed = item.mapRectFromScene(rect).intersected(item.boundingRect())
+            if exposed.isEmpty():
+                continue
+            option.exposedRect = exposed
+            painter.save()
+            painter.setTransform(item.sceneTransform(), True)
+            item.paint(painter, option, None)
+            painter.restore()
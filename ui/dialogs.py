@@ -5,7 +5,7 @@
 #|   By: ctrichet <clement.trichet.pro@gmail.com>         |||||||!!!!!!/.:::::::
 #|                                                        ||||||/.::::::::::::::
 #|   Created: 2025/08/12 11:43:00 ctrichet                 \|||/.::::::::::::::'
-#|   Updated: 2025/08/12 11:43:00 ctrichet                      :::......
+#|   Updated: 2026/10/18 23:55:40 ctrichet                      :::......
 #|                                                              :::::(0):      #
 #############################################################   ':::::::'   ####
 
@@ -13,12 +13,14 @@ import os
 from PyQt5.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLabel, QSpinBox, QFileDialog, QListView,
     QDoubleSpinBox, QComboBox, QPushButton, QDialogButtonBox,QTreeView,
-    QLineEdit, QMessageBox,
+    QLineEdit, QMessageBox, QSlider,
 )
 from PyQt5.QtGui import QPalette, QColor
 from PyQt5.QtCore import Qt
 
 from .delegates import ColorBackgroundDelegate
+from .image_decoder import layer_display_name
+from core.image_adjust import NEUTRAL_ADJUSTMENTS
 
 class NestingConfigDialog(QDialog):
     def __init__(self, parent=None):
@@ -112,6 +114,142 @@ class NestingConfigDialog(QDialog):
         }
 
 
+class PdfPagesDialog(QDialog):
+    """Pages d'un PDF à importer, chacune comme un calque image."""
+
+    def __init__(self, pdf_path, page_count, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Importer un PDF")
+        layout = QVBoxLayout(self)
+        layout.addWidget(QLabel(f"{os.path.basename(pdf_path)} : {page_count} pages", self))
+
+        h_range = QHBoxLayout()
+        h_range.addWidget(QLabel("De la page"))
+        self.first_spin = QSpinBox()
+        self.first_spin.setRange(1, page_count)
+        self.first_spin.setValue(1)
+        h_range.addWidget(self.first_spin)
+        h_range.addWidget(QLabel("à"))
+        self.last_spin = QSpinBox()
+        self.last_spin.setRange(1, page_count)
+        self.last_spin.setValue(page_count)
+        h_range.addWidget(self.last_spin)
+        layout.addLayout(h_range)
+
+        button_box = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel, self)
+        button_box.accepted.connect(self.accept)
+        button_box.rejected.connect(self.reject)
+        layout.addWidget(button_box)
+
+    def get_page_numbers(self):
+        """Pages choisies (numérotées depuis 0), ou None si annulé."""
+        if self.exec_() != QDialog.Accepted:
+            return None
+        first, last = sorted((self.first_spin.value(), self.last_spin.value()))
+        return list(range(first - 1, last))
+
+
+class ImageAdjustDialog(QDialog):
+    """Réglages d'un calque image, appliqués en direct (fenêtre non modale).
+
+    Chaque mouvement de curseur passe les réglages au calque, qui les calcule en tâche
+    de fond (ImageAdjuster) : les aperçus et les masques des duplicatas suivent."""
+
+    # (champ, libellé, minimum, maximum, diviseur entre curseur et valeur)
+    SLIDERS = (
+        ("black", "Noir", 0, 254, 1),
+        ("white", "Blanc", 1, 255, 1),
+        ("gamma", "Gamma", 20, 500, 100),
+        ("red", "Gain rouge", 50, 200, 100),
+        ("green", "Gain vert", 50, 200, 100),
+        ("blue", "Gain bleu", 50, 200, 100),
+        ("contrast", "Contraste", 25, 300, 100),
+        ("sharpen", "Netteté", 0, 300, 100),
+        ("radius", "Rayon", 1, 10, 1),
+    )
+
+    def __init__(self, layer_widget, parent=None):
+        super().__init__(parent)
+        self.layer_widget = layer_widget
+        self.setWindowTitle(f"Réglages : {layer_display_name(layer_widget.image_path)}")
+        self.setMinimumWidth(360)
+        layout = QVBoxLayout(self)
+
+        self.sliders = {}
+        self.value_labels = {}
+        for name, label, low, high, _ in self.SLIDERS:
+            row = QHBoxLayout()
+            caption = QLabel(label)
+            caption.setMinimumWidth(80)
+            row.addWidget(caption)
+            slider = QSlider(Qt.Horizontal)
+            slider.setRange(low, high)
+            slider.valueChanged.connect(self.on_slider_changed)
+            row.addWidget(slider)
+            value_label = QLabel()
+            value_label.setMinimumWidth(40)
+            row.addWidget(value_label)
+            layout.addLayout(row)
+            self.sliders[name] = slider
+            self.value_labels[name] = value_label
+
+        btns = QHBoxLayout()
+        auto_btn = QPushButton("Balance auto")
+        auto_btn.clicked.connect(self.auto_white_balance)
+        reset_btn = QPushButton("Réinitialiser")
+        reset_btn.clicked.connect(lambda: self.set_adjustments(NEUTRAL_ADJUSTMENTS))
+        close_btn = QPushButton("Fermer")
+        close_btn.clicked.connect(self.close)
+        btns.addWidget(auto_btn)
+        btns.addWidget(reset_btn)
+        btns.addWidget(close_btn)
+        layout.addLayout(btns)
+
+        self.set_adjustments(layer_widget.adjustments, apply=False)
+
+    def _values(self):
+        return {
+            name: self.sliders[name].value() / scale
+            for name, _, _, _, scale in self.SLIDERS
+        }
+
+    def get_adjustments(self):
+        v = self._values()
+        return NEUTRAL_ADJUSTMENTS._replace(
+            black=int(v["black"]), white=int(v["white"]), gamma=v["gamma"],
+            gains=(v["red"], v["green"], v["blue"]), contrast=v["contrast"],
+            sharpen=v["sharpen"], radius=int(v["radius"]),
+        )
+
+    def set_adjustments(self, adjustments, apply=True):
+        values = adjustments._asdict()
+        values["red"], values["green"], values["blue"] = adjustments.gains
+        for name, _, _, _, scale in self.SLIDERS:
+            slider = self.sliders[name]
+            slider.blockSignals(True)
+            slider.setValue(round(values[name] * scale))
+            slider.blockSignals(False)
+        self.update_value_labels()
+        if apply:
+            self.layer_widget.set_adjustments(self.get_adjustments())
+
+    def update_value_labels(self):
+        for name, value in self._values().items():
+            scale = next(s for n, _, _, _, s in self.SLIDERS if n == name)
+            self.value_labels[name].setText(f"{value:.2f}" if scale > 1 else f"{value:.0f}")
+
+    def on_slider_changed(self):
+        self.update_value_labels()
+        self.layer_widget.set_adjustments(self.get_adjustments())
+
+    def auto_white_balance(self):
+        gains = self.layer_widget.auto_white_balance(self.get_adjustments())
+        if gains is None:
+            DarkMessageBox.warning(self, "Balance auto", "Image non disponible (en cours de chargement).")
+            return
+        self.set_adjustments(self.get_adjustments()._replace(gains=gains))
+
+
 class BackgroundSelectionDialog(QDialog):
     def __init__(self, image_layer_widgets, parent=None):
         super().__init__(parent)
@@ -126,7 +264,7 @@ class BackgroundSelectionDialog(QDialog):
         self.layer_colors = []
 
         for path, layer in image_layer_widgets.items():
-            basename = os.path.basename(path)
+            basename = layer_display_name(path)
             color = layer.margin_color
             self.combo.addItem(basename, userData=path)
             self.layer_colors.append(color)
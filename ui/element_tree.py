@@ -0,0 +1,323 @@
+#############################################################   .=<|||>=.   ####
+#|                                                              |(0)|||||      #
+#|   ui/element_tree.py                                         !!!!!!|||
+#|                                                         /||||||||||||/.:::::,
+#|   By: ctrichet <clement.trichet.pro@gmail.com>         |||||||!!!!!!/.:::::::
+#|                                                        ||||||/.::::::::::::::
+#|   Created: 2026/10/18 19:48:03 ctrichet                 \|||/.::::::::::::::'
+#|   Updated: 2026/10/19 12:31:50 ctrichet                      :::......
+#|                                                              :::::(0):      #
+#############################################################   ':::::::'   ####
+
+from PyQt5.QtCore import Qt, QAbstractItemModel, QModelIndex, QItemSelection
+from PyQt5.QtGui import QBrush, QColor
+
+FETCH_BATCH = 1000          # lignes exposées à la vue par fetchMore
+SelectedRole = Qt.UserRole + 1
+
+
+class ElementNode:
+    """Nœud de l'arbre des éléments (groupe ou pièce), sans objet Qt."""
+    __slots__ = ("element_id", "parent", "children", "row", "is_group",
+                 "background", "colored", "layers", "selected", "highlight", "fetched", "hot")
+
+    def __init__(self, element_id, parent=None, is_group=False):
+        self.element_id = element_id
+        self.parent = parent
+        self.children = []
+        self.row = 0                # position dans parent.children
+        self.is_group = is_group
+        self.background = None      # QColor ou None
+        self.colored = 0            # nombre d'enfants ayant une couleur de fond
+        self.layers = None          # nom de couleur -> nombre d'enfants de cette couleur
+        self.selected = False
+        self.highlight = 0          # nombre de racines surlignées qui couvrent le nœud
+        self.fetched = 0            # nombre d'enfants déjà exposés à la vue
+        self.hot = False            # la vue a déjà parcouru ce nœud : ajouts exposés tout de suite
+
+
+class ElementTreeModel(QAbstractItemModel):
+    """Modèle de l'arbre « Éléments SVG » sur la hiérarchie parsée.
+
+    Les enfants d'un nœud ne deviennent des lignes qu'au dépliage (canFetchMore /
+    fetchMore, par paquets de FETCH_BATCH) : un calque de 50 000 pièces jamais ouvert
+    ne coûte qu'un ElementNode par élément. Couleur de fond et sélection sont portées
+    par les nœuds (BackgroundRole, SelectedRole), y compris pour les lignes pas encore
+    exposées ; la vue les retrouve à l'exposition (voir MainWindow.on_tree_rows_inserted).
+    Le surlignage de la sélection se superpose à la couleur de fond sans la remplacer :
+    elle réapparaît telle que les calques l'ont laissée quand le surlignage s'en va.
+
+    Un groupe dont tous les enfants sont colorés prend leur couleur (gris #888888 si
+    elles diffèrent). Chaque nœud compte ses enfants colorés par couleur : colorer une
+    pièce ne remonte que la chaîne de ses ancêtres, et s'arrête dès qu'un ancêtre ne
+    change pas.
+    """
+
+    def __init__(self, title="Éléments SVG", parent=None):
+        super().__init__(parent)
+        self.title = title
+        self.root = ElementNode(None, is_group=True)
+        self.root.hot = True
+        self.nodes = {}             # element_id -> ElementNode
+        self.selected = set()       # nœuds sélectionnés, exposés ou non
+        self.highlight_color = QColor("#a8d5ff")
+
+    # --- Construction ---
+
+    def add_node(self, element_id, parent_node=None, is_group=False):
+        node = ElementNode(element_id, is_group=is_group)
+        self._attach(node, parent_node or self.root)
+        self.nodes[element_id] = node
+        return node
+
+    def remove_node(self, node):
+        self._detach(node)
+        self.selected.discard(node)
+        if self.nodes.get(node.element_id) is node:
+            del self.nodes[node.element_id]
+
+    def move_node(self, node, new_parent=None):
+        """Rattache un nœud (et son sous-arbre) à un autre parent, en dernière position."""
+        new_parent = new_parent or self.root
+        if node.parent is not new_parent:
+            self._detach(node)
+            self._attach(node, new_parent)
+
+    def _attach(self, node, parent):
+        node.parent = parent
+        self._count_child(parent, node.background, 1)
+        node.row = len(parent.children)
+        if parent.hot and parent.fetched == node.row and self._is_exposed(parent):
+            self.beginInsertRows(self.index_of(parent), node.row, node.row)
+            parent.children.append(node)
+            parent.fetched += 1
+            self.endInsertRows()
+        else:
+            parent.children.append(node)
+        self._recolor(parent)
+
+    def _detach(self, node):
+        parent = node.parent
+        exposed = node.row < parent.fetched and self._is_exposed(parent)
+        if exposed:
+            self.beginRemoveRows(self.index_of(parent), node.row, node.row)
+        del parent.children[node.row]
+        for row in range(node.row, len(parent.children)):
+            parent.children[row].row = row
+        if node.row < parent.fetched:
+            parent.fetched -= 1
+        if exposed:
+            self.endRemoveRows()
+        node.parent = None
+        self._count_child(parent, node.background, -1)
+        self._recolor(parent)
+
+    def set_background(self, node, color):
+        """Colore un nœud puis recalcule la couleur de ses ancêtres, en O(profondeur)."""
+        self._store_background(node, color)
+        self._recolor(node.parent)
+
+    def _store_background(self, node, color):
+        if node.parent is not None:
+            self._count_child(node.parent, node.background, -1)
+            self._count_child(node.parent, color, 1)
+        node.background = color
+        if self._is_exposed(node):
+            index = self.index_of(node)
+            self.dataChanged.emit(index, index, [Qt.BackgroundRole])
+
+    @staticmethod
+    def _count_child(parent, color, delta):
+        if color is None:
+            return
+        if parent.layers is None:
+            parent.layers = {}
+        name = color.name()
+        count = parent.layers.get(name, 0) + delta
+        if count:
+            parent.layers[name] = count
+        else:
+            del parent.layers[name]
+        parent.colored += delta
+
+    def _recolor(self, parent):
+        """Remonte depuis `parent` tant que la couleur déduite des enfants change."""
+        while parent is not None and parent is not self.root:
+            if parent.children and parent.colored == len(parent.children):
+                names = parent.layers
+                color = QColor(next(iter(names))) if len(names) == 1 else QColor("#888888")
+            else:
+                color = None
+            current = parent.background
+            if (color is None) == (current is None) and (color is None or color == current):
+                return
+            self._store_background(parent, color)
+            parent = parent.parent
+
+    def clear_backgrounds(self):
+        for node in self.nodes.values():
+            if node.background is not None:
+                self.set_background(node, None)
+
+    def set_node_selected(self, node, selected):
+        node.selected = selected
+        if selected:
+            self.selected.add(node)
+        else:
+            self.selected.discard(node)
+
+    def set_highlighted(self, nodes, highlighted):
+        """Ajoute (ou retire) une racine surlignée au-dessus de chacun des `nodes`."""
+        delta = 1 if highlighted else -1
+        for node in nodes:
+            if not highlighted and not node.highlight:
+                continue    # rattaché au sous-arbre après le surlignage
+            node.highlight += delta
+            if node.highlight == (1 if highlighted else 0) and self._is_exposed(node):
+                index = self.index_of(node)
+                self.dataChanged.emit(index, index, [Qt.BackgroundRole])
+
+    def set_selected_nodes(self, nodes):
+        """Remplace la sélection portée par le modèle."""
+        for node in self.selected:
+            node.selected = False
+        self.selected = set(nodes)
+        for node in self.selected:
+            node.selected = True
+
+    # --- Parcours ---
+
+    def leaf_nodes(self, node):
+        """Nœuds sans enfant du sous-arbre (itératif : hiérarchies profondes)."""
+        stack = [node]
+        leaves = []
+        while stack:
+            current = stack.pop()
+            if current.children:
+                stack.extend(reversed(current.children))
+            else:
+                leaves.append(current)
+        return leaves
+
+    def subtree_nodes(self, node):
+        """Nœuds du sous-arbre, chaque parent avant ses descendants."""
+        stack = [node]
+        nodes = []
+        while stack:
+            current = stack.pop()
+            nodes.append(current)
+            stack.extend(reversed(current.children))
+        return nodes
+
+    def _is_exposed(self, node):
+        while node is not self.root:
+            parent = node.parent
+            if parent is None or node.row >= parent.fetched:
+                return False
+            node = parent
+        return True
+
+    def index_of(self, node):
+        """QModelIndex du nœud, invalide si la racine ou si la ligne n'est pas exposée."""
+        if node is None or node is self.root or not self._is_exposed(node):
+            return QModelIndex()
+        return self.createIndex(node.row, 0, node)
+
+    def selection_for(self, nodes):
+        """QItemSelection des nœuds exposés parmi `nodes`, une plage par suite de lignes
+        consécutives (l'exposition est vérifiée une fois par parent)."""
+        exposed = {self.root: True}
+        rows_by_parent = {}
+        for node in nodes:
+            parent = node.parent
+            if parent is None or node.row >= parent.fetched:
+                continue
+            visible = exposed.get(parent)
+            if visible is None:
+                visible = exposed[parent] = self._is_exposed(parent)
+            if visible:
+                rows_by_parent.setdefault(parent, []).append(node.row)
+
+        selection = QItemSelection()
+        for parent, rows in rows_by_parent.items():
+            rows.sort()
+            start = previous = rows[0]
+            for row in rows[1:] + [None]:
+                if row == previous + 1:
+                    previous = row
+                    continue
+                selection.select(
+                    self.createIndex(start, 0, parent.children[start]),
+                    self.createIndex(previous, 0, parent.children[previous]),
+                )
+                start = previous = row
+        return selection
+
+    def node_from_index(self, index):
+        return index.internalPointer() if index.isValid() else self.root
+
+    # --- QAbstractItemModel ---
+
+    def index(self, row, column, parent=QModelIndex()):
+        node = self.node_from_index(parent)
+        if column != 0 or row < 0 or row >= node.fetched:
+            return QModelIndex()
+        return self.createIndex(row, 0, node.children[row])
+
+    def parent(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        parent = index.internalPointer().parent
+        if parent is None or parent is self.root:
+            return QModelIndex()
+        return self.createIndex(parent.row, 0, parent)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        return self.node_from_index(parent).fetched
+
+    def columnCount(self, parent=QModelIndex()):
+        return 1
+
+    def hasChildren(self, parent=QModelIndex()):
+        return bool(self.node_from_index(parent).children)
+
+    def canFetchMore(self, parent):
+        node = self.node_from_index(parent)
+        return node.fetched < len(node.children)
+
+    def fetchMore(self, parent):
+        node = self.node_from_index(parent)
+        node.hot = True
+        remaining = len(node.children) - node.fetched
+        if remaining <= 0:
+            return
+        count = min(remaining, FETCH_BATCH)
+        self.beginInsertRows(parent, node.fetched, node.fetched + count - 1)
+        node.fetched += count
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        node = index.internalPointer()
+        if role in (Qt.DisplayRole, Qt.UserRole):
+            return node.element_id
+        if role == Qt.BackgroundRole:
+            if node.highlight:
+                return QBrush(self.highlight_color)
+            return QBrush(node.background) if node.background is not None else None
+        if role == SelectedRole:
+            return node.selected
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole and section == 0:
+            return self.title
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
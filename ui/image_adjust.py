@@ -0,0 +1,273 @@
+#############################################################   .=<|||>=.   ####
+#|                                                              |(0)|||||      #
+#|   ui/image_adjust.py                                         !!!!!!|||
+#|                                                         /||||||||||||/.:::::,
+#|   By: ctrichet <clement.trichet.pro@gmail.com>         |||||||!!!!!!/.:::::::
+#|                                                        ||||||/.::::::::::::::
+#|   Created: 2026/10/18 23:54:30 ctrichet                 \|||/.::::::::::::::'
+#|   Updated: 2026/10/18 23:54:30 ctrichet                      :::......
+#|                                                              :::::(0):      #
+#############################################################   ':::::::'   ####
+
+import os
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+from PyQt5.QtGui import QImage
+
+from core.image_adjust import (
+    NEUTRAL_ADJUSTMENTS, point_key, point_lut, apply_lut, unsharp_mask, row_chunks,
+)
+from ui.image_buffer import ImageBuffer
+from ui.image_pyramid import ImagePyramid
+from utils.debug import debug_log
+
+PREVIEW_SIZE = 2048     # plus grand côté de l'aperçu calculé avant la pleine résolution
+ADJUST_CACHE_SIZE = 2   # résultats gardés par étape (jeux de réglages récents)
+
+_chunk_pool = None      # blocs de lignes traités en parallèle (NumPy relâche le GIL)
+
+
+def _chunks():
+    global _chunk_pool
+    if _chunk_pool is None:
+        _chunk_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 1)
+    return _chunk_pool
+
+
+def pixel_layout(fmt):
+    """(octets par pixel, [(octet, canal)]) d'un format QImage ; None si non géré."""
+    if fmt in (QImage.Format_RGB32, QImage.Format_ARGB32, QImage.Format_ARGB32_Premultiplied):
+        # 0xAARRGGBB en entier natif
+        if sys.byteorder == "little":
+            return 4, [(2, 0), (1, 1), (0, 2)]
+        return 4, [(1, 0), (2, 1), (3, 2)]
+    if fmt in (QImage.Format_RGBA8888, QImage.Format_RGBX8888, QImage.Format_RGBA8888_Premultiplied):
+        return 4, [(0, 0), (1, 1), (2, 2)]
+    if fmt == QImage.Format_RGB888:
+        return 3, [(0, 0), (1, 1), (2, 2)]
+    if fmt == QImage.Format_Grayscale8:
+        return 1, [(0, 1)]
+    return None
+
+
+def image_pixels(image, writable=False):
+    """Vue NumPy (hauteur, largeur, octets par pixel) sur les pixels d'une QImage, et son
+    layout ; (None, None) si le format n'est pas géré."""
+    layout = pixel_layout(image.format())
+    if layout is None:
+        return None, None
+    bpp, channels = layout
+    bits = image.bits() if writable else image.constBits()
+    bits.setsize(image.sizeInBytes())
+    rows = np.frombuffer(bits, dtype=np.uint8).reshape(image.height(), image.bytesPerLine())
+    return rows[:, :image.width() * bpp].reshape(image.height(), image.width(), bpp), channels
+
+
+def _stages(adjustments, scale=1):
+    """Étapes à appliquer pour `adjustments`, sur une image réduite d'un facteur `scale`.
+    La netteté d'un rayon inférieur au pixel de l'image réduite est omise."""
+    stages = []
+    if point_key(adjustments) != point_key(NEUTRAL_ADJUSTMENTS):
+        lut = point_lut(adjustments)
+        stages.append(lambda src, dst, layout, y0, y1: apply_lut(src, dst, layout, lut, y0, y1))
+    radius = round(adjustments.radius / scale)
+    if adjustments.sharpen > 0 and radius >= 1:
+        amount = adjustments.sharpen
+        stages.append(lambda src, dst, layout, y0, y1: unsharp_mask(src, dst, layout, amount, radius, y0, y1))
+    return stages
+
+
+def _run_stage(source, stage, stop=None):
+    """Nouveau bloc = stage(source), par blocs de lignes en parallèle ; None si `stop()`
+    devient vrai en cours de route."""
+    if pixel_layout(source.format) is None:
+        source = ImageBuffer.from_image(source.image.convertToFormat(QImage.Format_ARGB32))
+    bpp, layout = pixel_layout(source.format)
+    result = ImageBuffer(source.width, source.height, source.format)
+    src = source.array[:, :source.width * bpp].reshape(source.height, source.width, bpp)
+    dst = result.array[:, :result.width * bpp].reshape(result.height, result.width, bpp)
+
+    def work(rows):
+        if stop is not None and stop():
+            return False
+        stage(src, dst, layout, *rows)
+        return True
+
+    if not all(_chunks().map(work, row_chunks(source.height))):
+        return None
+    return result
+
+
+def adjust_image(image, adjustments):
+    """Copie réglée d'une QImage de taille modeste (rendus PDF de détail), calculée
+    dans le thread appelant."""
+    if pixel_layout(image.format()) is None:
+        image = image.convertToFormat(QImage.Format_ARGB32)
+    src, layout = image_pixels(image)
+    for stage in _stages(adjustments):
+        result = QImage(image.size(), image.format())
+        dst, _ = image_pixels(result, writable=True)
+        stage(src, dst, layout, 0, image.height())
+        image, src = result, dst
+    return image
+
+
+class _AdjustJob(QRunnable):
+    def __init__(self, adjuster, generation, adjustments):
+        super().__init__()
+        self.adjuster = adjuster
+        self.generation = generation
+        self.adjustments = adjustments
+
+    def run(self):
+        try:
+            self.adjuster._run(self.generation, self.adjustments)
+        except RuntimeError:
+            pass    # calque fermé pendant le calcul
+
+
+class ImageAdjuster(QObject):
+    """Prétraitement d'un calque image (niveaux, balance des blancs, contraste,
+    netteté) calculé en tâche de fond, par opérations NumPy vectorisées sur le bloc
+    de pixels.
+
+    Chaque demande produit d'abord un aperçu sur un niveau réduit de la pyramide
+    (`previewed`), puis l'image pleine résolution (`adjusted`). Les résultats sont gardés
+    par jeu de réglages et par étape : ne bouger que la netteté repart du résultat des
+    étapes ponctuelles déjà calculé. Une demande plus récente abandonne la précédente
+    entre deux blocs de lignes.
+    """
+
+    previewed = pyqtSignal(object, object)          # réglages, ImagePyramid d'aperçu
+    adjusted = pyqtSignal(object, object, object)   # réglages, ImageBuffer, ImagePyramid
+
+    def __init__(self, parent=None, delay_ms=150):
+        super().__init__(parent)
+        self.source = None              # ImageBuffer d'origine du calque
+        self.source_pyramid = None
+        self._points = OrderedDict()    # point_key -> ImageBuffer (niveaux, balance, contraste)
+        self._results = OrderedDict()   # réglages -> (ImageBuffer, ImagePyramid)
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._wanted = None
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(1)
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(delay_ms)
+        self._timer.timeout.connect(self._start)
+
+    def set_source(self, buffer, pyramid):
+        """Nouvelle image d'origine (premier décodage, rechargement) : résultats oubliés."""
+        with self._lock:
+            self.source, self.source_pyramid = buffer, pyramid
+            self._points.clear()
+            self._results.clear()
+        self._generation += 1
+
+    def clear(self):
+        self.cancel()
+        self.set_source(None, None)
+
+    def cancel(self):
+        """Abandonne la demande en attente ou en cours."""
+        self._timer.stop()
+        self._wanted = None
+        self._generation += 1
+
+    def cached(self, adjustments):
+        """(ImageBuffer, ImagePyramid) déjà calculés pour ces réglages, ou None."""
+        with self._lock:
+            result = self._results.get(adjustments)
+            if result is not None:
+                self._results.move_to_end(adjustments)
+            return result
+
+    def request(self, adjustments):
+        """Calcule `adjustments` après `delay_ms` sans nouvelle demande."""
+        self._wanted = adjustments
+        self._generation += 1
+        self._timer.start()
+
+    def _start(self):
+        if self.source is not None and self._wanted is not None:
+            self._pool.start(_AdjustJob(self, self._generation, self._wanted))
+
+    def pyramids(self):
+        with self._lock:
+            return [pyramid for _, pyramid in self._results.values()]
+
+    def stage_bytes(self):
+        """Mémoire des résultats intermédiaires qui ne sont pas aussi des résultats finaux."""
+        with self._lock:
+            finals = {id(buffer) for buffer, _ in self._results.values()}
+            return sum(
+                buffer.nbytes for buffer in self._points.values()
+                if buffer is not self.source and id(buffer) not in finals
+            )
+
+    def _run(self, generation, adjustments):
+        def stale():
+            return generation != self._generation
+
+        with self._lock:
+            source, pyramid = self.source, self.source_pyramid
+        if source is None:
+            return
+
+        preview = self._preview(pyramid, adjustments, stale)
+        if stale():
+            return
+        if preview is not None:
+            self.previewed.emit(adjustments, preview)
+
+        key = point_key(adjustments)
+        with self._lock:
+            point = self._points.get(key)
+        if point is None:
+            point = source
+            for stage in _stages(adjustments._replace(sharpen=0.0)):
+                point = _run_stage(point, stage, stale)
+                if point is None:
+                    return
+            with self._lock:
+                self._points[key] = point
+                while len(self._points) > ADJUST_CACHE_SIZE:
+                    self._points.popitem(last=False)
+
+        result = point
+        for stage in _stages(NEUTRAL_ADJUSTMENTS._replace(sharpen=adjustments.sharpen, radius=adjustments.radius)):
+            result = _run_stage(result, stage, stale)
+            if result is None:
+                return
+        result_pyramid = pyramid if result is source else ImagePyramid(result)
+        if stale():
+            return
+        with self._lock:
+            self._results[adjustments] = (result, result_pyramid)
+            while len(self._results) > ADJUST_CACHE_SIZE:
+                self._results.popitem(last=False)
+        debug_log(f"🎚 Réglages appliqués : {adjustments}")
+        self.adjusted.emit(adjustments, result, result_pyramid)
+
+    def _preview(self, pyramid, adjustments, stale):
+        """Aperçu sur le premier niveau de la pyramide qui tient dans PREVIEW_SIZE ;
+        None si l'image est déjà assez petite pour être traitée directement."""
+        level = next(
+            (k for k, image in enumerate(pyramid.levels)
+             if image is not None and max(image.width(), image.height()) <= PREVIEW_SIZE),
+            None,
+        )
+        if not level:
+            return None
+        result = ImageBuffer.from_image(pyramid.levels[level])
+        for stage in _stages(adjustments, scale=2 ** level):
+            result = _run_stage(result, stage, stale)
+            if result is None:
+                return None
+        return ImagePyramid.preview(result, pyramid.width, pyramid.height)
@@ -0,0 +1,111 @@
+#############################################################   .=<|||>=.   ####
+#|                                                              |(0)|||||      #
+#|   ui/image_buffer.py                                         !!!!!!|||
+#|                                                         /||||||||||||/.:::::,
+#|   By: ctrichet <clement.trichet.pro@gmail.com>         |||||||!!!!!!/.:::::::
+#|                                                        ||||||/.::::::::::::::
+#|   Created: 2026/10/18 23:21:07 ctrichet                 \|||/.::::::::::::::'
+#|   Updated: 2026/10/18 23:36:02 ctrichet                      :::......
+#|                                                              :::::(0):      #
+#############################################################   ':::::::'   ####
+
+import tempfile
+
+import numpy as np
+from PyQt5 import sip
+from PyQt5.QtGui import QImage
+
+MMAP_THRESHOLD_MB = 64      # au-delà, le bloc est un fichier temporaire projeté en mémoire
+
+
+class ImageBuffer:
+    """Pixels pleine résolution d'un calque, en un seul bloc partagé.
+
+    `image` est une QImage posée sur `array` sans copie : la pyramide (niveau 0) et
+    les masques des duplicatas la lisent directement. Le bloc vit tant qu'un lecteur
+    garde une référence à l'ImageBuffer ; une QImage qui en dérive ne le retient pas,
+    d'où `ImagePyramid.buffer` et `ImageLayerWidget.image_buffer`.
+
+    Au-delà de MMAP_THRESHOLD_MB, `array` est un np.memmap sur un fichier temporaire
+    (déjà supprimé du disque) : le système peut évincer les pages d'un scan inactif.
+    Un bloc relu du cache disque (voir image_cache) est projeté depuis son fichier.
+    """
+
+    def __init__(self, width, height, fmt, bytes_per_line=None, array=None):
+        if bytes_per_line is None:
+            depth = QImage(1, 1, fmt).depth()
+            bytes_per_line = (width * depth + 31) // 32 * 4
+        self.width = width
+        self.height = height
+        self.format = fmt
+        self.bytes_per_line = bytes_per_line
+        shape = (height, bytes_per_line)
+        if array is not None:
+            self.array = array
+        elif height * bytes_per_line >= MMAP_THRESHOLD_MB * 1024 * 1024:
+            with tempfile.TemporaryFile(prefix="woodinlay-") as f:
+                self.array = np.memmap(f, dtype=np.uint8, mode="w+", shape=shape)
+        else:
+            self.array = np.empty(shape, dtype=np.uint8)
+        self.image = self._view()
+
+    def _view(self):
+        # Pointeur modifiable : un accès non const (table de couleurs) ne force pas de copie
+        data = sip.voidptr(self.array.ctypes.data)
+        return QImage(data, self.width, self.height, self.bytes_per_line, self.format)
+
+    @property
+    def nbytes(self):
+        return self.array.nbytes
+
+    @property
+    def mapped(self):
+        return isinstance(self.array, np.memmap)
+
+    @classmethod
+    def map_file(cls, path, width, height, fmt, bytes_per_line):
+        """Bloc projeté depuis un fichier de pixels bruts, sans lecture ni décodage.
+        Projection en copie sur écriture : le fichier n'est jamais modifié."""
+        array = np.memmap(path, dtype=np.uint8, mode="c", shape=(height, bytes_per_line))
+        return cls(width, height, fmt, bytes_per_line, array)
+
+    @classmethod
+    def from_samples(cls, width, height, stride, samples, fmt):
+        """Bloc rempli par une seule copie d'échantillons bruts (pixmap PyMuPDF, octets
+        reçus d'un processus de rastérisation)."""
+        buffer = cls(width, height, fmt, stride)
+        np.copyto(buffer.array, np.frombuffer(samples, dtype=np.uint8, count=height * stride).reshape(height, stride))
+        return buffer
+
+    @classmethod
+    def from_image(cls, image):
+        buffer = cls(image.width(), image.height(), image.format(), image.bytesPerLine())
+        bits = image.constBits()
+        bits.setsize(image.sizeInBytes())
+        np.copyto(buffer.array, np.frombuffer(bits, dtype=np.uint8).reshape(buffer.array.shape))
+        if image.colorCount():
+            buffer.image.setColorTable(image.colorTable())
+        return buffer
+
+    @classmethod
+    def read(cls, reader):
+        """Décode `reader` (QImageReader) directement dans un nouveau bloc.
+
+        Si le lecteur réalloue l'image (orientation EXIF, format différent de celui
+        annoncé), l'image obtenue est recopiée une fois. None en cas d'échec.
+        """
+        size = reader.size()
+        fmt = reader.imageFormat()
+        if not size.isValid() or fmt == QImage.Format_Invalid:
+            image = reader.read()
+            return None if image.isNull() else cls.from_image(image)
+
+        buffer = cls(size.width(), size.height(), fmt)
+        target = buffer._view()
+        if not reader.read(target):
+            return None
+        if int(target.constBits()) != buffer.array.ctypes.data:
+            return cls.from_image(target)
+        if target.colorCount():
+            buffer.image.setColorTable(target.colorTable())
+        return buffer
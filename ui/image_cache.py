@@ -0,0 +1,145 @@
+#############################################################   .=<|||>=.   ####
+#|                                                              |(0)|||||      #
+#|   ui/image_cache.py                                          !!!!!!|||
+#|                                                         /||||||||||||/.:::::,
+#|   By: ctrichet <clement.trichet.pro@gmail.com>         |||||||!!!!!!/.:::::::
+#|                                                        ||||||/.::::::::::::::
+#|   Created: 2026/10/18 23:31:26 ctrichet                 \|||/.::::::::::::::'
+#|   Updated: 2026/10/19 13:12:30 ctrichet                      :::......
+#|                                                              :::::(0):      #
+#############################################################   ':::::::'   ####
+
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+
+from PyQt5.QtGui import QImage
+
+from ui.image_buffer import ImageBuffer
+from ui.image_pyramid import ImagePyramid
+from utils.debug import debug_log
+
+IMAGE_CACHE_VERSION = 2
+MAX_CACHE_MB = 4096     # plafond disque : les entrées les moins récemment ouvertes partent
+
+# Disposition sur disque d'une entrée (un dossier par fichier, date de modification,
+# page et résolution de rendu) :
+#   meta.json   dimensions, stride, format et table de couleurs de chaque niveau
+#   <k>.raw     pixels bruts du niveau k de la pyramide (0 = pleine résolution)
+# Les .raw sont projetés en np.memmap : rouvrir un calque ne décode ni ne rastérise rien.
+
+
+def image_cache_root():
+    root = os.environ.get("WOODINLAY_IMAGE_CACHE_DIR")
+    if root:
+        return root
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "woodinlay", "images")
+
+
+def image_key(file_path, page_number=0, dpi=None):
+    """Clé d'une entrée : chemin absolu, date de modification et taille du fichier, page
+    et résolution de rendu (PDF). Un fichier modifié obtient automatiquement une autre
+    entrée. None si le fichier est inaccessible."""
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        return None
+    h = hashlib.blake2b(digest_size=16)
+    source = f"{os.path.abspath(file_path)}\0{st.st_mtime_ns}\0{st.st_size}\0{page_number}\0{dpi}"
+    h.update(source.encode("utf-8", "surrogateescape"))
+    return f"v{IMAGE_CACHE_VERSION}-{h.hexdigest()}"
+
+
+def has_cached_image(key):
+    return key is not None and os.path.isdir(os.path.join(image_cache_root(), key))
+
+
+def load_cached_image(key):
+    """(ImageBuffer, ImagePyramid) projetés depuis une entrée du cache, ou None si
+    absente ou illisible."""
+    if not has_cached_image(key):
+        return None
+    entry = os.path.join(image_cache_root(), key)
+    try:
+        with open(os.path.join(entry, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        buffers = []
+        for k, (width, height, bytes_per_line, fmt, color_table) in enumerate(meta["levels"]):
+            path = os.path.join(entry, f"{k}.raw")
+            buffer = ImageBuffer.map_file(path, width, height, QImage.Format(fmt), bytes_per_line)
+            if color_table:
+                buffer.image.setColorTable(color_table)
+            buffers.append(buffer)
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        debug_log(f"[WARN] Entrée de cache image illisible {key} : {e}")
+        return None
+    os.utime(entry)
+    return buffers[0], ImagePyramid(buffers[0], buffers[1:])
+
+
+def store_image(key, pyramid):
+    """Écrit les niveaux de `pyramid` dans une entrée du cache (écriture dans un dossier
+    temporaire puis renommage atomique)."""
+    if key is None:
+        return
+    root = image_cache_root()
+    entry = os.path.join(root, key)
+    if os.path.isdir(entry):
+        return
+
+    try:
+        os.makedirs(root, exist_ok=True)
+        tmp = tempfile.mkdtemp(prefix=".tmp-", dir=root)
+    except OSError as e:
+        debug_log(f"[WARN] Dossier du cache image inaccessible : {e}")
+        return
+
+    levels = []
+    try:
+        for k, image in enumerate(pyramid.levels):
+            bits = image.constBits()
+            bits.setsize(image.sizeInBytes())
+            with open(os.path.join(tmp, f"{k}.raw"), "wb") as f:
+                f.write(bits)
+            levels.append([
+                image.width(), image.height(), image.bytesPerLine(), int(image.format()),
+                image.colorTable(),
+            ])
+        with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"version": IMAGE_CACHE_VERSION, "levels": levels}, f)
+        os.replace(tmp, entry)
+    except OSError as e:
+        debug_log(f"[WARN] Écriture du cache image impossible : {e}")
+        shutil.rmtree(tmp, ignore_errors=True)
+        return
+    debug_log(f"Cache image écrit : {entry}")
+    prune_image_cache()
+
+
+def _entry_size(entry):
+    try:
+        return sum(os.path.getsize(os.path.join(entry, name)) for name in os.listdir(entry))
+    except OSError:
+        return 0
+
+
+def prune_image_cache(max_mb=MAX_CACHE_MB):
+    """Supprime les entrées les moins récemment ouvertes au-delà de `max_mb` (la plus
+    récente est toujours gardée)."""
+    root = image_cache_root()
+    try:
+        entries = [
+            os.path.join(root, name) for name in os.listdir(root)
+            if not name.startswith(".")
+        ]
+    except OSError:
+        return
+    entries.sort(key=os.path.getmtime, reverse=True)
+    total = 0
+    for i, entry in enumerate(entries):
+        total += _entry_size(entry)
+        if i and total > max_mb * 1024 * 1024:
+            shutil.rmtree(entry, ignore_errors=True)
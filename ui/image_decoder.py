@@ -0,0 +1,314 @@
+#############################################################   .=<|||>=.   ####
+#|                                                              |(0)|||||      #
+#|   ui/image_decoder.py                                        !!!!!!|||
+#|                                                         /||||||||||||/.:::::,
+#|   By: ctrichet <clement.trichet.pro@gmail.com>         |||||||!!!!!!/.:::::::
+#|                                                        ||||||/.::::::::::::::
+#|   Created: 2026/10/18 22:15:12 ctrichet                 \|||/.::::::::::::::'
+#|   Updated: 2026/10/19 14:02:10 ctrichet                      :::......
+#|                                                              :::::(0):      #
+#############################################################   ':::::::'   ####
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import fitz
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from PyQt5.QtGui import QImage, QImageReader
+
+from ui.image_buffer import ImageBuffer
+from ui.image_cache import image_key, has_cached_image, load_cached_image, store_image
+from ui.image_pyramid import ImagePyramid
+from utils.debug import debug_log
+
+PDF_REFERENCE_DPI = 300     # résolution du raster de référence (scène, masques)
+PDF_THUMBNAIL_DPI = 24      # vignettes affichées en attendant le raster d'une page
+PDF_PAGE_MARK = "#page="    # calque d'une page : "catalogue.pdf#page=3" (pages comptées depuis 1)
+
+# PyMuPDF ne supporte pas les appels concurrents : un seul rendu PDF à la fois
+_pdf_lock = threading.Lock()
+
+
+def pdf_layer_path(pdf_path, page_number):
+    """Chemin de calque d'une page de PDF (page_number compté depuis 0)."""
+    return f"{pdf_path}{PDF_PAGE_MARK}{page_number + 1}"
+
+
+def split_layer_path(layer_path):
+    """(fichier, numéro de page depuis 0) d'un chemin de calque."""
+    file_path, mark, page = layer_path.rpartition(PDF_PAGE_MARK)
+    if mark and page.isdigit():
+        return file_path, int(page) - 1
+    return layer_path, 0
+
+
+def layer_display_name(layer_path):
+    file_path, page_number = split_layer_path(layer_path)
+    name = os.path.basename(file_path)
+    return f"{name} p.{page_number + 1}" if PDF_PAGE_MARK in layer_path else name
+
+
+def layer_cache_key(layer_path):
+    """Clé du cache disque (voir image_cache) d'un calque : les pages de PDF sont
+    indexées aussi par la résolution du raster de référence."""
+    file_path, page_number = split_layer_path(layer_path)
+    dpi = PDF_REFERENCE_DPI if file_path.lower().endswith(".pdf") else None
+    return image_key(file_path, page_number, dpi)
+
+
+def pdf_page_count(pdf_path):
+    with _pdf_lock:
+        doc = fitz.open(pdf_path)
+        try:
+            return doc.page_count
+        finally:
+            doc.close()
+
+
+def render_pdf_page(pdf_path, page_number=0, dpi=PDF_REFERENCE_DPI):
+    """Rend une page de PDF en ImageBuffer (utilisable hors du thread graphique)."""
+    with _pdf_lock:
+        doc = fitz.open(pdf_path)
+        try:
+            debug_log(f"Nombre de pages dans le PDF : {doc.page_count}")
+            if doc.page_count == 0:
+                raise ValueError("PDF vide")
+
+            page = doc.load_page(page_number)
+            debug_log(f"Dimensions de la page : {page.rect}")
+
+            # DPI plus élevé pour un rendu correct (par défaut c’est 72dpi = très petit)
+            mat = fitz.Matrix(dpi / 72, dpi / 72)
+            pix = page.get_pixmap(matrix=mat, alpha=True)
+            debug_log(f"Rendu : {pix.width}x{pix.height}")
+        finally:
+            doc.close()
+
+    mode = QImage.Format_RGBA8888 if pix.alpha else QImage.Format_RGB888
+    return ImageBuffer.from_samples(pix.width, pix.height, pix.stride, pix.samples_mv, mode)
+
+
+def render_pdf_region(doc, page_number, clip, dpi):
+    """Rend la zone `clip` (fitz.Rect, en points PDF) d'une page d'un document déjà
+    ouvert, à `dpi`."""
+    with _pdf_lock:
+        page = doc.load_page(page_number)
+        mat = fitz.Matrix(dpi / 72, dpi / 72)
+        pix = page.get_pixmap(matrix=mat, clip=clip, alpha=True)
+    return _pixmap_to_image(pix)
+
+
+def _pixmap_to_image(pix):
+    mode = QImage.Format_RGBA8888 if pix.alpha else QImage.Format_RGB888
+    return QImage(pix.samples, pix.width, pix.height, pix.stride, mode).copy()
+
+
+_worker_docs = {}   # chemin -> ((date, taille), document) ouvert par un processus du pool
+
+
+def _rasterize_pdf_page(pdf_path, page_number, dpi):
+    """Exécuté dans un processus du pool : rend une page et renvoie ses octets bruts
+    (largeur, hauteur, stride, échantillons RGBA), seuls à traverser le pipe, suivis de
+    la version (date, taille) du fichier rendu. Même format que render_pdf_page : une
+    page a le même raster quel que soit le chemin."""
+    st = os.stat(pdf_path)
+    version = (st.st_mtime_ns, st.st_size)
+    opened = _worker_docs.get(pdf_path)
+    if opened is None or opened[0] != version:
+        # PDF réenregistré sous le même chemin : le document gardé ouvert est périmé
+        if opened is not None:
+            opened[1].close()
+        opened = _worker_docs[pdf_path] = (version, fitz.open(pdf_path))
+    doc = opened[1]
+    mat = fitz.Matrix(dpi / 72, dpi / 72)
+    pix = doc.load_page(page_number).get_pixmap(matrix=mat, alpha=True)
+    return pix.width, pix.height, pix.stride, pix.samples, version
+
+
+def _file_version(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _raw_to_image(raw):
+    width, height, stride, samples, _ = raw
+    return QImage(samples, width, height, stride, QImage.Format_RGBA8888).copy()
+
+
+def _raw_to_buffer(raw):
+    width, height, stride, samples, _ = raw
+    return ImageBuffer.from_samples(width, height, stride, samples, QImage.Format_RGBA8888)
+
+
+def decode_image(path):
+    """Décode une image ou une page de PDF en ImageBuffer ; lève ValueError en cas
+    d'échec."""
+    file_path, page_number = split_layer_path(path)
+    if file_path.lower().endswith(".pdf"):
+        buffer = render_pdf_page(file_path, page_number)
+        if buffer.image.isNull():
+            raise ValueError("QImage vide après conversion")
+        return buffer
+
+    reader = QImageReader(path)
+    reader.setAutoTransform(True)
+    buffer = ImageBuffer.read(reader)
+    if buffer is None:
+        raise ValueError(reader.errorString())
+    return buffer
+
+
+def load_layer_image(path):
+    """(ImageBuffer, ImagePyramid) d'un calque, dans le thread appelant : projetés
+    depuis le cache disque, sinon décodés puis mis en cache. Lève ValueError."""
+    key = layer_cache_key(path)
+    cached = load_cached_image(key)
+    if cached is not None:
+        return cached
+    buffer = decode_image(path)
+    pyramid = ImagePyramid(buffer)
+    store_image(key, pyramid)
+    return buffer, pyramid
+
+
+class _DecodeJob(QRunnable):
+    def __init__(self, decoder, path):
+        super().__init__()
+        self.decoder = decoder
+        self.path = path
+
+    def run(self):
+        key = layer_cache_key(self.path)
+        try:
+            cached = load_cached_image(key)
+            if cached is not None:
+                self.decoder.decoded.emit(self.path, *cached)
+                return
+            try:
+                buffer = decode_image(self.path)
+                pyramid = ImagePyramid(buffer)
+            except Exception as e:
+                self.decoder.failed.emit(self.path, str(e))
+                return
+            self.decoder.decoded.emit(self.path, buffer, pyramid)
+        except RuntimeError:
+            return  # décodeur détruit pendant le décodage (fermeture)
+        store_image(key, pyramid)   # après l'affichage : l'écriture ne retarde pas le calque
+
+
+class _PyramidJob(QRunnable):
+    """Page rastérisée par le pool de processus : bloc d'image et pyramide construits ici."""
+
+    def __init__(self, decoder, path, raw, key):
+        super().__init__()
+        self.decoder = decoder
+        self.path = path
+        self.raw = raw
+        self.key = key      # (clé du cache, version du fichier) prises à l'envoi au pool
+
+    def run(self):
+        key, version = self.key
+        try:
+            rendered_version = self.raw[-1]
+            buffer = _raw_to_buffer(self.raw)
+            self.raw = None
+            pyramid = ImagePyramid(buffer)
+            self.decoder.decoded.emit(self.path, buffer, pyramid)
+        except RuntimeError:
+            return
+        if rendered_version == version:     # fichier réécrit pendant le rendu : pas de cache
+            store_image(key, pyramid)
+
+
+class ImageDecoder(QObject):
+    """Décode les calques image (et leur pyramide) dans un QThreadPool dédié.
+
+    Les pages d'un PDF importé en plusieurs calques sont rastérisées dans un pool de
+    processus (un par cœur) : toutes les vignettes d'abord (`thumbnail`), puis les
+    pages à PDF_REFERENCE_DPI. Chaque calque aboutit à `decoded` ou à `failed`, émis
+    dans le thread graphique : une erreur ne concerne que son calque, le reste du lot
+    continue.
+
+    Chaque image décodée est écrite dans le cache disque (image_cache) : un calque
+    déjà ouvert, fichier inchangé, est simplement projeté en mémoire depuis son entrée.
+    """
+
+    decoded = pyqtSignal(str, object, object)   # chemin, ImageBuffer, ImagePyramid
+    failed = pyqtSignal(str, str)               # chemin, message d'erreur
+    thumbnail = pyqtSignal(str, QImage)         # chemin, vignette de la page
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pending = set()
+        self._processes = None
+        self.decoded.connect(self._done)
+        self.failed.connect(self._done)
+
+    def decode(self, path):
+        self.pending.add(path)
+        self.pool.start(_DecodeJob(self, path))
+
+    def decode_pdf_pages(self, pdf_path, page_numbers):
+        """Rastérise les pages `page_numbers` (depuis 0) de `pdf_path` en parallèle ;
+        les pages déjà présentes dans le cache disque en sont simplement relues."""
+        paths = []
+        keys = {}
+        for page_number in page_numbers:
+            path = pdf_layer_path(pdf_path, page_number)
+            key = layer_cache_key(path)
+            if has_cached_image(key):
+                self.decode(path)
+            else:
+                paths.append(path)
+                keys[path] = (key, _file_version(pdf_path))
+        if not paths:
+            return
+        page_numbers = [split_layer_path(path)[1] for path in paths]
+        if self._processes is None:
+            self._processes = ProcessPoolExecutor(
+                max_workers=os.cpu_count() or 1, mp_context=multiprocessing.get_context("spawn")
+            )
+        debug_log(f"Rastérisation de {len(page_numbers)} pages de {pdf_path}")
+        self.pending.update(paths)
+        # Le pool traite les tâches dans l'ordre : toutes les vignettes passent en premier
+        for path, page_number in zip(paths, page_numbers):
+            future = self._processes.submit(_rasterize_pdf_page, pdf_path, page_number, PDF_THUMBNAIL_DPI)
+            future.add_done_callback(lambda f, path=path: self._on_thumbnail(path, f))
+        for path, page_number in zip(paths, page_numbers):
+            future = self._processes.submit(_rasterize_pdf_page, pdf_path, page_number, PDF_REFERENCE_DPI)
+            future.add_done_callback(lambda f, path=path: self._on_page(path, keys[path], f))
+
+    # Rappels exécutés dans un thread de l'exécuteur : on ne fait qu'émettre / relayer
+    def _on_thumbnail(self, path, future):
+        if future.cancelled() or future.exception() is not None:
+            return  # l'échec éventuel est signalé par le rendu de la page
+        try:
+            self.thumbnail.emit(path, _raw_to_image(future.result()))
+        except RuntimeError:
+            pass
+
+    def _on_page(self, path, key, future):
+        if future.cancelled():
+            return
+        try:
+            error = future.exception()
+            if error is not None:
+                self.failed.emit(path, str(error))
+            else:
+                self.pool.start(_PyramidJob(self, path, future.result(), key))
+        except RuntimeError:
+            pass
+
+    def shutdown(self):
+        if self._processes is not None:
+            self._processes.shutdown(wait=False, cancel_futures=True)
+            self._processes = None
+
+    def _done(self, path, *_):
+        self.pending.discard(path)
@@ -5,19 +5,25 @@
 #|   By: ctrichet <clement.trichet.pro@gmail.com>         |||||||!!!!!!/.:::::::
 #|                                                        ||||||/.::::::::::::::
 #|   Created: 2025/08/12 15:43:01 ctrichet                 \|||/.::::::::::::::'
-#|   Updated: 2025/08/12 15:43:01 ctrichet                      :::......
+#|   Updated: 2026/10/19 15:38:05 ctrichet                      :::......
 #|                                                              :::::(0):      #
 #############################################################   ':::::::'   ####
 
 import os
 import xml.etree.ElementTree as ET
 from PyQt5.QtWidgets import (
-    QWidget, QVBoxLayout, QGraphicsScene, QFileDialog, QDialog
+    QWidget, QVBoxLayout, QGraphicsScene, QFileDialog, QDialog, QLabel, QProgressBar
 )
-from PyQt5.QtGui import QPixmap, QPainter, QColor
-from PyQt5.QtCore import QRectF, Qt
+from PyQt5.QtGui import QPainter, QColor, QPixmap
+from PyQt5.QtCore import QRectF, Qt, pyqtSignal
 
 from .views import ZoomableView
+from .background_scene import BackgroundScene, use_drawn_background
+from .image_pyramid import ImagePyramid, TiledImageItem
+from .pdf_detail import PdfDetailItem
+from .image_decoder import load_layer_image, split_layer_path, layer_display_name
+from .image_adjust import ImageAdjuster, image_pixels
+from core.image_adjust import NEUTRAL_ADJUSTMENTS, gray_world_gains
 from core.model_items import DuplicataGroupItem
 from ui.dialogs import DarkFileDialog, DarkMessageBox
 
@@ -25,6 +31,7 @@ from utils.debug import debug_log
 
 
 class ImageLayerWidget(QWidget):
+    memory_changed = pyqtSignal(object)     # ce calque, après remplacement de l'image affichée
     _color_step = 0
 
     @staticmethod
@@ -43,11 +50,13 @@ class ImageLayerWidget(QWidget):
 
         return QColor(channel_value(r_on), channel_value(g_on), channel_value(b_on))
 
-    def __init__(self, image_path=None, pixmap=None):
+    def __init__(self, image_path=None, buffer=None, pending=False):
         super().__init__()
         self.margin_color = ImageLayerWidget.next_margin_color()
         self.image_path = image_path
-        self.scene = QGraphicsScene()
+        # Fond peint par drawBackground si demandé : l'index de la scène ne tient alors
+        # que les duplicatas
+        self.scene = BackgroundScene() if use_drawn_background() else QGraphicsScene()
         self.scene.name = image_path
         original_addItem = self.scene.addItem
         self.scene.addItem = lambda item: (
@@ -57,36 +66,209 @@ class ImageLayerWidget(QWidget):
 
         self.view = ZoomableView(self.scene)
         self.view.setRenderHint(QPainter.Antialiasing)
-        self.background_pixmap = None
+        self.image_buffer = None        # ImageBuffer pleine résolution affiché (réglé), partagé avec la pyramide
+        self.pyramid_item = None
+        self.pdf_detail_item = None     # re-rendu vectoriel au zoom (calques PDF)
+
+        # Image d'origine et réglages (niveaux, balance des blancs, ...) calculés en tâche de fond
+        self.source_buffer = None
+        self.source_pyramid = None
+        self.adjustments = NEUTRAL_ADJUSTMENTS
+        self.adjuster = ImageAdjuster(self)
+        self.adjuster.previewed.connect(self.on_adjust_preview)
+        self.adjuster.adjusted.connect(self.on_adjusted)
+
+        # Indicateur affiché tant que l'image est en cours de décodage (voir ImageDecoder)
+        self.placeholder = QLabel(f"Décodage de {layer_display_name(image_path or '')}…")
+        self.placeholder.setStyleSheet("color: white;")
+        self.placeholder.setAlignment(Qt.AlignCenter)
+        self.progress = QProgressBar()
+        self.progress.setRange(0, 0)
+        self.progress.setMaximumHeight(8)
+        self.progress.setTextVisible(False)
 
         layout = QVBoxLayout()
+        layout.addWidget(self.placeholder)
+        layout.addWidget(self.progress)
         layout.addWidget(self.view)
         self.setLayout(layout)
+        self.placeholder.setVisible(pending)
+        self.progress.setVisible(pending)
+        self.view.setVisible(not pending)
 
-        if pixmap:
-            self.load_pixmap(pixmap)
-        elif image_path:
+        if buffer is not None:
+            self.set_image(buffer)
+        elif image_path and not pending:
                 self.load_image(image_path)
 
+    @property
+    def background_image(self):
+        """QImage pleine résolution (masques des duplicatas) : vue sans copie du bloc
+        partagé, None tant que l'image est en décodage."""
+        return self.image_buffer.image if self.image_buffer is not None else None
+
+    @property
+    def evicted(self):
+        """Calque affiché dont seuls les niveaux basse résolution restent en mémoire."""
+        return self.image_buffer is None and self.pyramid_item is not None
+
     def load_image(self, path):
-        pixmap = QPixmap(path)
-        if pixmap.isNull():
+        try:
+            buffer, pyramid = load_layer_image(path)
+        except ValueError:
             DarkMessageBox.critical(self, "Erreur", f"Impossible de charger l’image : {path}")
             return
-        self.load_pixmap(pixmap)
+        self.set_image(buffer, pyramid)
+
+    def memory_bytes(self):
+        """Mémoire tenue par l'image de fond : pyramides (origine, affichée, réglages
+        gardés en cache), tuiles et rendus PDF."""
+        if self.pyramid_item is None:
+            return 0
+        pyramids = {
+            id(pyramid): pyramid
+            for pyramid in (self.pyramid_item.pyramid, self.source_pyramid, *self.adjuster.pyramids())
+            if pyramid is not None
+        }
+        total = sum(pyramid.nbytes() for pyramid in pyramids.values())
+        total += self.adjuster.stage_bytes() + self.pyramid_item.cache_bytes
+        if self.pdf_detail_item is not None:
+            total += self.pdf_detail_item.nbytes()
+        return total
 
+    def release_image(self):
+        """Libère les pixels pleine résolution (calque inactif évincé par LayerMemory) :
+        l'aperçu basse résolution de la pyramide reste affiché. Renvoie False si
+        l'image est déjà assez petite pour servir d'aperçu."""
+        if self.image_buffer is None:
+            return False
+        pyramid = self.pyramid_item.pyramid
+        pyramid.release()
+        if pyramid.resident:
+            return False
+        self.image_buffer = None
+        self.source_buffer = self.source_pyramid = None
+        self.adjuster.clear()
+        self.pyramid_item.clear_cache()
+        self.pyramid_item.update()
+        if self.pdf_detail_item is not None:
+            self.pdf_detail_item.clear_cache()
+        return True
 
-    def load_pixmap(self, pixmap):
-        if pixmap.isNull():
-            print("[ERROR] Pixmap vide, rien à afficher.")
+    def set_thumbnail(self, image):
+        """Vignette montrée à la place de l'image tant que celle-ci est en décodage."""
+        if self.background_image is None:
+            self.placeholder.setPixmap(QPixmap.fromImage(image))
+
+    def set_image(self, buffer, pyramid=None):
+        """Pose l'image d'origine du calque et l'affiche par tuiles sur une pyramide de
+        résolutions construite une fois (ici, ou d'avance dans un thread de décodage).
+        Les réglages du calque lui sont réappliqués en tâche de fond."""
+        image = buffer.image
+        if image.isNull():
+            print("[ERROR] Image vide, rien à afficher.")
+            return
+        if pyramid is None:
+            pyramid = ImagePyramid(buffer)
+        debug_log(
+            f"Image size: {image.width()}x{image.height()}, {len(pyramid.levels)} niveaux, "
+            f"{pyramid.nbytes() / 1e6:.1f} Mo{' (projeté en mémoire)' if buffer.mapped else ''}"
+        )
+        self.image_buffer = buffer
+        self.source_buffer, self.source_pyramid = buffer, pyramid
+        self.adjuster.set_source(buffer, pyramid)
+        adjusted = self.adjustments != NEUTRAL_ADJUSTMENTS
+        if adjusted:
+            self.adjuster.request(self.adjustments)
+        if self.pyramid_item is not None:
+            # Rechargement après éviction : la vue garde son cadrage, les masques sont posés.
+            # Calque réglé : l'aperçu réglé reste affiché jusqu'au nouveau calcul
+            if not adjusted:
+                self.pyramid_item.set_pyramid(pyramid)
             return
-        debug_log(f"Pixmap size: {pixmap.width()}x{pixmap.height()}")
-        self.background_pixmap = pixmap.copy()
-        self.scene.clear()
-        self.scene.addPixmap(pixmap)
-        self.scene.setSceneRect(QRectF(pixmap.rect()))
+        self.placeholder.hide()
+        self.progress.hide()
+        self.view.show()
+        self.pyramid_item = TiledImageItem(pyramid)
+        self.add_background(self.pyramid_item)
+        file_path, page_number = split_layer_path(self.image_path or "")
+        if file_path.lower().endswith(".pdf") and self.pdf_detail_item is None:
+            self.pdf_detail_item = PdfDetailItem(file_path, self.view, page_number)
+            self.add_background(self.pdf_detail_item)
+        self.scene.setSceneRect(QRectF(image.rect()))
         self.view.fitInView(self.scene.sceneRect(), Qt.KeepAspectRatio)
 
+        # Duplicatas posés pendant le décodage : leur masque attendait l'image
+        self.remask_duplicatas()
+
+    def add_background(self, item):
+        if isinstance(self.scene, BackgroundScene):
+            self.scene.add_background(item)
+        else:
+            self.scene.addItem(item)
+
+    def remove_background(self, item):
+        if isinstance(self.scene, BackgroundScene):
+            self.scene.remove_background(item)
+        else:
+            self.scene.removeItem(item)
+
+    def close_layer(self):
+        """Calque retiré ou fenêtre fermée : libère le document PDF gardé ouvert."""
+        if self.pdf_detail_item is not None:
+            self.remove_background(self.pdf_detail_item)
+            self.pdf_detail_item.close()
+            self.pdf_detail_item = None
+
+    def remask_duplicatas(self):
+        for item in self.scene.items():
+            if isinstance(item, DuplicataGroupItem):
+                item.mask()
+
+    def set_adjustments(self, adjustments):
+        """Réglages du calque (ImageAdjustDialog). Chaque calcul repart de l'image
+        d'origine ; un jeu de réglages déjà calculé est réaffiché sans attendre."""
+        self.adjustments = adjustments
+        if self.pdf_detail_item is not None:
+            self.pdf_detail_item.set_adjustments(adjustments)
+        if self.source_buffer is None:
+            return  # appliqués au chargement de l'image
+        if adjustments == NEUTRAL_ADJUSTMENTS:
+            self.adjuster.cancel()
+            self._show_adjusted(self.source_buffer, self.source_pyramid)
+            return
+        cached = self.adjuster.cached(adjustments)
+        if cached is not None:
+            self.adjuster.cancel()
+            self._show_adjusted(*cached)
+        else:
+            self.adjuster.request(adjustments)
+
+    def auto_white_balance(self, adjustments):
+        """Gains « monde gris » mesurés sur le niveau le plus grossier de l'image
+        d'origine ; None si elle n'est pas en mémoire."""
+        if self.source_pyramid is None:
+            return None
+        pixels, layout = image_pixels(self.source_pyramid.levels[-1])
+        if pixels is None:
+            return None
+        return gray_world_gains(pixels, layout, adjustments)
+
+    def on_adjust_preview(self, adjustments, pyramid):
+        if adjustments == self.adjustments and self.source_buffer is not None:
+            self.pyramid_item.set_pyramid(pyramid)
+
+    def on_adjusted(self, adjustments, buffer, pyramid):
+        if adjustments == self.adjustments and self.source_buffer is not None:
+            self._show_adjusted(buffer, pyramid)
+
+    def _show_adjusted(self, buffer, pyramid):
+        """Image affichée et lue par les masques des duplicatas."""
+        self.image_buffer = buffer
+        self.pyramid_item.set_pyramid(pyramid)
+        self.remask_duplicatas()
+        self.memory_changed.emit(self)
+
     def export_svg(self):
         if not self.image_path:
             DarkMessageBox.warning(self, "Export SVG", "Aucune image de fond chargée.")
@@ -112,8 +294,10 @@ class ImageLayerWidget(QWidget):
                     "stroke-width": "1"
                 })
 
-        image_name = os.path.basename(self.image_path)
-        base_name, _ = os.path.splitext(image_name)
+        file_path, page_number = split_layer_path(self.image_path)
+        base_name, _ = os.path.splitext(os.path.basename(file_path))
+        if file_path != self.image_path:
+            base_name += f"_p{page_number + 1}"
         default_filename = base_name + ".svg"
 
         dialog = DarkFileDialog(self, "Exporter en SVG")
@@ -0,0 +1,173 @@
+#############################################################   .=<|||>=.   ####
+#|                                                              |(0)|||||      #
+#|   ui/image_pyramid.py                                        !!!!!!|||
+#|                                                         /||||||||||||/.:::::,
+#|   By: ctrichet <clement.trichet.pro@gmail.com>         |||||||!!!!!!/.:::::::
+#|                                                        ||||||/.::::::::::::::
+#|   Created: 2026/10/18 21:52:30 ctrichet                 \|||/.::::::::::::::'
+#|   Updated: 2026/10/18 23:58:30 ctrichet                      :::......
+#|                                                              :::::(0):      #
+#############################################################   ':::::::'   ####
+
+from collections import OrderedDict
+from math import ceil, floor, log2
+
+from PyQt5.QtCore import Qt, QRect, QRectF
+from PyQt5.QtGui import QPainter, QPixmap
+from PyQt5.QtWidgets import QGraphicsItem
+from ui.background_scene import BackgroundItem
+from utils.debug import debug_log
+
+TILE_SIZE = 512                 # côté d'une tuile, en pixels du niveau
+DEFAULT_TILE_CACHE_MB = 128     # plafond mémoire des tuiles converties en QPixmap
+PROXY_SIZE = 1024               # plus grand côté de l'aperçu gardé par un calque évincé
+
+
+class ImagePyramid:
+    """Niveaux de résolution d'une image : niveau 0 = image source, niveau k réduit
+    de moitié par rapport au niveau k-1, jusqu'à tenir dans une tuile.
+
+    Le niveau 0 est la vue sans copie de l'ImageBuffer du calque, gardé vivant par
+    `buffer`. Les niveaux relus du cache disque sont passés dans `level_buffers`.
+    Ne manipule que des QImage : peut être construit hors du thread graphique.
+    """
+
+    def __init__(self, buffer, level_buffers=()):
+        self.buffer = buffer
+        self.level_buffers = list(level_buffers)
+        image = buffer.image
+        self.levels = [image] + [level.image for level in self.level_buffers]
+        while not self.level_buffers and max(image.width(), image.height()) > TILE_SIZE:
+            image = image.scaled(
+                max(1, image.width() // 2), max(1, image.height() // 2),
+                Qt.IgnoreAspectRatio, Qt.SmoothTransformation,
+            )
+            self.levels.append(image)
+        self.width = self.levels[0].width()
+        self.height = self.levels[0].height()
+        self.base = 0   # premier niveau encore en mémoire (voir release)
+
+    @classmethod
+    def preview(cls, buffer, width, height):
+        """Pyramide d'aperçu d'une image width x height dont `buffer` est une réduction :
+        seuls les niveaux grossiers existent, comme après release()."""
+        pyramid = cls(buffer)
+        skip = max(0, round(log2(width / buffer.width)))
+        if skip:
+            pyramid.levels = [None] * skip + pyramid.levels
+            pyramid.level_buffers = [None] * (skip - 1) + [buffer]
+            pyramid.buffer = None
+            pyramid.base = skip
+        pyramid.width, pyramid.height = width, height
+        return pyramid
+
+    @property
+    def resident(self):
+        return self.base == 0
+
+    def release(self, max_side=PROXY_SIZE):
+        """Libère le bloc pleine résolution et les niveaux plus grands que `max_side` :
+        restent les niveaux grossiers, aperçu affiché tant que le calque est évincé."""
+        keep = next(
+            (k for k, image in enumerate(self.levels)
+             if image is not None and max(image.width(), image.height()) <= max_side),
+            len(self.levels) - 1,
+        )
+        if keep <= self.base:
+            return
+        self.levels[:keep] = [None] * keep
+        if self.level_buffers:
+            self.level_buffers[:keep - 1] = [None] * (keep - 1)
+        self.buffer = None
+        self.base = keep
+
+    def level_for_scale(self, scale):
+        """Niveau le plus grossier dont les pixels restent plus fins que l'écran (ou le
+        plus fin encore en mémoire)."""
+        if scale <= 0:
+            return len(self.levels) - 1
+        return max(self.base, min(len(self.levels) - 1, floor(log2(1 / scale))))
+
+    def factors(self, level):
+        """Taille d'un pixel du niveau, en pixels de l'image source (scène)."""
+        image = self.levels[level]
+        return self.width / image.width(), self.height / image.height()
+
+    def tile_rect(self, level, tx, ty):
+        image = self.levels[level]
+        return QRect(tx * TILE_SIZE, ty * TILE_SIZE, TILE_SIZE, TILE_SIZE).intersected(image.rect())
+
+    def tile(self, level, tx, ty):
+        return self.levels[level].copy(self.tile_rect(level, tx, ty))
+
+    def nbytes(self):
+        return sum(image.sizeInBytes() for image in self.levels if image is not None)
+
+
+class TiledImageItem(BackgroundItem, QGraphicsItem):
+    """Image de fond d'un calque affichée par tuiles, au niveau de la pyramide qui
+    correspond au zoom de la vue.
+
+    Seules les tuiles exposées sont converties en QPixmap, gardées en LRU sous
+    `cache_limit_mb` : la mémoire d'affichage ne dépend pas de la taille du scan.
+    """
+
+    def __init__(self, pyramid, cache_limit_mb=DEFAULT_TILE_CACHE_MB, parent=None):
+        super().__init__(parent)
+        self.pyramid = pyramid
+        self.cache_limit = cache_limit_mb * 1024 * 1024
+        self._tiles = OrderedDict()     # (niveau, tx, ty) -> QPixmap, du moins au plus récent
+        self._cache_bytes = 0
+        self.setFlag(QGraphicsItem.ItemUsesExtendedStyleOption)
+        self.setZValue(-1)
+
+    def boundingRect(self):
+        return QRectF(0, 0, self.pyramid.width, self.pyramid.height)
+
+    def set_pyramid(self, pyramid):
+        """Remplace la pyramide (calque rechargé après éviction)."""
+        self.prepareGeometryChange()
+        self.pyramid = pyramid
+        self.clear_cache()
+        self.update()
+
+    @property
+    def cache_bytes(self):
+        return self._cache_bytes
+
+    def paint(self, painter, option, widget=None):
+        exposed = option.exposedRect.intersected(self.boundingRect())
+        if exposed.isEmpty():
+            return
+        scale = option.levelOfDetailFromTransform(painter.worldTransform())
+        level = self.pyramid.level_for_scale(scale)
+        fx, fy = self.pyramid.factors(level)
+        span_x, span_y = TILE_SIZE * fx, TILE_SIZE * fy
+
+        painter.setRenderHint(QPainter.SmoothPixmapTransform)
+        for ty in range(floor(exposed.top() / span_y), ceil(exposed.bottom() / span_y)):
+            for tx in range(floor(exposed.left() / span_x), ceil(exposed.right() / span_x)):
+                pixmap = self._tile_pixmap(level, tx, ty)
+                if pixmap.isNull():
+                    continue
+                target = QRectF(tx * span_x, ty * span_y, pixmap.width() * fx, pixmap.height() * fy)
+                painter.drawPixmap(target, pixmap, QRectF(pixmap.rect()))
+
+    def _tile_pixmap(self, level, tx, ty):
+        key = (level, tx, ty)
+        pixmap = self._tiles.get(key)
+        if pixmap is not None:
+            self._tiles.move_to_end(key)
+            return pixmap
+        pixmap = QPixmap.fromImage(self.pyramid.tile(level, tx, ty))
+        self._tiles[key] = pixmap
+        self._cache_bytes += pixmap.width() * pixmap.height() * 4
+        while self._cache_bytes > self.cache_limit and len(self._tiles) > 1:
+            _, old = self._tiles.popitem(last=False)
+            self._cache_bytes -= old.width() * old.height() * 4
+        return pixmap
+
+    def clear_cache(self):
+        self._tiles.clear()
+        self._cache_bytes = 0
+        debug_log("Tuiles de l'image de fond libérées")
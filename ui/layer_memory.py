@@ -0,0 +1,113 @@
+#############################################################   .=<|||>=.   ####
+#|                                                              |(0)|||||      #
+#|   ui/layer_memory.py                                         !!!!!!|||
+#|                                                         /||||||||||||/.:::::,
+#|   By: ctrichet <clement.trichet.pro@gmail.com>         |||||||!!!!!!/.:::::::
+#|                                                        ||||||/.::::::::::::::
+#|   Created: 2026/10/18 23:44:18 ctrichet                 \|||/.::::::::::::::'
+#|   Updated: 2026/10/18 23:44:18 ctrichet                      :::......
+#|                                                              :::::(0):      #
+#############################################################   ':::::::'   ####
+
+import os
+from collections import OrderedDict
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from ui.image_decoder import load_layer_image, layer_display_name
+from utils.debug import debug_log
+
+DEFAULT_BUDGET_MB = 4096    # mémoire des calques image au-delà de laquelle on évince
+
+
+def image_budget_mb():
+    """Budget des calques image, en Mo ; WOODINLAY_IMAGE_BUDGET_MB le remplace."""
+    value = os.environ.get("WOODINLAY_IMAGE_BUDGET_MB")
+    if not value:
+        return DEFAULT_BUDGET_MB
+    try:
+        return max(1, int(value))
+    except ValueError:
+        debug_log(f"[WARN] WOODINLAY_IMAGE_BUDGET_MB invalide : {value!r}")
+        return DEFAULT_BUDGET_MB
+
+
+class LayerMemory(QObject):
+    """Budget mémoire des calques image, tenu par éviction LRU.
+
+    Au-delà de `budget` octets, les calques les moins récemment utilisés (hors onglet
+    courant) libèrent leurs pixels pleine résolution et ne gardent qu'un aperçu basse
+    résolution (ImagePyramid.release). Un calque évincé est rechargé en tâche de fond
+    quand son onglet redevient courant, ou tout de suite (`acquire`) quand un masque de
+    duplicata a besoin de ses pixels ; le cache disque (image_cache) rend ce
+    rechargement quasi immédiat.
+    """
+
+    usage_changed = pyqtSignal(object, object)  # octets utilisés, budget
+
+    def __init__(self, decoder, budget_mb=None, parent=None):
+        super().__init__(parent)
+        self.decoder = decoder
+        self.budget = (budget_mb or image_budget_mb()) * 1024 * 1024
+        self.layers = OrderedDict()     # chemin -> ImageLayerWidget, du moins au plus récemment utilisé
+        self.active = None              # calque de l'onglet courant, jamais évincé
+
+    def usage(self):
+        return sum(widget.memory_bytes() for widget in self.layers.values())
+
+    def touch(self, widget):
+        self.layers[widget.image_path] = widget
+        self.layers.move_to_end(widget.image_path)
+
+    def activate(self, widget):
+        """Onglet courant changé (`widget` None hors calque image)."""
+        self.active = widget
+        if widget is not None and widget.image_path in self.layers:
+            self.touch(widget)
+            if widget.evicted and widget.image_path not in self.decoder.pending:
+                debug_log(f"♻️ Rechargement du calque évincé : {layer_display_name(widget.image_path)}")
+                self.decoder.decode(widget.image_path)
+        self.enforce()
+
+    def loaded(self, widget):
+        """Image (re)posée sur un calque par ImageDecoder."""
+        self.touch(widget)
+        self.enforce()
+
+    def acquire(self, widget):
+        """Image pleine résolution du calque, rechargée dans le thread graphique s'il a
+        été évincé ; None tant que son premier décodage n'est pas terminé."""
+        if widget.evicted:
+            try:
+                widget.set_image(*load_layer_image(widget.image_path))
+            except ValueError as e:
+                print(f"[ERROR] ❌ Rechargement impossible : {widget.image_path} ({e})")
+                return None
+        if widget.image_path in self.layers:
+            self.touch(widget)
+            self.enforce(keep=widget)
+        return widget.background_image
+
+    def remove(self, widget):
+        if self.layers.get(widget.image_path) is widget:
+            del self.layers[widget.image_path]
+        if self.active is widget:
+            self.active = None
+        self.enforce()
+
+    def enforce(self, keep=None):
+        """Évince les calques les moins récemment utilisés jusqu'à repasser sous le budget."""
+        usage = self.usage()
+        for widget in list(self.layers.values()):
+            if usage <= self.budget:
+                break
+            if widget is self.active or widget is keep:
+                continue
+            before = widget.memory_bytes()
+            if widget.release_image():
+                usage -= before - widget.memory_bytes()
+                debug_log(
+                    f"🧹 Calque évincé : {layer_display_name(widget.image_path)} "
+                    f"({(before - widget.memory_bytes()) / 1e6:.0f} Mo libérés)"
+                )
+        self.usage_changed.emit(usage, self.budget)
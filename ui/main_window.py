@@ -5,32 +5,46 @@
 #|   By: ctrichet <clement.trichet.pro@gmail.com>         |||||||!!!!!!/.:::::::
 #|                                                        ||||||/.::::::::::::::
 #|   Created: 2025/08/12 11:43:00 ctrichet                 \|||/.::::::::::::::'
-#|   Updated: 2025/08/12 11:43:00 ctrichet                      :::......
+#|   Updated: 2026/10/19 14:48:15 ctrichet                      :::......
 #|                                                              :::::(0):      #
 #############################################################   ':::::::'   ####
 
-import os, fitz, sys
-from typing import Optional
+import os, sys
+from contextlib import contextmanager
 from math import radians, cos, sin
 
 from PyQt5.QtWidgets import (
-    QMainWindow, QTreeWidget, QTreeWidgetItem, QTabWidget, QDialog, QFileDialog,
-    QGraphicsView, QWidget, QHBoxLayout, QVBoxLayout, QShortcut,
+    QMainWindow, QTreeView, QTabWidget, QDialog, QFileDialog,
+    QGraphicsView, QWidget, QHBoxLayout, QVBoxLayout, QShortcut, QProgressBar,
+    QPushButton, QLineEdit, QComboBox, QLabel,
 )
 from PyQt5.QtGui import (
-    QColor, QKeySequence, QPixmap, QImage, QPalette, QBrush
+    QColor, QKeySequence, QPalette, QBrush
 )
 from PyQt5.QtCore import (
-    Qt, QPointF,
+    Qt, QPointF, QRectF, QItemSelectionModel,
 )
-from core.svg_parser import parse_svg_or_group
+from core.svg_loader import SvgStreamLoader
+from core.svg_watcher import SvgFileWatcher
+from core.model_items import GroupItem
+from core.pieces import SvgPiece
+from core.geometry_store import GeometryStore
+from core.geometry_cache import store_nodes
+from core.subtree_index import SubtreeIndex
+from core.element_index import ElementIndex, NOT_DUPLICATED
 from core.duplication_manager import perform_unique_duplication
 from ui.svg_layer import SvgLayerWidget
+from ui.virtual_scene import PieceVirtualizer, use_virtual_scene
+from ui.element_tree import ElementTreeModel
 from ui.toolbar import CollapsibleToolbar
 from ui.image_layer import ImageLayerWidget
+from ui.image_decoder import (
+    ImageDecoder, pdf_layer_path, pdf_page_count, split_layer_path, layer_display_name
+)
+from ui.layer_memory import LayerMemory
 from ui.dialogs import (
     NestingConfigDialog, BackgroundSelectionDialog, DarkFileDialog,
-    DarkMessageBox,
+    DarkMessageBox, PdfPagesDialog, ImageAdjustDialog,
 )
 from ui.delegates import TreeItemHighlightDelegate
 from ui.tab_bar import CustomTabBar
@@ -48,7 +62,7 @@ class MainWindow(QMainWindow):
                 None,
                 "Choisir un fichier SVG",
                 "",
-                "Fichiers SVG (*.svg)"
+                "Fichiers SVG (*.svg *.svgz)"
             )
             dialog.setFileMode(QFileDialog.ExistingFile)
 
@@ -67,12 +81,24 @@ class MainWindow(QMainWindow):
         # Dictionnaires
         self.image_layers = {}
         self.image_layer_widgets = {}
-        self.tree_items_by_id = {}
-        self.group_items_by_id = {}
+        self.geometry_store = GeometryStore()   # géométrie des pièces, par GroupItem.store_index
+        self.piece_items = {}                   # indice du GeometryStore -> GroupItem (scène non virtualisée)
+        self.subtree_index = None               # feuilles de chaque groupe, construit en fin de chargement
+        self.highlighted_roots = set()          # nœuds surlignés par color_tree_selection
+        self.element_index = None               # recherche par id / calque, construit en fin de chargement
+        self.image_decoder = ImageDecoder(self)  # décodage des calques image hors du thread graphique
+        self.image_decoder.decoded.connect(self.on_image_decoded)
+        self.image_decoder.failed.connect(self.on_image_failed)
+        self.image_decoder.thumbnail.connect(self.on_image_thumbnail)
+        self.image_load_errors = []
+        self.layer_memory = LayerMemory(self.image_decoder, parent=self)  # budget et éviction LRU
+        self.image_adjust_dialog = None
 
         # Widgets
         self.init_tree_widget()
+        self.init_search_box()
         self.init_svg_preview()
+        self.init_status_bar()
 
         # Tabs
         self.tabs = QTabWidget()
@@ -92,9 +118,9 @@ class MainWindow(QMainWindow):
         # SVG Layer (doit exister avant on_tab_changed)
         svg_file = choose_svg_file()
         self.load_svg_layer(svg_file)
-        parse_svg_or_group(svg_file, self)
         self.svg_preview.setScene(self.svg_layer.scene)
         self.init_connections()
+        self.start_svg_loading(svg_file)
 
         # Toolbar
         self.toolbar = CollapsibleToolbar(
@@ -107,6 +133,12 @@ class MainWindow(QMainWindow):
         # 🟢 Appel maintenant que tout est prêt
         self.on_tab_changed(0)
 
+    def closeEvent(self, event):
+        self.image_decoder.shutdown()   # processus de rastérisation PDF encore en cours
+        for layer_widget in self.image_layer_widgets.values():
+            layer_widget.close_layer()
+        super().closeEvent(event)
+
     def init_palette(self):
         """Renvoie une palette sombre pour l'UI."""
         palette = QPalette()
@@ -127,6 +159,8 @@ class MainWindow(QMainWindow):
     def init_layout(self):
         right_layout = QVBoxLayout()
         right_layout.addWidget(self.svg_preview)
+        right_layout.addWidget(self.search_edit)
+        right_layout.addWidget(self.search_filter)
         right_layout.addWidget(self.tree)
         right_widget = QWidget()
         right_widget.setLayout(right_layout)
@@ -136,12 +170,20 @@ class MainWindow(QMainWindow):
         self.layout = main_layout
 
     def init_connections(self):
-        self.tree.itemSelectionChanged.connect(self.sync_tree_to_scene)
+        self.tree.selectionModel().selectionChanged.connect(self.sync_tree_to_scene)
+        self.tree.selectionModel().selectionChanged.connect(self.color_tree_selection)
+        self.tree_model.rowsInserted.connect(self.on_tree_rows_inserted)
         self.svg_layer.scene.selectionChanged.connect(self.sync_scene_to_tree)
+        self.search_edit.textChanged.connect(self.run_element_search)
+        self.search_edit.returnPressed.connect(self.frame_selected_pieces)
+        self.search_filter.currentIndexChanged.connect(self.run_element_search)
 
         QShortcut(QKeySequence("Ctrl+D"), self).activated.connect(self.duplicate_via_toolbar_or_shortcut)
         QShortcut(QKeySequence("Ctrl+E"), self).activated.connect(self.export_active_layer_to_svg)
         QShortcut(QKeySequence("Ctrl+N"), self).activated.connect(self.open_nesting_dialog)
+        QShortcut(QKeySequence("Ctrl+R"), self).activated.connect(self.toggle_svg_watch)
+        QShortcut(QKeySequence("Ctrl+B"), self).activated.connect(self.toggle_svg_backdrop)
+        QShortcut(QKeySequence("Ctrl+L"), self).activated.connect(self.open_image_adjust_dialog)
 
     def init_svg_preview(self):
         # Vue miniature non interactive pour l'aperçu
@@ -157,13 +199,54 @@ class MainWindow(QMainWindow):
         svg_preview.hide()  # masquée par défaut
         self.svg_preview = svg_preview
 
+    def init_status_bar(self):
+        # Progression du chargement SVG + bouton d'annulation
+        self.load_progress = QProgressBar()
+        self.load_progress.setRange(0, 100)
+        self.load_progress.setMaximumWidth(200)
+        self.load_cancel_btn = QPushButton("Annuler")
+        self.load_cancel_btn.setFlat(True)
+        status_bar = self.statusBar()
+        status_bar.setStyleSheet("color: white;")
+        status_bar.addPermanentWidget(self.load_progress)
+        status_bar.addPermanentWidget(self.load_cancel_btn)
+        self.load_progress.hide()
+        self.load_cancel_btn.hide()
+
+        # Mémoire des calques image face au budget (voir LayerMemory)
+        self.memory_label = QLabel()
+        self.memory_label.setToolTip(
+            "Mémoire des calques image / budget (WOODINLAY_IMAGE_BUDGET_MB).\n"
+            "Au-delà, les calques inactifs ne gardent qu'un aperçu basse résolution."
+        )
+        status_bar.addPermanentWidget(self.memory_label)
+        self.layer_memory.usage_changed.connect(self.update_memory_label)
+        self.update_memory_label(0, self.layer_memory.budget)
+
+    def update_memory_label(self, used, budget):
+        self.memory_label.setText(f"🖼 {used / 2**20:.0f} / {budget / 2**20:.0f} Mo")
+        self.memory_label.setStyleSheet("color: #ff6060;" if used > budget else "")
+
     def init_tree_widget(self):
-        tree = QTreeWidget()
-        tree.setHeaderLabels(["Éléments SVG"])
+        # Modèle paresseux : les lignes ne sont créées qu'au dépliage des branches
+        tree = QTreeView()
+        self.tree_model = ElementTreeModel("Éléments SVG", tree)
+        self.tree_items_by_id = self.tree_model.nodes   # element_id -> ElementNode
+        tree.setModel(self.tree_model)
+        tree.setUniformRowHeights(True)
         tree.setMinimumWidth(200)
         tree.setItemDelegate(TreeItemHighlightDelegate())
         self.tree = tree
 
+    def init_search_box(self):
+        # Recherche par id (« ^ » en tête : préfixe) et filtre de duplication
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("Rechercher un id (^ : préfixe)")
+        self.search_edit.setClearButtonEnabled(True)
+        self.search_filter = QComboBox()
+        self.search_filter.addItem("Toutes les pièces", None)
+        self.search_filter.addItem("Non dupliquées", NOT_DUPLICATED)
+
     def active_scene(self):
         current_tab = self.tabs.currentWidget()
         if current_tab is None:
@@ -199,23 +282,46 @@ class MainWindow(QMainWindow):
         debug_log(f"[LOAD] ➜ Traitement de : {image_path}")
         supported_formats = (".png", ".jpg", ".jpeg", ".bmp", ".gif", ".pdf")
 
-        if not image_path.lower().endswith(supported_formats):
+        file_path, _ = split_layer_path(image_path)
+        if not file_path.lower().endswith(supported_formats):
             DarkMessageBox.critical(self, "Erreur", f"❌ Format non supporté : {image_path}")
             return
 
-        # 📄 Conversion ou chargement direct selon l'extension
-        if image_path.lower().endswith(".pdf"):
-            pixmap = self.render_pdf_to_pixmap(image_path)
-        else:
-            pixmap = QPixmap(image_path)
-
-        if pixmap is None or pixmap.isNull():
-            debug_log(f"[ERROR] ❌ Impossible de charger le fichier : {image_path}")
-            DarkMessageBox.critical(self, "Erreur", f"❌ Impossible de charger le fichier : {image_path}")
-            return
+        # 📚 PDF de plusieurs pages : choix des pages, une par calque
+        if file_path.lower().endswith(".pdf") and file_path == image_path:
+            try:
+                page_count = pdf_page_count(file_path)
+            except Exception as e:
+                DarkMessageBox.critical(self, "Erreur", f"❌ Impossible d'ouvrir le PDF : {file_path}\n{e}")
+                return
+            if page_count > 1:
+                page_numbers = PdfPagesDialog(file_path, page_count, self).get_page_numbers()
+                if page_numbers is not None:
+                    self.load_pdf_layers(file_path, page_numbers)
+                return
 
-        # 🎯 Création du widget calque image
-        layer_widget = ImageLayerWidget(image_path=image_path, pixmap=pixmap)
+        if self.add_image_layer_tab(image_path):
+            self.image_decoder.decode(image_path)
+
+    def load_pdf_layers(self, pdf_path, page_numbers):
+        """Importe des pages d'un PDF comme calques : les onglets apparaissent tout de suite,
+        avec leur vignette dès qu'elle est prête, puis le raster de chaque page."""
+        page_numbers = [
+            page_number for page_number in page_numbers
+            if self.add_image_layer_tab(pdf_layer_path(pdf_path, page_number))
+        ]
+        if page_numbers:
+            self.image_decoder.decode_pdf_pages(pdf_path, page_numbers)
+
+    def add_image_layer_tab(self, image_path):
+        """Crée l'onglet (vide, en attente du décodage) d'un calque image."""
+        if image_path in self.image_layer_widgets:
+            self.statusBar().showMessage(f"{layer_display_name(image_path)} est déjà chargé", 5000)
+            return False
+
+        # 🎯 Création du widget calque image : l'onglet apparaît tout de suite, l'image
+        # (ou la page PDF) est décodée dans le pool d'ImageDecoder puis posée par on_image_decoded
+        layer_widget = ImageLayerWidget(image_path=image_path, pending=True)
 
         # 🔶 Cadre extérieur coloré (bordure)
         color = layer_widget.margin_color.name()
@@ -236,10 +342,11 @@ class MainWindow(QMainWindow):
 
         inner_layout.addWidget(inner_container)
 
-        # ⚠️ Fond gris foncé
-        layer_widget.view.setBackgroundBrush(QBrush(QColor(53, 53, 53)))
+        # ⚠️ Fond gris foncé, posé sur la scène : une brosse de vue court-circuiterait
+        # le drawBackground de la scène qui peint l'image de fond
+        layer_widget.scene.setBackgroundBrush(QBrush(QColor(53, 53, 53)))
 
-        tab_name = os.path.basename(image_path)
+        tab_name = layer_display_name(image_path)
 
         # 📌 Insertion avant l’onglet "+"
         plus_index = self.tabs.count() - 1
@@ -247,10 +354,66 @@ class MainWindow(QMainWindow):
 
         self.image_layer_widgets[image_path] = layer_widget
         self.image_layers[outer_frame] = layer_widget
+        layer_widget.memory_changed.connect(self.layer_memory.loaded)
+        self.search_filter.addItem(f"Dupliquées sur {tab_name}", image_path)
 
         self.tabs.tabBar().set_tab_color(index, layer_widget.margin_color)
 
         print(f"[INFO] 🟢 Onglet ajouté : {tab_name} (image_path {image_path})")
+        return True
+
+    def on_image_thumbnail(self, image_path, image):
+        layer_widget = self.image_layer_widgets.get(image_path)
+        if layer_widget is not None:
+            layer_widget.set_thumbnail(image)
+
+    def on_image_decoded(self, image_path, buffer, pyramid):
+        layer_widget = self.image_layer_widgets.get(image_path)
+        if layer_widget is None:
+            return
+        reloaded = layer_widget.evicted
+        layer_widget.set_image(buffer, pyramid)
+        self.layer_memory.loaded(layer_widget)
+        if reloaded:
+            debug_log(f"[OK] ♻️ Calque rechargé : {image_path}")
+            return
+        debug_log(f"[OK] ✅ Image décodée : {image_path} ({buffer.width}x{buffer.height})")
+        self.statusBar().showMessage(f"{layer_display_name(image_path)} chargé", 3000)
+        self.report_image_load_errors()
+
+    def on_image_failed(self, image_path, message):
+        """Échec de décodage d'un fichier : son onglet est retiré, le lot continue."""
+        print(f"[ERROR] ❌ Impossible de charger le fichier : {image_path} ({message})")
+        layer_widget = self.image_layer_widgets.get(image_path)
+        if layer_widget is not None and layer_widget.evicted:
+            # Rechargement après éviction : le calque garde son aperçu basse résolution
+            self.statusBar().showMessage(f"❌ Impossible de recharger {layer_display_name(image_path)}", 5000)
+            return
+        self.image_layer_widgets.pop(image_path, None)
+        if layer_widget is not None:
+            layer_widget.close_layer()
+            self.layer_memory.remove(layer_widget)
+            if self.image_adjust_dialog is not None and self.image_adjust_dialog.layer_widget is layer_widget:
+                self.image_adjust_dialog.close()
+                self.image_adjust_dialog = None
+        for frame, widget in list(self.image_layers.items()):
+            if widget is layer_widget:
+                del self.image_layers[frame]
+                self.tabs.removeTab(self.tabs.indexOf(frame))
+                frame.deleteLater()
+        index = self.search_filter.findData(image_path)
+        if index >= 0:
+            self.search_filter.removeItem(index)
+        self.image_load_errors.append(f"{layer_display_name(image_path)} : {message}")
+        self.statusBar().showMessage(f"❌ Impossible de charger {layer_display_name(image_path)}", 5000)
+        self.report_image_load_errors()
+
+    def report_image_load_errors(self):
+        """Une fois le lot décodé, résume les fichiers en échec dans une seule boîte."""
+        if self.image_decoder.pending or not self.image_load_errors:
+            return
+        errors, self.image_load_errors = self.image_load_errors, []
+        DarkMessageBox.critical(self, "Erreur", "❌ Impossible de charger :\n" + "\n".join(errors))
 
     def load_svg_layer(self, file_path):
         # Créer l'objet SvgLayerWidget
@@ -263,60 +426,264 @@ class MainWindow(QMainWindow):
         self.colored_tabbar.set_tab_color(0, QColor(45, 45, 45))
 
 
-    def render_pdf_to_pixmap(self, pdf_path, page_number=0, dpi=300):
-        try:
-            doc = fitz.open(pdf_path)
-
-            debug_log(f"Nombre de pages dans le PDF : {doc.page_count}")
-            if doc.page_count == 0:
-                print("[ERROR] PDF vide")
-                return None
-
-            page = doc.load_page(page_number)
-            debug_log(f"Dimensions de la page : {page.rect}")
-
-            # DPI plus élevé pour un rendu correct (par défaut c’est 72dpi = très petit)
-            mat = fitz.Matrix(dpi / 72, dpi / 72)
-            pix = page.get_pixmap(matrix=mat, alpha=True)
-            debug_log(f"Rendu : {pix.width}x{pix.height}")
-
-            # === ÉTAPE 3 : Conversion QImage → QPixmap ===
-            mode = QImage.Format_RGBA8888 if pix.alpha else QImage.Format_RGB888
-            image = QImage(pix.samples, pix.width, pix.height, pix.stride, mode).copy()
-            pixmap = QPixmap.fromImage(image)
-
-            if pixmap.isNull():
-                print("[ERROR] QPixmap vide après conversion")
-                return None
-
-            return pixmap
-
-        except Exception as e:
-            print(f"[ERROR] PDF rendering failed: {e}")
-            return None
+    def start_svg_loading(self, svg_file):
+        """Lance le chargement par lots du SVG : la fenêtre reste utilisable pendant le parsing."""
+        self.svg_watcher = None
+        if use_virtual_scene(os.path.getsize(svg_file)):
+            debug_log("Scène SVG virtualisée")
+            self.svg_layer.virtualizer = PieceVirtualizer(
+                self.svg_layer.scene, self.svg_layer.view, self.geometry_store
+            )
+        self.svg_loader = SvgStreamLoader(svg_file, self)
+        self.svg_loader.progress.connect(self.load_progress.setValue)
+        self.svg_loader.finished.connect(self.on_svg_loading_finished)
+        self.load_cancel_btn.clicked.connect(self.svg_loader.cancel)
+        self.load_progress.setValue(0)
+        self.load_progress.show()
+        self.load_cancel_btn.show()
+        self.statusBar().showMessage(f"Chargement de {os.path.basename(svg_file)}…")
+        self.svg_loader.start()
+
+    def on_svg_loading_finished(self, completed):
+        self.load_progress.hide()
+        self.load_cancel_btn.hide()
+        count = self.svg_loader.piece_count
+        if completed:
+            self.statusBar().showMessage(f"{count} pièces chargées", 5000)
+            # Les nœuds passent au watcher (base du rechargement différentiel), seul à les garder
+            loader = self.svg_loader
+            nodes, loader.nodes = loader.nodes, []
+            self.subtree_index = SubtreeIndex(nodes)
+            self.element_index = ElementIndex(self.subtree_index.leaf_ids)
+            self.svg_watcher = SvgFileWatcher(loader.svg_file, nodes, loader.digest)
+            self.svg_watcher.reloaded.connect(self.apply_svg_diff)
+            self.svg_watcher.set_enabled(True)
+        else:
+            self.statusBar().showMessage(f"Chargement interrompu ({count} pièces chargées)")
+        self.update_svg_preview()
 
+    def toggle_svg_watch(self):
+        """Active / coupe le rechargement automatique du SVG source (Ctrl+R)."""
+        if self.svg_watcher is None:
+            self.statusBar().showMessage("Surveillance indisponible : le SVG n'est pas entièrement chargé", 5000)
+            return
+        enabled = not self.svg_watcher.enabled
+        self.svg_watcher.set_enabled(enabled)
+        state = "activée" if enabled else "désactivée"
+        self.statusBar().showMessage(f"Surveillance du SVG source {state}", 5000)
+
+    def toggle_svg_backdrop(self):
+        """Affiche / supprime le fond SVG rendu en tuiles (Ctrl+B)."""
+        enabled = self.svg_layer.backdrop is None
+        self.svg_layer.set_backdrop_enabled(enabled)
+        state = "affiché" if enabled else "supprimé"
+        self.statusBar().showMessage(f"Fond SVG {state}", 5000)
+
+    def apply_svg_diff(self, diff):
+        """Reporte un SvgDiff sur la scène et l'arbre : seules les pièces touchées sont
+        reconstruites, les autres (duplicatas, sélection, couleurs) restent en place."""
+        model = self.tree_model
+        old_group_items = [self.tree_items_by_id.get(group_id) for group_id in diff.removed_groups]
+
+        # Pas de recadrage : la vue reste sur la zone où l'on travaille
+        with self.bulk_insert(fit=False):
+            for group in diff.added_groups:
+                self.add_group_to_tree(group.group_id, self.tree_items_by_id.get(group.parent_id))
+
+            virtualizer = self.svg_layer.virtualizer
+            for piece in diff.modified:
+                store_index = self.geometry_store.update(piece)
+                if virtualizer:
+                    virtualizer.update(piece)
+                else:
+                    self.piece_items[store_index].update_from_piece(piece)
+
+            for element_id in diff.removed:
+                self.remove_svg_item(element_id)
+
+            self.add_svg_pieces([(piece, self.tree_items_by_id.get(piece.group_id)) for piece in diff.added])
+
+            # Seules les pièces modifiées ont pu changer de groupe (le groupe fait partie de
+            # leur contenu, voir SvgPiece.content_key) : on déplace celles dont le nœud
+            # d'arbre n'est plus sous le bon parent
+            moved = False
+            for piece in diff.modified:
+                tree_item = self.tree_items_by_id[piece.element_id]
+                parent = self.tree_items_by_id.get(piece.group_id) or model.root
+                if tree_item.parent is not parent:
+                    model.move_node(tree_item, parent)
+                    moved = True
+
+            for group_id, tree_item in zip(diff.removed_groups, old_group_items):
+                if tree_item is not None and tree_item.parent is not None:
+                    model.remove_node(tree_item)
+
+        store_nodes(self.svg_watcher.digest, diff.nodes, self.geometry_store)
+
+        # Ids, groupes ou ordre des pièces changés : on renumérote les plages depuis le
+        # nouvel arbre (une modification de contenu seule les laisse tels quels)
+        if diff.added or diff.removed or diff.added_groups or diff.removed_groups or moved:
+            self.subtree_index = SubtreeIndex(diff.nodes)
+            self.subtree_index.reset_selection(self.selected_piece_ids())
+            if self.element_index is not None:
+                self.element_index = ElementIndex(self.subtree_index.leaf_ids, self.element_index.layers)
+
+        self.statusBar().showMessage(
+            f"SVG rechargé : +{len(diff.added)} −{len(diff.removed)} ~{len(diff.modified)} pièces", 5000
+        )
+        self.update_svg_preview()
 
     def add_group_to_tree(self, group_id, parent_tree_item=None):
-        parent = parent_tree_item or self.tree.invisibleRootItem()
-        group_item = QTreeWidgetItem(parent)
-        group_item.setText(0, group_id)
-        group_item.setData(0, Qt.UserRole, group_id)
-
-        self.tree_items_by_id[group_id] = group_item
-        return group_item
+        return self.tree_model.add_node(group_id, parent_tree_item, is_group=True)
+
+    @contextmanager
+    def bulk_insert(self, fit=True):
+        """Ajout groupé de pièces et de groupes (un lot du chargement, un rechargement) :
+        scène en insertion groupée, arbre sans signaux ni repeinte jusqu'à la fin du bloc.
+        `fit` : recadrer la vue à la sortie (voir SvgLayerWidget.bulk_insert)."""
+        selection_model = self.tree.selectionModel()
+        tree_signals = selection_model.blockSignals(True)
+        self.tree.setUpdatesEnabled(False)
+        try:
+            with self.svg_layer.bulk_insert(fit):
+                yield
+        finally:
+            self.tree.setUpdatesEnabled(True)
+            selection_model.blockSignals(tree_signals)
+
+    def add_svg_pieces(self, pieces):
+        """Enregistre des SvgPiece aplaties, données avec leur nœud parent dans l'arbre :
+        géométrie dans le store (déjà inscrite si elle vient du cache géométrique), puis
+        items de scène ajoutés d'un bloc (ou, en mode virtualisé, simple inscription
+        auprès du PieceVirtualizer), puis nœuds de l'arbre dans l'ordre donné."""
+        virtualizer = self.svg_layer.virtualizer
+        items = []
+        for piece, _ in pieces:
+            store_index = self.geometry_store.index(piece.element_id)
+            if store_index is None:
+                store_index = self.geometry_store.append(piece)
+            if virtualizer:
+                virtualizer.add(piece)
+                continue
+            group_item = GroupItem.from_piece(piece)
+            group_item.store_index = store_index
+            self.piece_items[store_index] = group_item
+            items.append(group_item)
+        if items:
+            self.svg_layer.add_many(items)
+        for piece, parent_tree_item in pieces:
+            self.add_piece_to_tree(piece.element_id, parent_tree_item)
 
     def add_svg_item(self, item, parent_tree_item=None):
         # Ajout à la scène via SvgLayerWidget
-        self.svg_layer.items_map[item.element_id] = item
         self.svg_layer.add_to_scene(item)
+        self.add_piece_to_tree(item.element_id, parent_tree_item)
+        self.piece_items[item.store_index] = item
 
-        # Création du nœud dans l'arborescence
-        tree_parent = parent_tree_item or self.tree.invisibleRootItem()
-        tree_item = QTreeWidgetItem(tree_parent)
-        tree_item.setText(0, item.element_id)
-        tree_item.setData(0, Qt.UserRole, item.element_id)
-        self.tree_items_by_id[item.element_id]  = tree_item
-        self.group_items_by_id[item.element_id] = item
+    def add_piece_to_tree(self, element_id, parent_tree_item=None):
+        # Création du nœud dans l'arborescence (ligne exposée seulement si la branche l'est)
+        self.tree_model.add_node(element_id, parent_tree_item)
+
+    def remove_svg_item(self, element_id):
+        virtualizer = self.svg_layer.virtualizer
+        if virtualizer:
+            if self.geometry_store.index(element_id) not in virtualizer.pieces:
+                return
+            virtualizer.remove(element_id)
+        else:
+            item = self.piece_items.pop(self.geometry_store.index(element_id), None)
+            if item is None:
+                return
+            item.discard_duplicata()
+            if item.scene():
+                item.scene().removeItem(item)
+        self.geometry_store.remove(element_id)
+        tree_item = self.tree_items_by_id.get(element_id)
+        if tree_item is not None:
+            self.tree_model.remove_node(tree_item)
+
+    # --- Accès aux pièces, matérialisées ou non (mode virtualisé) ---
+
+    def is_svg_piece(self, element_id):
+        return self.geometry_store.index(element_id) is not None
+
+    def svg_item(self, element_id):
+        """GroupItem d'une pièce ; en mode virtualisé il est créé au besoin."""
+        virtualizer = self.svg_layer.virtualizer
+        if virtualizer:
+            return virtualizer.item(element_id)
+        return self.piece_items.get(self.geometry_store.index(element_id))
+
+    def selected_svg_items(self):
+        virtualizer = self.svg_layer.virtualizer
+        if virtualizer:
+            return virtualizer.selected_items()
+        return self.svg_layer.scene.selectedItems()
+
+    def selected_piece_ids(self):
+        virtualizer = self.svg_layer.virtualizer
+        if virtualizer:
+            return list(virtualizer.selected)
+        return [item.element_id for item in self.svg_layer.scene.selectedItems()]
+
+    def is_piece_selected(self, element_id):
+        virtualizer = self.svg_layer.virtualizer
+        if virtualizer:
+            return virtualizer.is_selected(element_id)
+        return self.svg_item(element_id).isSelected()
+
+    def set_pieces_selected(self, element_ids, selected=True):
+        if self.subtree_index is not None:
+            self.subtree_index.set_selected(element_ids, selected)
+        virtualizer = self.svg_layer.virtualizer
+        if virtualizer:
+            virtualizer.set_selected(element_ids, selected)
+            return
+        for element_id in element_ids:
+            group_item = self.svg_item(element_id)
+            if group_item:
+                group_item.setSelected(selected)
+
+    def select_pieces(self, element_ids):
+        """Remplace la sélection de la scène par `element_ids`, en un seul passage."""
+        scene = self.svg_layer.scene
+        scene.blockSignals(True)
+        self.set_pieces_selected(self.selected_piece_ids(), False)
+        self.set_pieces_selected(element_ids, True)
+        scene.blockSignals(False)
+        self.select_tree_nodes(set(element_ids))
+        scene.update()
+
+    def run_element_search(self):
+        if self.element_index is None:
+            self.statusBar().showMessage("Recherche disponible à la fin du chargement", 3000)
+            return
+        text = self.search_edit.text().strip()
+        prefix = text.startswith("^")
+        if prefix:
+            text = text[1:]
+        layer = self.search_filter.currentData()
+        if not text and layer is None:
+            return  # champ vidé : on ne touche pas à la sélection en cours
+        element_ids = self.element_index.search(text, prefix, layer)
+        self.select_pieces(element_ids)
+        self.statusBar().showMessage(f"{len(element_ids)} pièce(s) trouvée(s)", 5000)
+
+    def frame_selected_pieces(self):
+        """Cadre la vue SVG sur les pièces sélectionnées (boîtes lues dans le GeometryStore)."""
+        store = self.geometry_store
+        indices = [store.index(element_id) for element_id in self.selected_piece_ids()]
+        indices = [index for index in indices if index is not None]
+        if not indices:
+            return
+        boxes = store.bboxes[indices]
+        x0, y0 = boxes[:, 0].min(), boxes[:, 1].min()
+        x1, y1 = boxes[:, 2].max(), boxes[:, 3].max()
+        rect = QRectF(float(x0), float(y0), float(x1 - x0), float(y1 - y0))
+        margin = max(rect.width(), rect.height()) * 0.1 + 1
+        view = self.svg_layer.view
+        view.fitInView(rect.adjusted(-margin, -margin, margin, margin), Qt.KeepAspectRatio)
+        view.viewChanged.emit()
 
     def get_current_view(self):
         current_widget = self.tabs.currentWidget()
@@ -348,6 +715,7 @@ class MainWindow(QMainWindow):
 
     def on_tab_changed(self, index):
         widget = self.tabs.widget(index)
+        self.layer_memory.activate(self.image_layers.get(widget))
         if widget == self.svg_layer:
             self.svg_preview.hide()
         else:
@@ -356,49 +724,83 @@ class MainWindow(QMainWindow):
 
     def sync_scene_to_tree(self):
         """Synchronise la sélection dans la scène vers l’arbre."""
-        self.tree.blockSignals(True)
-        self.tree.clearSelection()
-
-        for item in self.svg_layer.scene.selectedItems():
-            tree_item = self.tree_items_by_id.get(item.element_id)
-            if tree_item:
-                tree_item.setSelected(True)
-
-        self.tree.blockSignals(False)
-
-    def sync_tree_to_scene(self):
-        selected_tree_items = self.tree.selectedItems()
+        if self.svg_layer.virtualizer:
+            self.svg_layer.virtualizer.sync_selection()
+        self.select_tree_nodes(set(self.selected_piece_ids()))
+
+    def select_tree_nodes(self, selected_ids):
+        """Reporte dans l'arbre la sélection de pièces `selected_ids`.
+
+        Appelé à chaque selectionChanged (en continu pendant un rubber band) : seuls les
+        nœuds entrés ou sortis de la sélection depuis l'appel précédent sont touchés."""
+        model = self.tree_model
+        if self.subtree_index is not None:
+            self.subtree_index.reset_selection(selected_ids)
+
+        # Les groupes choisis dans l'arbre sortent aussi : la scène remplace la sélection
+        removed = [node for node in model.selected if node.element_id not in selected_ids]
+        added = [
+            node for node in map(model.nodes.get, selected_ids)
+            if node is not None and not node.selected
+        ]
+        if not removed and not added:
+            return
+        for node in removed:
+            model.set_node_selected(node, False)
+        for node in added:
+            model.set_node_selected(node, True)
+
+        # Seules les lignes exposées passent par le modèle de sélection de la vue
+        selection_model = self.tree.selectionModel()
+        selection_model.blockSignals(True)
+        if removed:
+            selection_model.select(model.selection_for(removed), QItemSelectionModel.Deselect)
+        if added:
+            selection_model.select(model.selection_for(added), QItemSelectionModel.Select)
+        selection_model.blockSignals(False)
+        self.color_tree_selection()
+        self.tree.viewport().update()
+
+    def on_tree_rows_inserted(self, parent, first, last):
+        """Lignes nouvellement exposées (dépliage) : reprend leur état de sélection."""
+        node = self.tree_model.node_from_index(parent)
+        selected = [child for child in node.children[first:last + 1] if child.selected]
+        if selected:
+            selection_model = self.tree.selectionModel()
+            selection_model.blockSignals(True)
+            selection_model.select(self.tree_model.selection_for(selected), QItemSelectionModel.Select)
+            selection_model.blockSignals(False)
+
+    def sync_tree_to_scene(self, selected=None, deselected=None):
+        model = self.tree_model
+        if selected is not None:
+            for index in deselected.indexes():
+                model.set_node_selected(model.node_from_index(index), False)
+            for index in selected.indexes():
+                model.set_node_selected(model.node_from_index(index), True)
+        selected_tree_items = [model.node_from_index(index) for index in self.tree.selectionModel().selectedIndexes()]
         scene = self.svg_layer.scene
 
         # ⏸️ Bloque temporairement les signaux
         scene.blockSignals(True)
 
-        # Étape 1 – collecter les feuilles liées à chaque item sélectionné
-        def collect_leaf_ids(tree_item):
-            ids = []
-            if tree_item.childCount() == 0:
-                element_id = tree_item.data(0, Qt.UserRole)
-                if element_id in self.group_items_by_id:
-                    ids.append(element_id)
-            else:
-                for i in range(tree_item.childCount()):
-                    ids.extend(collect_leaf_ids(tree_item.child(i)))
-            return ids
-
-        # Étape 2 – Détecter si les feuilles sont toutes sélectionnées
+        index = self.subtree_index
         for tree_item in selected_tree_items:
-            leaf_ids = collect_leaf_ids(tree_item)
-            all_selected = all(
-                self.group_items_by_id.get(id_).isSelected()
-                for id_ in leaf_ids if id_ in self.group_items_by_id
-            )
+            span = index.span(tree_item.element_id) if index is not None else None
+            if span is not None:
+                # Étape 1 – feuilles du sous-arbre = une plage de l'index, état lu sur le masque
+                leaf_ids = index.leaves(*span)
+                all_selected = index.all_selected(*span)
+            else:
+                # Chargement en cours : l'index n'existe pas encore, on parcourt l'arbre
+                leaf_ids = [
+                    node.element_id for node in model.leaf_nodes(tree_item)
+                    if self.is_svg_piece(node.element_id)
+                ]
+                all_selected = all(self.is_piece_selected(id_) for id_ in leaf_ids)
 
-            # Étape 3 – toggle sélection dans la scène
-            for id_ in leaf_ids:
-                group_item = self.group_items_by_id.get(id_)
-                if not group_item:
-                    continue
-                group_item.setSelected(not all_selected)  # toggle selon état global
+            # Étape 2 – toggle sélection dans la scène, en un seul passage
+            self.set_pieces_selected(leaf_ids, not all_selected)  # toggle selon état global
 
         scene.blockSignals(False)
 
@@ -409,7 +811,7 @@ class MainWindow(QMainWindow):
         current_widget = self.tabs.currentWidget()
         debug_log(f"Widget actif : {current_widget}")
 
-        selected_items = self.svg_layer.scene.selectedItems()
+        selected_items = self.selected_svg_items()
         debug_log(f"Nombre d’éléments sélectionnés dans la scène : {len(selected_items)}")
         debug_log(f"Items sélectionnés : {[getattr(it, 'element_id', '??') for it in selected_items]}")
 
@@ -460,7 +862,7 @@ class MainWindow(QMainWindow):
         debug_log("END")
 
     def open_background_selection_dialog(self):
-        selected = self.svg_layer.scene.selectedItems()
+        selected = self.selected_piece_ids()
         if not selected:
             DarkMessageBox.information(self, "Info", "Sélectionnez un élément SVG à dupliquer.")
             return None
@@ -496,77 +898,22 @@ class MainWindow(QMainWindow):
         layer_widget = self.image_layer_widgets[image_path]
         color = layer_widget.margin_color
 
-        for col in range(tree_item.columnCount()):
-            tree_item.setBackground(col, color)
-
-        # Si parent, essaye aussi de colorer le groupe
-        parent = tree_item.parent()
-        if parent:
-            self.apply_group_item_color(parent)
-
-    def apply_group_item_color(self, group_item) -> Optional[QColor]:
-        """Colorie le groupe si tous ses enfants directs ont une couleur (identique ou non).
-        Retourne la couleur appliquée ou None si aucune."""
-        if group_item.childCount() == 0:
-            return None  # Ce n'est pas un groupe
-
-        child_colors = set()
-
-        for i in range(group_item.childCount()):
-            child = group_item.child(i)
-
-            # Récupérer la couleur de l'enfant
-            if child.childCount() > 0:
-                # Enfant est un groupe → on suppose qu’il est déjà coloré
-                brush = child.background(0)
-                if brush.style() != Qt.NoBrush:
-                    child_colors.add(brush.color().name())
-                else:
-                    return None  # Enfant groupe non encore coloré → on arrête ici
-            else:
-                # Enfant normal
-                brush = child.background(0)
-                if brush.style() != Qt.NoBrush:
-                    child_colors.add(brush.color().name())
-                else:
-                    return None  # Un enfant non coloré → le groupe ne l’est pas
-
-        # Si tous les enfants sont colorés
-        if len(child_colors) == 1:
-            final_color = QColor(list(child_colors)[0])
-        else:
-            final_color = QColor("#888888")  # Couleur pour duplication multiple
-
-        for col in range(group_item.columnCount()):
-            group_item.setBackground(col, final_color)
-
-        return final_color
+        self.tree_model.set_background(tree_item, color)   # propage aux groupes parents
 
     def color_tree_selection(self):
-        def apply_color_recursive(tree_item, color):
-            for col in range(tree_item.columnCount()):
-                tree_item.setBackground(col, color)
-            for i in range(tree_item.childCount()):
-                apply_color_recursive(tree_item.child(i), color)
-
-        selected_items = self.tree.selectedItems()
-        default_color = self.tree.palette().base().color()
-        selection_color = QColor("#a8d5ff")  # Exemple couleur sélection personnalisée
-
-        # D’abord, réinitialiser les couleurs de TOUS les items
-        def mask_all_colors(item):
-            for col in range(item.columnCount()):
-                item.setBackground(col, default_color)
-            for i in range(item.childCount()):
-                mask_all_colors(item.child(i))
-
-        root = self.tree.invisibleRootItem()
-        for i in range(root.childCount()):
-            mask_all_colors(root.child(i))
-
-        # Puis colorer récursivement les items sélectionnés et leurs enfants
-        for item in selected_items:
-            apply_color_recursive(item, selection_color)
+        """Surligne les sous-arbres sélectionnés dans l'arbre.
+
+        Travaille sur l'écart avec l'appel précédent : seuls les sous-arbres des racines
+        entrées dans la sélection ou sorties de celle-ci sont touchés. Le surlignage se
+        superpose aux couleurs de calque (voir ElementTreeModel.set_highlighted), qui
+        restent à jour pendant qu'un nœud est surligné."""
+        model = self.tree_model
+        current = set(model.selected)
+        for root in self.highlighted_roots - current:
+            model.set_highlighted(model.subtree_nodes(root), False)
+        for root in current - self.highlighted_roots:
+            model.set_highlighted(model.subtree_nodes(root), True)
+        self.highlighted_roots = current
 
     def rotate_group(self, items, angle_degrees):
         if not items:
@@ -602,6 +949,17 @@ class MainWindow(QMainWindow):
             item.setPos(new_pos)
             item.setRotation(item.rotation() + angle_degrees)
 
+    def open_image_adjust_dialog(self):
+        """Réglages (niveaux, balance des blancs, contraste, netteté) du calque courant."""
+        layer_widget = self.image_layers.get(self.tabs.currentWidget())
+        if layer_widget is None:
+            self.statusBar().showMessage("Réglages : choisir d'abord un onglet de calque image", 3000)
+            return
+        if self.image_adjust_dialog is not None:
+            self.image_adjust_dialog.close()
+        self.image_adjust_dialog = ImageAdjustDialog(layer_widget, self)
+        self.image_adjust_dialog.show()
+
     def open_nesting_dialog(self):
         if self.tabs.currentWidget() == self.svg_layer:
             DarkMessageBox.information(self, "Info", "Le calepinage ne peut s’effectuer que sur un calque image.")
@@ -0,0 +1,184 @@
+#############################################################   .=<|||>=.   ####
+#|                                                              |(0)|||||      #
+#|   ui/pdf_detail.py                                           !!!!!!|||
+#|                                                         /||||||||||||/.:::::,
+#|   By: ctrichet <clement.trichet.pro@gmail.com>         |||||||!!!!!!/.:::::::
+#|                                                        ||||||/.::::::::::::::
+#|   Created: 2026/10/18 22:44:05 ctrichet                 \|||/.::::::::::::::'
+#|   Updated: 2026/10/19 12:55:05 ctrichet                      :::......
+#|                                                              :::::(0):      #
+#############################################################   ':::::::'   ####
+
+from collections import OrderedDict
+from math import ceil, floor, log2
+
+import fitz
+from PyQt5.QtCore import QObject, QRectF, QRunnable, QThreadPool, QTimer, pyqtSignal
+from PyQt5.QtGui import QImage, QPainter
+from PyQt5.QtWidgets import QGraphicsObject
+
+from core.image_adjust import NEUTRAL_ADJUSTMENTS
+from ui.background_scene import BackgroundItem
+from ui.image_adjust import adjust_image
+from ui.image_decoder import PDF_REFERENCE_DPI, render_pdf_region
+from utils.debug import debug_log
+
+DETAIL_GRID = 512               # zones rendues calées sur une grille (unités scène) : cache réutilisable
+DETAIL_MAX_DPI = 2400           # au-delà, le rendu vectoriel n'apporte plus rien au contrôle du fil
+DETAIL_MAX_PIXELS = 4096 * 4096
+DETAIL_CACHE_SIZE = 8           # rendus récents gardés
+
+
+class _DetailSignals(QObject):
+    rendered = pyqtSignal(object, QImage)       # (clé, image) émis depuis le thread de rendu
+
+
+class _DetailJob(QRunnable):
+    def __init__(self, item, key):
+        super().__init__()
+        self.item = item
+        self.doc = item.doc
+        self.page_number = item.page_number
+        self.key = key
+        self.adjustments = item.adjustments
+        self.signals = item.signals
+
+    def run(self):
+        try:
+            image = self.render()
+            if self.adjustments != self.item.adjustments:
+                image = QImage()        # réglages changés pendant le rendu
+            self.signals.rendered.emit(self.key, image)
+        except RuntimeError:
+            pass    # calque fermé pendant le rendu
+
+    def render(self):
+        if self.key != self.item._wanted:
+            return QImage()             # la vue a bougé depuis : rendu abandonné
+        dpi, x0, y0, x1, y1 = self.key
+        to_points = 72 / PDF_REFERENCE_DPI
+        clip = fitz.Rect(x0 * to_points, y0 * to_points, x1 * to_points, y1 * to_points)
+        try:
+            image = render_pdf_region(self.doc, self.page_number, clip, dpi)
+            if self.adjustments != NEUTRAL_ADJUSTMENTS:
+                image = adjust_image(image, self.adjustments)
+            return image
+        except Exception as e:
+            print(f"[ERROR] Rendu PDF détaillé impossible : {e}")
+            return QImage()
+
+
+class PdfDetailItem(BackgroundItem, QGraphicsObject):
+    """Rendu vectoriel de la zone visible d'une page PDF, par-dessus son raster de référence.
+
+    La scène est à l'échelle du raster de référence (PDF_REFERENCE_DPI), qui sert aux
+    masques et à l'affichage dézoomé. Au-delà de l'échelle 1, la zone visible est
+    re-rendue depuis le document gardé ouvert, à la résolution demandée par la vue
+    (arrondie à une puissance de 2), après `delay_ms` sans mouvement. Les derniers
+    rendus restent en cache : revenir sur une zone ne relance rien.
+    """
+
+    def __init__(self, pdf_path, view, page_number=0, delay_ms=150, parent=None):
+        super().__init__(parent)
+        self.doc = fitz.open(pdf_path)
+        self.page_number = page_number
+        self.view = view
+        rect = self.doc.load_page(page_number).rect
+        scale = PDF_REFERENCE_DPI / 72
+        self._page_rect = QRectF(0, 0, rect.width * scale, rect.height * scale)
+        self._renders = OrderedDict()   # (dpi, x0, y0, x1, y1) -> QImage, du moins au plus récent
+        self._wanted = None
+        self._pending = set()
+        self.adjustments = NEUTRAL_ADJUSTMENTS   # réglages du calque (ImageAdjuster), appliqués aux rendus
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(1)
+        self.signals = _DetailSignals(self)
+        self.signals.rendered.connect(self.on_rendered)
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(delay_ms)
+        self._timer.timeout.connect(self.refresh)
+        view.viewChanged.connect(self._timer.start)
+        self.setZValue(-0.5)    # au-dessus des tuiles de référence, sous les duplicatas
+
+    def boundingRect(self):
+        return self._page_rect
+
+    def paint(self, painter, option, widget=None):
+        if self._wanted is None:
+            return
+        # Rendu voulu s'il est prêt, sinon le plus récent (géométrie juste, netteté moindre)
+        key = self._wanted if self._wanted in self._renders else next(reversed(self._renders), None)
+        if key is None:
+            return
+        _, x0, y0, x1, y1 = key
+        image = self._renders[key]
+        painter.setRenderHint(QPainter.SmoothPixmapTransform)
+        painter.drawImage(QRectF(x0, y0, x1 - x0, y1 - y0), image, QRectF(image.rect()))
+
+    def refresh(self):
+        """Calcule la zone et la résolution voulues pour la vue, et lance leur rendu."""
+        scale = self.view.transform().m11()
+        if scale <= 1:
+            if self._wanted is not None:
+                self._wanted = None
+                self.update()
+            return  # le raster de référence suffit
+
+        dpi = min(DETAIL_MAX_DPI, PDF_REFERENCE_DPI * 2 ** ceil(log2(scale)))
+        visible = self.view.mapToScene(self.view.viewport().rect()).boundingRect()
+        area = visible.intersected(self._page_rect)
+        if area.isEmpty():
+            return
+        x0 = floor(area.left() / DETAIL_GRID) * DETAIL_GRID
+        y0 = floor(area.top() / DETAIL_GRID) * DETAIL_GRID
+        x1 = min(ceil(area.right() / DETAIL_GRID) * DETAIL_GRID, ceil(self._page_rect.right()))
+        y1 = min(ceil(area.bottom() / DETAIL_GRID) * DETAIL_GRID, ceil(self._page_rect.bottom()))
+        pixels = (x1 - x0) * (y1 - y0) * (dpi / PDF_REFERENCE_DPI) ** 2
+        if pixels > DETAIL_MAX_PIXELS:
+            dpi = PDF_REFERENCE_DPI * (DETAIL_MAX_PIXELS / ((x1 - x0) * (y1 - y0))) ** 0.5
+
+        key = (dpi, x0, y0, x1, y1)
+        self._wanted = key
+        if key in self._renders:
+            self._renders.move_to_end(key)
+            self.update()
+        elif key not in self._pending:
+            self._pending.add(key)
+            self._pool.start(_DetailJob(self, key))
+
+    def on_rendered(self, key, image):
+        self._pending.discard(key)
+        if image.isNull():
+            return
+        self._renders[key] = image
+        while len(self._renders) > DETAIL_CACHE_SIZE:
+            self._renders.popitem(last=False)
+        debug_log(f"Rendu PDF {key[0]:.0f} dpi : {image.width()}x{image.height()}")
+        if key == self._wanted:
+            self.update()
+
+    def set_adjustments(self, adjustments):
+        self.adjustments = adjustments
+        self._renders.clear()
+        self._pending.clear()
+        self._wanted = None
+        self.refresh()
+        self.update()
+
+    def nbytes(self):
+        return sum(image.sizeInBytes() for image in self._renders.values())
+
+    def clear_cache(self):
+        self._renders.clear()
+        self._wanted = None
+        self.update()
+
+    def close(self):
+        """Ferme le document (calque retiré) : plus aucun rendu ne sera lancé."""
+        self.view.viewChanged.disconnect(self._timer.start)
+        self._timer.stop()
+        self._pool.waitForDone()
+        self._renders.clear()
+        self._wanted = None
+        self.doc.close()
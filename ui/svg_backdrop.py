@@ -0,0 +1,265 @@
+#############################################################   .=<|||>=.   ####
+#|                                                              |(0)|||||      #
+#|   ui/svg_backdrop.py                                         !!!!!!|||
+#|                                                         /||||||||||||/.:::::,
+#|   By: ctrichet <clement.trichet.pro@gmail.com>         |||||||!!!!!!/.:::::::
+#|                                                        ||||||/.::::::::::::::
+#|   Created: 2026/10/18 19:02:14 ctrichet                 \|||/.::::::::::::::'
+#|   Updated: 2026/10/19 15:24:50 ctrichet                      :::......
+#|                                                              :::::(0):      #
+#############################################################   ':::::::'   ####
+
+import os
+import re
+import threading
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from math import ceil, floor, log2
+
+from PyQt5.QtCore import Qt, QObject, QRectF, QRunnable, QThreadPool, pyqtSignal
+from PyQt5.QtGui import QImage, QPainter, QPixmap
+from PyQt5.QtSvg import QSvgRenderer
+from PyQt5.QtWidgets import QGraphicsObject, QGraphicsItem
+from core.svg_parser import open_svg_stream
+from utils.debug import debug_log
+
+TILE_SIZE = 256                 # côté d'une tuile, en pixels écran
+DEFAULT_TILE_CACHE_MB = 96      # plafond mémoire des tuiles rendues
+MIN_LEVEL, MAX_LEVEL = -6, 6    # niveaux de zoom : échelle 2**niveau
+FALLBACK_LEVELS = 4             # niveaux plus grossiers affichés en attendant le rendu
+
+# Unités SVG en pixels utilisateur, comme QSvgRenderer (90 ppp)
+_UNITS = {"": 1.0, "px": 1.0, "pt": 1.25, "pc": 15.0, "mm": 3.543307, "cm": 35.43307, "in": 90.0}
+_LENGTH = re.compile(r"\s*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)\s*([a-z]*)\s*")
+
+
+def tile_cache_mb():
+    """Plafond des tuiles de chaque fond SVG, en Mo ; WOODINLAY_BACKDROP_CACHE_MB le remplace."""
+    value = os.environ.get("WOODINLAY_BACKDROP_CACHE_MB")
+    if not value:
+        return DEFAULT_TILE_CACHE_MB
+    try:
+        return max(1, int(value))
+    except ValueError:
+        debug_log(f"[WARN] WOODINLAY_BACKDROP_CACHE_MB invalide : {value!r}")
+        return DEFAULT_TILE_CACHE_MB
+
+
+def _length(value):
+    match = _LENGTH.fullmatch(value or "")
+    if match is None or match.group(2) not in _UNITS:
+        return None
+    return float(match.group(1)) * _UNITS[match.group(2)]
+
+
+def read_view_box(svg_file):
+    """Cadre du SVG lu sur la seule balise racine (viewBox, à défaut width/height) :
+    QSvgRenderer interpréterait tout le document. None si la racine ne le donne pas."""
+    stream, raw = open_svg_stream(svg_file)
+    try:
+        _, root = next(ET.iterparse(stream, events=("start",)))
+    except (ET.ParseError, OSError, StopIteration):
+        return None
+    finally:
+        stream.close()
+        raw.close()
+
+    parts = root.get("viewBox", "").replace(",", " ").split()
+    if len(parts) == 4:
+        try:
+            x, y, w, h = map(float, parts)
+        except ValueError:
+            w = h = 0
+        if w > 0 and h > 0:
+            return QRectF(x, y, w, h)
+    w, h = _length(root.get("width")), _length(root.get("height"))
+    if w and h and w > 0 and h > 0:
+        return QRectF(0, 0, w, h)
+    return None
+
+
+# QSvgRenderer libres par fichier : un renderer ne sert qu'à un thread de rendu à la fois.
+# (Pas de threading.local : l'état Python d'un thread du QThreadPool ne dure qu'un run().)
+_free_renderers = {}
+_renderers_lock = threading.Lock()
+
+
+def _acquire_renderer(svg_file):
+    with _renderers_lock:
+        free = _free_renderers.setdefault(svg_file, [])
+        if free:
+            return free.pop()
+    return QSvgRenderer(svg_file)
+
+
+def _release_renderer(svg_file, renderer):
+    with _renderers_lock:
+        _free_renderers.setdefault(svg_file, []).append(renderer)
+
+
+def release_renderers(svg_file):
+    with _renderers_lock:
+        _free_renderers.pop(svg_file, None)
+
+
+class _TileSignals(QObject):
+    tileReady = pyqtSignal(object, QImage)      # (clé, image) émis depuis le thread de rendu
+    viewBoxReady = pyqtSignal(QRectF)           # cadre calculé par QSvgRenderer (_ViewBoxJob)
+
+
+class _ViewBoxJob(QRunnable):
+    """Cadre d'un SVG dont la racine ne le donne pas : QSvgRenderer interprète alors tout
+    le document, hors du thread graphique ; le renderer resservira aux tuiles."""
+
+    def __init__(self, backdrop):
+        super().__init__()
+        self.signals = backdrop.signals
+        self.svg_file = backdrop.svg_file
+
+    def run(self):
+        renderer = _acquire_renderer(self.svg_file)
+        view_box = renderer.viewBoxF()
+        if view_box.isEmpty():
+            view_box = QRectF(0, 0, renderer.defaultSize().width(), renderer.defaultSize().height())
+        _release_renderer(self.svg_file, renderer)
+        try:
+            self.signals.viewBoxReady.emit(view_box)
+        except RuntimeError:
+            pass    # fond supprimé entre-temps
+
+
+class _TileJob(QRunnable):
+    def __init__(self, backdrop, key, view_box):
+        super().__init__()
+        self.backdrop = backdrop
+        self.key = key
+        self.view_box = view_box
+        self.signals = backdrop.signals
+        self.svg_file = backdrop.svg_file
+
+    def run(self):
+        try:
+            self.signals.tileReady.emit(self.key, self.render())
+        except RuntimeError:
+            pass    # objets Qt détruits pendant le rendu (fond supprimé, fermeture)
+
+    def render(self):
+        level, tx, ty = self.key
+        if level != self.backdrop.current_level:
+            return QImage()             # tuile périmée : abandon
+        scale = 2.0 ** level
+        size = TILE_SIZE / scale
+        image = QImage(TILE_SIZE, TILE_SIZE, QImage.Format_ARGB32_Premultiplied)
+        image.fill(Qt.transparent)
+        painter = QPainter(image)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.scale(scale, scale)
+        painter.translate(-tx * size, -ty * size)
+        renderer = _acquire_renderer(self.svg_file)
+        try:
+            renderer.render(painter, self.view_box)
+        finally:
+            _release_renderer(self.svg_file, renderer)
+            painter.end()
+        return image
+
+
+class SvgBackdropItem(QGraphicsObject):
+    """Fond SVG rendu en tuiles, une grille par niveau de zoom (puissance de 2).
+
+    Les tuiles sont rendues une fois dans un QThreadPool puis gardées (LRU, plafond
+    `cache_limit_mb`, par défaut tile_cache_mb()) : un déplacement réutilise les tuiles,
+    un changement de zoom affiche les tuiles d'un niveau plus grossier en attendant le
+    nouveau rendu.
+    Remplace le QGraphicsSvgItem, qui réinterprétait tout le SVG à chaque repeinte.
+    """
+
+    def __init__(self, svg_file, cache_limit_mb=None, parent=None):
+        super().__init__(parent)
+        self.svg_file = svg_file
+        self.cache_limit = (cache_limit_mb or tile_cache_mb()) * 1024 * 1024
+        self.current_level = None
+        view_box = read_view_box(svg_file)
+        self._view_box = view_box if view_box is not None else QRectF()
+        self._tiles = OrderedDict()     # (niveau, tx, ty) -> QPixmap, du moins au plus récent
+        self._cache_bytes = 0
+        self._pending = set()
+        self.signals = _TileSignals()
+        # Pool propre : le pool global sert aussi à Qt (QImage.scaled lisse y découpe son
+        # travail) et des tuiles en attente du GIL l'y bloqueraient
+        self._pool = QThreadPool()
+        self.signals.tileReady.connect(self.on_tile_ready)
+        self.signals.viewBoxReady.connect(self.on_view_box_ready)
+        if view_box is None:
+            self._pool.start(_ViewBoxJob(self))     # rien n'est peint d'ici là
+        self.setFlag(QGraphicsItem.ItemUsesExtendedStyleOption)
+        self.setZValue(-1)
+
+    def boundingRect(self):
+        return self._view_box
+
+    def paint(self, painter, option, widget=None):
+        scale = option.levelOfDetailFromTransform(painter.worldTransform())
+        if scale <= 0:
+            return
+        level = max(MIN_LEVEL, min(MAX_LEVEL, ceil(log2(scale))))
+        self.current_level = level
+        size = TILE_SIZE / 2.0 ** level
+        exposed = option.exposedRect.intersected(self._view_box)
+        if exposed.isEmpty():
+            return
+
+        painter.setRenderHint(QPainter.SmoothPixmapTransform)
+        for ty in range(floor(exposed.top() / size), ceil(exposed.bottom() / size)):
+            for tx in range(floor(exposed.left() / size), ceil(exposed.right() / size)):
+                key = (level, tx, ty)
+                target = QRectF(tx * size, ty * size, size, size)
+                pixmap = self._tiles.get(key)
+                if pixmap is not None:
+                    self._tiles.move_to_end(key)
+                    painter.drawPixmap(target, pixmap, QRectF(pixmap.rect()))
+                else:
+                    self._request(key)
+                    self._draw_fallback(painter, key, target)
+
+    def _draw_fallback(self, painter, key, target):
+        level, tx, ty = key
+        for k in range(1, FALLBACK_LEVELS + 1):
+            pixmap = self._tiles.get((level - k, tx >> k, ty >> k))
+            if pixmap is None:
+                continue
+            part = TILE_SIZE / 2 ** k
+            source = QRectF((tx - ((tx >> k) << k)) * part, (ty - ((ty >> k) << k)) * part, part, part)
+            painter.drawPixmap(target, pixmap, source)
+            return
+
+    def _request(self, key):
+        if key in self._pending:
+            return
+        self._pending.add(key)
+        self._pool.start(_TileJob(self, key, self._view_box))
+
+    def on_view_box_ready(self, view_box):
+        self.prepareGeometryChange()
+        self._view_box = view_box
+        self.update()
+
+    def on_tile_ready(self, key, image):
+        self._pending.discard(key)
+        if image.isNull():
+            return
+        pixmap = QPixmap.fromImage(image)
+        self._tiles[key] = pixmap
+        self._cache_bytes += pixmap.width() * pixmap.height() * 4
+        while self._cache_bytes > self.cache_limit and len(self._tiles) > 1:
+            _, old = self._tiles.popitem(last=False)
+            self._cache_bytes -= old.width() * old.height() * 4
+        level, tx, ty = key
+        size = TILE_SIZE / 2.0 ** level
+        self.update(QRectF(tx * size, ty * size, size, size))
+
+    def clear_cache(self):
+        self._tiles.clear()
+        self._cache_bytes = 0
+        release_renderers(self.svg_file)
+        debug_log(f"Tuiles du fond SVG libérées ({self.svg_file})")
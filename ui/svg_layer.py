@@ -5,16 +5,17 @@
 #|   By: ctrichet <clement.trichet.pro@gmail.com>         |||||||!!!!!!/.:::::::
 #|                                                        ||||||/.::::::::::::::
 #|   Created: 2025/08/12 11:43:00 ctrichet                 \|||/.::::::::::::::'
-#|   Updated: 2025/08/12 11:43:00 ctrichet                      :::......
+#|   Updated: 2026/10/19 11:47:15 ctrichet                      :::......
 #|                                                              :::::(0):      #
 #############################################################   ':::::::'   ####
 
 import os
+from contextlib import contextmanager
 from PyQt5.QtWidgets import QWidget, QVBoxLayout, QGraphicsScene
-from PyQt5.QtSvg import QSvgRenderer, QGraphicsSvgItem
 from PyQt5.QtGui import QPainter
 from utils.debug import debug_log
 from .views import ZoomableView
+from .svg_backdrop import SvgBackdropItem
 
 class SvgLayerWidget(QWidget):
     _instance = None
@@ -22,11 +23,10 @@ class SvgLayerWidget(QWidget):
     @staticmethod
     def add_to_scene(item):
         if SvgLayerWidget._instance:
-            scene = SvgLayerWidget._instance.scene
-            scene.addItem(item)
-            view = SvgLayerWidget._instance.view
-            if view is not None:
-                view.ensureVisible(scene.itemsBoundingRect(), 50, 50)
+            layer = SvgLayerWidget._instance
+            layer.scene.addItem(item)
+            if not layer._bulk_depth:
+                layer.fit_view()
         else:
             print("Pas d’instance SvgLayerWidget initialisée")
 
@@ -36,20 +36,62 @@ class SvgLayerWidget(QWidget):
             SvgLayerWidget._instance = SvgLayerWidget(file_path)
         return SvgLayerWidget._instance
 
-    def __init__(self, file_path):
+    def __init__(self, file_path, backdrop=True):
         super().__init__()
-        self.items_map = {}
+        self.file_path = file_path
+        self.backdrop = None        # SvgBackdropItem : rendu en tuiles du SVG complet
+        self.virtualizer = None     # PieceVirtualizer en mode virtualisé (gros fichiers)
+        self._bulk_depth = 0
         self.scene = QGraphicsScene()
         self.view = ZoomableView(self.scene)
         self.view.setRenderHint(QPainter.Antialiasing)
         layout = QVBoxLayout()
         layout.addWidget(self.view)
         self.setLayout(layout)
-        self.load_svg(file_path)
+        if backdrop:
+            self.load_svg(file_path)
+
+    def fit_view(self):
+        if self.view is not None:
+            self.view.ensureVisible(self.scene.itemsBoundingRect(), 50, 50)
+
+    @contextmanager
+    def bulk_insert(self, fit=True):
+        """Insertion groupée : pendant le bloc, la scène n'est plus indexée (BSP), la vue
+        n'est plus repeinte ni recadrée à chaque item ; tout est rétabli à la sortie et la
+        vue recadrée une seule fois (si `fit`). Les blocs peuvent être imbriqués."""
+        self._bulk_depth += 1
+        if self._bulk_depth == 1:
+            self.scene.setItemIndexMethod(QGraphicsScene.NoIndex)
+            self.view.setUpdatesEnabled(False)
+        try:
+            yield self
+        finally:
+            self._bulk_depth -= 1
+            if self._bulk_depth == 0:
+                self.scene.setItemIndexMethod(QGraphicsScene.BspTreeIndex)
+                self.view.setUpdatesEnabled(True)
+                if fit:
+                    self.fit_view()
+
+    def add_many(self, items, fit=True):
+        with self.bulk_insert(fit):
+            for item in items:
+                self.scene.addItem(item)
 
     def load_svg(self, file_path):
-        renderer = QSvgRenderer(file_path)
-        item = QGraphicsSvgItem()
-        item.setSharedRenderer(renderer)
+        item = SvgBackdropItem(file_path)
         item.id = os.path.basename(file_path)
-        self.add_to_scene(item)
+        # Ajout direct : le singleton n'est pas encore enregistré pendant __init__
+        self.scene.addItem(item)
+        self.backdrop = item
+
+    def set_backdrop_enabled(self, enabled):
+        """Affiche ou supprime le fond SVG (inutile quand les pièces parsées suffisent) ;
+        le supprimer libère aussi ses tuiles."""
+        if enabled and self.backdrop is None:
+            self.load_svg(self.file_path)
+        elif not enabled and self.backdrop is not None:
+            self.scene.removeItem(self.backdrop)
+            self.backdrop.clear_cache()
+            self.backdrop = None
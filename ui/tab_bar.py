@@ -5,7 +5,7 @@
 #|   By: ctrichet <clement.trichet.pro@gmail.com>         |||||||!!!!!!/.:::::::
 #|                                                        ||||||/.::::::::::::::
 #|   Created: 2025/08/12 11:43:00 ctrichet                 \|||/.::::::::::::::'
-#|   Updated: 2025/08/12 11:43:00 ctrichet                      :::......
+#|   Updated: 2026/10/18 22:31:27 ctrichet                      :::......
 #|                                                              :::::(0):      #
 #############################################################   ':::::::'   ####
 
@@ -56,6 +56,15 @@ class CustomTabBar(QTabBar):
         self._tab_colors[index] = color
         self.update()
 
+    def tabInserted(self, index):
+        # Les couleurs suivent leur onglet (calques insérés avant le « + », retirés en cas d'échec)
+        self._tab_colors = {i + (i >= index): c for i, c in self._tab_colors.items()}
+        super().tabInserted(index)
+
+    def tabRemoved(self, index):
+        self._tab_colors = {i - (i > index): c for i, c in self._tab_colors.items() if i != index}
+        super().tabRemoved(index)
+
     def mousePressEvent(self, event):
         index = self.tabAt(event.pos())
         if index == self.count() - 1:
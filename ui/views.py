@@ -5,15 +5,17 @@
 #|   By: ctrichet <clement.trichet.pro@gmail.com>         |||||||!!!!!!/.:::::::
 #|                                                        ||||||/.::::::::::::::
 #|   Created: 2025/08/12 11:43:00 ctrichet                 \|||/.::::::::::::::'
-#|   Updated: 2025/08/12 11:43:00 ctrichet                      :::......
+#|   Updated: 2026/10/18 18:24:50 ctrichet                      :::......
 #|                                                              :::::(0):      #
 #############################################################   ':::::::'   ####
 
 from PyQt5.QtWidgets import QGraphicsView
 from PyQt5.QtGui import QPainter
-from PyQt5.QtCore import Qt, QPointF
+from PyQt5.QtCore import Qt, QPointF, pyqtSignal
 
 class ZoomableView(QGraphicsView):
+    viewChanged = pyqtSignal()      # zone affichée modifiée (zoom, défilement, taille)
+
     def __init__(self, scene):
         super().__init__(scene)
         self.setRenderHint(QPainter.Antialiasing)
@@ -27,6 +29,15 @@ class ZoomableView(QGraphicsView):
     def wheelEvent(self, event):
         factor = self.zoom_factor if event.angleDelta().y() > 0 else 1 / self.zoom_factor
         self.scale(factor, factor)
+        self.viewChanged.emit()
+
+    def scrollContentsBy(self, dx, dy):
+        super().scrollContentsBy(dx, dy)
+        self.viewChanged.emit()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.viewChanged.emit()
 
     def keyPressEvent(self, event):
         if event.key() == Qt.Key_Space:
@@ -64,6 +75,8 @@ class ZoomableView(QGraphicsView):
 
     def zoom_in(self):
         self.scale(self.zoom_factor, self.zoom_factor)
+        self.viewChanged.emit()
 
     def zoom_out(self):
         self.scale(1 / self.zoom_factor, 1 / self.zoom_factor)
+        self.viewChanged.emit()
@@ -0,0 +1,187 @@
+#############################################################   .=<|||>=.   ####
+#|                                                              |(0)|||||      #
+#|   ui/virtual_scene.py                                        !!!!!!|||
+#|                                                         /||||||||||||/.:::::,
+#|   By: ctrichet <clement.trichet.pro@gmail.com>         |||||||!!!!!!/.:::::::
+#|                                                        ||||||/.::::::::::::::
+#|   Created: 2026/10/18 17:52:30 ctrichet                 \|||/.::::::::::::::'
+#|   Updated: 2026/10/19 09:41:05 ctrichet                      :::......
+#|                                                              :::::(0):      #
+#############################################################   ':::::::'   ####
+
+import os
+
+import numpy as np
+from PyQt5.QtCore import QObject, QTimer, QRectF, Qt
+from PyQt5.QtWidgets import QApplication
+from PyQt5 import sip
+
+from core.model_items import GroupItem
+from utils.debug import debug_log
+
+VIRTUAL_MIN_FILE_SIZE = 1 << 20     # au-delà, la scène SVG est virtualisée par défaut
+
+
+def use_virtual_scene(file_size):
+    """Mode virtualisé pour les gros fichiers ; WOODINLAY_VIRTUAL=0/1 force le choix."""
+    forced = os.environ.get("WOODINLAY_VIRTUAL")
+    if forced is not None:
+        return forced not in ("", "0")
+    return file_size >= VIRTUAL_MIN_FILE_SIZE
+
+
+class PieceVirtualizer(QObject):
+    """Scène SVG virtualisée : seules les pièces proches de la zone affichée existent
+    en QGraphicsItem.
+
+    Toutes les pièces restent connues comme données (SvgPiece + boîtes du GeometryStore) ;
+    à chaque déplacement de la vue, les pièces qui coupent la zone visible (élargie de
+    `margin`) sont matérialisées, les autres retirées de la scène. La sélection est tenue
+    par id dans `selected`, y compris pour les pièces non matérialisées. Une pièce
+    dupliquée garde son GroupItem (lien vers son duplicata) même hors de la vue.
+    """
+
+    def __init__(self, scene, view, store, margin=0.5, max_items=4000, delay_ms=30):
+        super().__init__()
+        self.scene = scene
+        self.view = view
+        self.store = store
+        self.margin = margin
+        self.max_items = max_items      # au-delà (vue très dézoomée), les plus grandes pièces d'abord
+        self.pieces = {}                # indice du GeometryStore -> SvgPiece
+        self.items = {}                 # indice du GeometryStore -> GroupItem existant (dans la scène ou non)
+        self.selected = set()           # ids des pièces sélectionnées
+        self._visible = None            # zone matérialisée (x0, y0, x1, y1)
+        self._bounds = None             # boîte de toutes les pièces
+        self.timer = QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay_ms)
+        self.timer.timeout.connect(self.refresh)
+        view.viewChanged.connect(self.timer.start)
+
+    # --- Pièces ---
+
+    def add(self, piece):
+        index = self.store.index(piece.element_id)
+        self.pieces[index] = piece
+        x0, y0, x1, y1 = self.store.bbox(index)
+        if self._bounds is None:
+            self._bounds = [x0, y0, x1, y1]
+        else:
+            b = self._bounds
+            b[0], b[1], b[2], b[3] = min(b[0], x0), min(b[1], y0), max(b[2], x1), max(b[3], y1)
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def update(self, piece):
+        index = self.store.index(piece.element_id)
+        self.pieces[index] = piece
+        item = self.items.get(index)
+        if item is not None:
+            item.update_from_piece(piece)
+
+    def remove(self, element_id):
+        index = self.store.index(element_id)
+        self.pieces.pop(index, None)
+        self.selected.discard(element_id)
+        item = self.items.pop(index, None)
+        if item is not None:
+            item.discard_duplicata()
+            if item.scene() is not None:
+                item.scene().removeItem(item)
+
+    def item(self, element_id):
+        """GroupItem de la pièce, créé au besoin (hors scène si la pièce n'est pas visible)."""
+        return self._item(self.store.index(element_id))
+
+    def _item(self, index):
+        item = self.items.get(index)
+        if item is None:
+            piece = self.pieces.get(index)
+            if piece is None:
+                return None
+            item = self.items[index] = GroupItem.from_piece(piece)
+            item.store_index = index
+            item.setSelected(piece.element_id in self.selected)
+        return item
+
+    # --- Sélection ---
+
+    def is_selected(self, element_id):
+        return element_id in self.selected
+
+    def set_selected(self, element_ids, selected=True):
+        """Sélectionne / désélectionne des pièces, matérialisées ou non (sans signal de scène)."""
+        if selected:
+            self.selected.update(element_ids)
+        else:
+            self.selected.difference_update(element_ids)
+        index = self.store.index
+        for element_id in element_ids:
+            item = self.items.get(index(element_id))
+            if item is not None:
+                item.setSelected(selected)
+
+    def sync_selection(self):
+        """Reporte dans `selected` une sélection faite à la souris dans la scène. Sans Ctrl,
+        la scène remplace la sélection : les pièces hors de la vue sont désélectionnées."""
+        # Items déjà détruits : la scène émet encore selectionChanged pendant sa destruction
+        in_scene = [
+            item for item in self.items.values()
+            if not sip.isdeleted(item) and item.scene() is self.scene
+        ]
+        if not QApplication.keyboardModifiers() & Qt.ControlModifier:
+            self.selected.clear()
+        for item in in_scene:
+            if item.isSelected():
+                self.selected.add(item.element_id)
+            else:
+                self.selected.discard(item.element_id)
+
+    def selected_items(self):
+        items = (self.item(element_id) for element_id in self.selected)
+        return [item for item in items if item is not None]
+
+    # --- Matérialisation ---
+
+    def visible_rect(self):
+        rect = self.view.mapToScene(self.view.viewport().rect()).boundingRect()
+        dx, dy = rect.width() * self.margin, rect.height() * self.margin
+        return rect.left() - dx, rect.top() - dy, rect.right() + dx, rect.bottom() + dy
+
+    def refresh(self):
+        if self._bounds is not None:
+            x0, y0, x1, y1 = self._bounds
+            bounds = QRectF(x0, y0, x1 - x0, y1 - y0)
+            if self.scene.sceneRect() != bounds:
+                # Sans items dans la scène, la zone de défilement doit couvrir toutes les pièces
+                self.scene.setSceneRect(bounds)
+
+        store = self.store
+        x0, y0, x1, y1 = self._visible = self.visible_rect()
+        hits = store.query_rect(x0, y0, x1, y1)
+        if len(hits) > self.max_items:
+            hits = hits[np.argsort(store.areas[hits])[::-1][:self.max_items]]
+        wanted = set(hits.tolist())
+        wanted.intersection_update(self.pieces)
+
+        self.scene.blockSignals(True)
+        removed = 0
+        for index, item in list(self.items.items()):
+            if index in wanted:
+                continue
+            if item.scene() is not None:
+                self.scene.removeItem(item)
+                removed += 1
+            if item.duplicata is None:
+                del self.items[index]
+        added = 0
+        for index in wanted:
+            item = self._item(index)
+            if item.scene() is None:
+                self.scene.addItem(item)
+                item.setSelected(item.element_id in self.selected)
+                added += 1
+        self.scene.blockSignals(False)
+        if added or removed:
+            debug_log(f"🪟 Scène virtualisée : +{added} -{removed} → {len(wanted)} pièces matérialisées")